@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "rooms.metrics.MetricsMiddleware",  # REST 처리 시간 (/metrics/)
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,6 +85,15 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # 연결을 요청마다 닫지 않고 재사용 (Consumer 전용 스레드 풀의 연결도 유지됨)
+        "CONN_MAX_AGE": 600,
+        "OPTIONS": {
+            # WAL: 읽기가 쓰기를 막지 않음 / synchronous=NORMAL: WAL에서 안전한 수준으로 fsync 감소
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            # 쓰기 트랜잭션은 시작할 때 잠금을 잡음 (중간에 잠금 승격 실패로 'database is locked' 방지)
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
     }
 }
 
@@ -133,4 +143,96 @@ CHANNEL_LAYERS = {
     }
 }
 
+# 한 서버에서 Daphne 워커 여러 개를 띄울 때 (Redis 없이 Unix 소켓으로 그룹 공유):
+# 프로세스 단위 기능은 꺼야 함 (HEART_RATE_TICK_HZ, SPECTATOR_SNAPSHOT_HZ, RESUME_REPLAY_WINDOW,
+# RESUME_GRACE_SECONDS = 0, 아니면 manage.py check에서 rooms.E001 - rooms/checks.py)
+# CHANNEL_LAYERS = {
+#     "default": {
+#         "BACKEND": "rooms.layers.UnixSocketChannelLayer",
+#         "CONFIG": {"path": "/tmp/heartsync-layer"},
+#     }
+# }
+
+# 캐시 (방 상세 응답 캐시 - rooms/room_cache.py)
+# 워커가 여러 개면 버전 번호를 공유해야 하므로 FileBasedCache 등 공유 캐시 사용:
+# CACHES = {
+#     "default": {
+#         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+#         "LOCATION": "/tmp/heartsync-cache",
+#     }
+# }
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# ===== Heart Sync 게임 설정 =====
+
+# 심박수 집계 브로드캐스트 주기 (Hz, 권장 4~10)
+# 0이면 집계기를 사용하지 않고 샘플마다 heart_rate를 브로드캐스트
+HEART_RATE_TICK_HZ = 0
+
+# 집계 모드 delta 전송 (HEART_RATE_TICK_HZ > 0일 때만)
+# N > 0이면 바뀐 플레이어만 보내고 N 프레임마다 전체 상태(keyframe), 0이면 매 프레임 전체 스냅샷
+HEART_RATE_KEYFRAME_INTERVAL = 0
+
+# 관전자(ws/spectate/<room_id>/)용 심박수 스냅샷 주기 (Hz, 0이면 관전자에게 심박수 전송 안 함)
+SPECTATOR_SNAPSHOT_HZ = 1
+
+# 연결별 heart_rate 수신 제한 (rooms/ratelimit.py, 토큰 버킷)
+# 초과분은 최신 값만 남겨 두었다가 토큰이 차면 처리, 0이면 제한 없음
+HEART_RATE_INGRESS_RATE = 10       # 초당 처리할 heart_rate 수
+HEART_RATE_INGRESS_BURST = 20      # 순간 허용량
+
+# 심박수 샘플 저장 버퍼 (rooms/samples.py)
+# 크기 또는 시간 임계값 중 먼저 도달하면 bulk_create → 비정상 종료 시 최대 손실량도 이 값으로 제한
+HEART_RATE_FLUSH_SIZE = 200        # 샘플 수
+HEART_RATE_FLUSH_INTERVAL = 1.0    # 초
+HEART_RATE_BUFFER_MAX = 10000      # DB가 밀릴 때 메모리에 보관할 최대 샘플 수
+
+# 재연결/중간 입장용 최근 심박수 기록 (rooms/history.py, 플레이어별 고정 크기 링 버퍼)
+# 플레이어당 보관 수 = 기간 × HEART_RATE_INGRESS_RATE (수신 제한이 없으면 초당 10개로 계산)
+HEART_RATE_HISTORY_SECONDS = 60    # 보관하고 연결 시 보내는 기간 (초, 0이면 사용 안 함)
+
+# 심박수 타임라인 내보내기 (GET /api/rooms/{room_id}/samples/)
+SAMPLE_EXPORT_CHUNK_SIZE = 2000    # DB에서 한 번에 읽을 행 수 (= 한 번에 보낼 줄 수)
+
+# 실시간 점수(score_update) 전송 주기 (초)
+SCORE_UPDATE_INTERVAL = 1.0
+
+# 게임 중 이 시간(초) 동안 ping이 없으면 연결 끊김 처리 (FINISHED + player_disconnected)
+PING_TIMEOUT_SECONDS = 15
+
+# WebSocket 세션 재개 (rooms/resume.py, ws/game/{room_id}/?token=<session_token>&last_seq=<n>)
+RESUME_REPLAY_WINDOW = 200         # 방별로 보관할 최근 제어 이벤트 수 (창 밖이면 lobby_snapshot부터 다시, 0이면 event_seq 없음)
+RESUME_GRACE_SECONDS = 10          # ping 타임아웃 후 FINISHED 처리 전 재개를 기다리는 시간 (0이면 바로)
+RESUME_TOKEN_MAX_AGE = 3600        # 세션 토큰 유효 시간 (초)
+RESUME_REPLAY_MAX_ROOMS = 1000     # 이벤트를 보관할 최대 방 수 (넘으면 가장 오래 이벤트가 없던 방부터 버림, 종료된 방은 유예 후 버림)
+
+# 게임 중이 아닌 방의 메모리 상태(rooms/registry.py)를 변경 없이 보관하는 시간 (초, 0이면 정리 안 함)
+ROOM_REGISTRY_IDLE_SECONDS = 600
+
+# 방 상세(GET /api/rooms/{room_id}/) 캐시 유지 시간 (초)
+ROOM_DETAIL_CACHE_TIMEOUT = 300
+
+# 오래된 방 정리 (rooms/reaper.py, python manage.py reap_rooms)
+ROOM_FINISHED_TTL_SECONDS = 600    # 종료된 방 보관 시간 (게임 종료 시각 기준)
+ROOM_WAITING_TTL_SECONDS = 3600    # 시작하지 않은 방 보관 시간 (마지막 참가/퇴장/ready 시각 기준)
+ROOM_REAP_BATCH_SIZE = 500         # 트랜잭션 하나에서 삭제할 최대 방 수 (플레이어/방)
+ROOM_REAP_SAMPLE_BATCH_SIZE = 5000 # 트랜잭션 하나에서 삭제할 최대 심박수 샘플 행 수 (방 삭제 전에 따로)
+ROOM_REAP_INTERVAL = 0             # 서버 안에서 주기 실행 (초, 0이면 사용 안 함 → 명령어로 실행)
+
+# Consumer 전용 DB 스레드 풀 (rooms/db.py)
+CONSUMER_DB_WORKERS = 4                # 동시에 실행할 Consumer DB 호출 수
+CONSUMER_STATUS_WRITE_WINDOW = 0.01    # 같은 방의 READY/FINISHED 변경을 모으는 시간 (초)
+
+# Consumer별 송신 큐 (rooms/outbox.py)
+# 심박수는 플레이어별 최신 값만 보관, 제어 이벤트는 순서대로 전부 전송
+CONSUMER_SLOW_EVICT_SECONDS = 10       # 보낼 이벤트가 있는데 이 시간 동안 전송이 진행되지 않으면 연결 끊기
+CONSUMER_CONTROL_QUEUE_MAX = 100       # 밀린 제어 이벤트가 이보다 많으면 연결 끊기
+CONSUMER_ACK_WINDOW = 64               # ack를 보내는 클라이언트: ack 안 된 프레임이 이만큼이면 전송 대기 (0이면 ack 무시)
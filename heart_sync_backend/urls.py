@@ -17,8 +17,10 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from rooms.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/rooms/", include("rooms.urls")),
+    path("metrics/", metrics_view, name="metrics"),
 ]
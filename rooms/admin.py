@@ -1,19 +1,19 @@
 """
 Django Admin 설정
-Room과 Player 모델을 관리자 페이지에서 관리
+Room, Player, HeartRateSample 모델을 관리자 페이지에서 관리
 """
 from django.contrib import admin
-from .models import Room, Player
+from .models import Room, Player, HeartRateSample
 
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     """Room 모델 관리자 설정"""
-    list_display = ["room_id", "room_code", "status", "max_players", "created_at",
+    list_display = ["room_id", "room_code", "status", "max_players", "player_count", "ready_count", "created_at",
                     "mode", "time_limit_seconds", "bpm_min", "bpm_max", "started_at"]
     list_filter = ["status", "mode"]
     search_fields = ["room_id", "room_code"]
-    readonly_fields = ['room_id', 'room_code', 'created_at']
+    readonly_fields = ['room_id', 'room_code', 'player_count', 'ready_count', 'created_at']
 
 
 @admin.register(Player)
@@ -23,3 +23,12 @@ class PlayerAdmin(admin.ModelAdmin):
     list_filter = ['status', 'is_host']
     search_fields = ['nickname', 'player_id']
     readonly_fields = ['player_id', 'joined_at']
+
+
+@admin.register(HeartRateSample)
+class HeartRateSampleAdmin(admin.ModelAdmin):
+    """HeartRateSample 모델 관리자 설정 (조회 전용)"""
+    list_display = ['room', 'slot', 'bpm', 'recorded_at_ms']
+    search_fields = ['room__room_id']
+    list_select_related = ['room']
+    readonly_fields = ['room', 'slot', 'bpm', 'recorded_at_ms']
@@ -0,0 +1,181 @@
+"""
+방별 심박수 집계기 (Tick Aggregator)
+- 샘플마다 group_send 하지 않고 플레이어별 최신 BPM만 보관
+- 설정된 주기(HEART_RATE_TICK_HZ)마다 room_snapshot 하나만 브로드캐스트
+
+delta 모드 (HEART_RATE_KEYFRAME_INTERVAL > 0)
+- 프레임마다 seq 번호, 마지막 프레임 이후 바뀐 플레이어만 전송 (퇴장한 플레이어는 bpm 0)
+- N 프레임마다 전체 상태(keyframe), 새로 연결한 소켓과 request_keyframe 요청에는 그 소켓에만 keyframe
+- 클라이언트는 seq가 건너뛰면 request_keyframe
+"""
+import asyncio
+import time
+from django.conf import settings
+from .protocol import group_event, encode_snapshot, encode_snapshot_delta
+
+
+class RoomAggregator:
+    """
+    방 하나의 최신 BPM 상태와 주기 브로드캐스트 태스크
+    - latest: player_id -> (bpm, slot, 수신 시각) (최신 값만 유지)
+    - 마지막 tick 이후 새 샘플이 없으면 브로드캐스트 생략
+    - keyframe_interval > 0이면 delta 모드
+    """
+    def __init__(self, channel_layer, group_name, tick_hz, keyframe_interval=0):
+        self.channel_layer = channel_layer
+        self.group_name = group_name
+        self.interval = 1 / tick_hz
+        self.keyframe_interval = keyframe_interval
+        self.latest = {}  # player_id -> (bpm, slot, received_at)
+        self.dirty = False  # 마지막 tick 이후 변경 여부
+        self.seq = 0  # 마지막으로 브로드캐스트한 프레임 번호 (delta 모드)
+        self.changed = set()  # 마지막 프레임 이후 값이 바뀐 player_id
+        self.removed = {}  # 마지막 프레임 이후 빠진 player_id -> slot
+        self.members = 0  # 이 프로세스에서 방에 연결된 소켓 수
+        self.task = None
+
+    def update(self, player_id, bpm, slot=None):
+        """새 심박수 샘플 반영 (최신 값으로 덮어쓰기)"""
+        self.latest[player_id] = (bpm, slot, time.monotonic())
+        self.changed.add(player_id)
+        self.removed.pop(player_id, None)
+        self.dirty = True
+
+        # 첫 샘플이 들어올 때 tick 태스크 시작
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def forget(self, player_id):
+        """연결이 끊긴 플레이어를 스냅샷에서 제거"""
+        entry = self.latest.pop(player_id, None)
+        if entry is not None:
+            self.changed.discard(player_id)
+            self.removed[player_id] = entry[1]
+            self.dirty = True
+
+    def stop(self):
+        """tick 태스크 중지"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    @property
+    def delta(self):
+        return self.keyframe_interval > 0
+
+    def snapshot_event(self, player_ids=None):
+        """
+        room_snapshot 그룹 이벤트 생성 (JSON + 바이너리 프레임)
+        - player_ids가 없으면 전체 상태 (keyframe), 있으면 그 플레이어만 + 빠진 플레이어 (delta)
+        """
+        now = time.monotonic()
+        keyframe = player_ids is None
+        entries = [
+            (player_id, bpm, slot, (now - received_at) * 1000)
+            for player_id, (bpm, slot, received_at) in self.latest.items()
+            if keyframe or player_id in player_ids
+        ]
+        if not keyframe:
+            entries.extend((player_id, 0, slot, 0) for player_id, slot in self.removed.items())
+        records = [(slot, bpm, age) for _, bpm, slot, age in entries if slot is not None]
+
+        payload = {'type': 'room_snapshot'}
+        if self.delta:
+            payload['seq'] = self.seq
+            payload['keyframe'] = keyframe
+            binary = encode_snapshot_delta(self.seq, keyframe, records)
+        else:
+            binary = encode_snapshot(records)
+        payload['players'] = [{'player_id': player_id, 'bpm': bpm} for player_id, bpm, _, _ in entries]
+        return group_event('send_room_snapshot', payload, binary=binary, key='room_snapshot')
+
+    def keyframe_event(self):
+        """현재 seq 기준 전체 상태 (새 연결 / request_keyframe 응답용, 그룹 전체가 아니라 소켓 하나에 전송)"""
+        return self.snapshot_event()
+
+    def next_event(self):
+        """다음 tick에 브로드캐스트할 이벤트 (delta 모드면 seq 증가, N번째마다 keyframe)"""
+        if self.delta:
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            if self.seq % self.keyframe_interval == 0:
+                event = self.snapshot_event()
+            else:
+                event = self.snapshot_event(self.changed)
+        else:
+            event = self.snapshot_event()
+        self.changed = set()
+        self.removed = {}
+        return event
+
+    async def _run(self):
+        """고정 주기로 스냅샷 브로드캐스트 (드리프트 없이 다음 tick 시각 기준으로 대기)"""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        try:
+            while True:
+                next_tick += self.interval
+                await asyncio.sleep(max(0, next_tick - loop.time()))
+
+                if not self.dirty:
+                    continue
+                self.dirty = False
+
+                await self.channel_layer.group_send(self.group_name, self.next_event())
+        except asyncio.CancelledError:
+            # 방이 비면 조용히 종료
+            pass
+
+
+# 프로세스 단위 방별 집계기 (group_name -> RoomAggregator)
+_aggregators = {}
+
+
+def get_tick_hz():
+    """설정된 tick 주기 (0이면 집계기 비활성화 → 샘플마다 브로드캐스트)"""
+    return getattr(settings, 'HEART_RATE_TICK_HZ', 0)
+
+
+def get_keyframe_interval():
+    """delta 모드 keyframe 주기 (프레임 수, 0이면 매 프레임 전체 스냅샷)"""
+    return getattr(settings, 'HEART_RATE_KEYFRAME_INTERVAL', 0)
+
+
+def join(channel_layer, group_name, tick_hz=None, keyframe_interval=None):
+    """
+    소켓이 방에 연결될 때 호출
+    집계기가 비활성화되어 있으면 None 반환
+    tick_hz / keyframe_interval을 주면 설정값 대신 사용 (관전자 피드)
+    """
+    if tick_hz is None:
+        tick_hz = get_tick_hz()
+    if not tick_hz:
+        return None
+
+    aggregator = _aggregators.get(group_name)
+    if aggregator is None:
+        if keyframe_interval is None:
+            keyframe_interval = get_keyframe_interval()
+        aggregator = RoomAggregator(channel_layer, group_name, tick_hz, keyframe_interval)
+        _aggregators[group_name] = aggregator
+    aggregator.members += 1
+    return aggregator
+
+
+def get(group_name):
+    """이 프로세스의 집계기 (없으면 None)"""
+    return _aggregators.get(group_name)
+
+
+def leave(group_name, player_id=None):
+    """소켓 연결 해제 시 호출, 방에 남은 소켓이 없으면 집계기 제거"""
+    aggregator = _aggregators.get(group_name)
+    if aggregator is None:
+        return
+
+    if player_id:
+        aggregator.forget(player_id)
+
+    aggregator.members -= 1
+    if aggregator.members <= 0:
+        aggregator.stop()
+        _aggregators.pop(group_name, None)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RoomsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rooms"
+
+    def ready(self):
+        # 설정 검사 등록 (멀티 워커에서 쓸 수 없는 프로세스 단위 기능)
+        from . import checks  # noqa: F401
+
+        # 방 코드 pool 미리 생성 (100만 개 배열, 첫 방 생성 요청이 기다리지 않도록)
+        from .codes import room_codes
+        room_codes.prepare()
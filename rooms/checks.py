@@ -0,0 +1,40 @@
+"""
+설정 검사 (python manage.py check, runserver/test 시 자동 실행)
+
+프로세스 단위로만 동작하는 기능은 멀티 워커 채널 레이어(UnixSocketChannelLayer)와 함께 쓰면 안 됨
+- HEART_RATE_TICK_HZ: 방별 집계기가 워커마다 따로 있어 room_snapshot이 워커별 일부 플레이어만 담고,
+  delta seq가 워커마다 달라 keyframe 요청이 반복됨
+- SPECTATOR_SNAPSHOT_HZ: 관전자 스냅샷도 워커별 일부 플레이어만 담김
+- RESUME_REPLAY_WINDOW: event_seq가 워커마다 따로 매겨져 순서가 섞임
+- RESUME_GRACE_SECONDS: 재개 대기가 ping 타임아웃이 난 워커에만 있어 다른 워커로 재연결해도 FINISHED 처리됨
+
+방/플레이어 상태(registry)는 그룹 이벤트로 워커 간에 맞춰지고, 점수판은 게임을 시작한 워커가 맡음 (rooms/scoring.py)
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+MULTI_WORKER_LAYERS = ('rooms.layers.UnixSocketChannelLayer',)
+
+# 멀티 워커에서 0이어야 하는 설정 (기본값은 settings.py와 같게)
+SINGLE_WORKER_SETTINGS = (
+    ('HEART_RATE_TICK_HZ', 0),
+    ('SPECTATOR_SNAPSHOT_HZ', 1),
+    ('RESUME_REPLAY_WINDOW', 200),
+    ('RESUME_GRACE_SECONDS', 10),
+)
+
+
+@register()
+def check_single_worker_settings(app_configs, **kwargs):
+    backend = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {}).get('BACKEND')
+    if backend not in MULTI_WORKER_LAYERS:
+        return []
+    return [
+        Error(
+            f'{name} is per-process and cannot be used with {backend}.',
+            hint=f'Set {name} = 0 when running multiple workers.',
+            id='rooms.E001',
+        )
+        for name, default in SINGLE_WORKER_SETTINGS
+        if getattr(settings, name, default)
+    ]
@@ -0,0 +1,86 @@
+"""
+방 코드(room_code) 할당기
+- 000000 ~ 999999를 배열(pool)에 보관 (앱 시작 시 RoomsConfig.ready()에서 미리 생성, DB 조회 없음)
+- 할당: 임의 위치의 코드를 꺼내고 그 자리를 마지막 원소로 채움 (O(1), 중복 없음, 균등 분포)
+- 반납: 방이 삭제/종료되면 pool 끝에 다시 넣음 (O(1))
+- 처음 할당할 때 한 번만 DB에서 사용 중인 코드를 읽어 둠 (pool에서 바로 빼지 않고, 뽑히면 버리고 다시 뽑음)
+  이후 중복 확인용 DB 조회 없음
+
+pool은 프로세스마다 따로 있으므로, 워커가 여러 개면 드물게 같은 코드를 고를 수 있음
+→ DB의 부분 유니크 제약(진행 중인 방끼리만 유일)이 막고, RoomCreateView가 새 코드로 재시도
+"""
+import random
+import threading
+from array import array
+
+CODE_SPACE = 10 ** 6  # 6자리 숫자
+
+
+class RoomCodeAllocator:
+    def __init__(self, space=CODE_SPACE):
+        self.space = space
+        self._pool = None  # array('I'), prepare() 또는 첫 할당 때 생성
+        self._in_use = None  # 첫 할당 때 DB에서 읽은 사용 중인 코드 (아직 pool 안에 있음)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """남은 코드 수"""
+        if self._pool is None:
+            return self.space
+        return len(self._pool) - len(self._in_use or ())
+
+    def prepare(self):
+        """전체 코드 배열 생성 (앱 시작 시 한 번, 첫 방 생성 요청이 기다리지 않도록)"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = array('I', range(self.space))
+
+    def _load_in_use(self):
+        """사용 중인 코드(종료되지 않은 방)"""
+        from .models import Room  # models.py가 이 모듈을 import 하므로 지연 import
+
+        return {
+            int(code) for code in
+            Room.objects.exclude(status=Room.Status.FINISHED).values_list('room_code', flat=True)
+        }
+
+    def allocate(self):
+        """사용 중이 아닌 6자리 코드 하나 할당"""
+        if self._pool is None:
+            self.prepare()
+        with self._lock:
+            if self._in_use is None:
+                self._in_use = self._load_in_use()
+            while self._pool:
+                index = random.randrange(len(self._pool))
+                code = self._pool[index]
+                self._pool[index] = self._pool[-1]
+                self._pool.pop()
+                if code in self._in_use:
+                    # 시작 전부터 쓰던 코드 → pool에서 빼기만 (그 방이 끝나면 release로 돌아옴)
+                    self._in_use.discard(code)
+                    continue
+                return f"{code:06d}"
+        raise RuntimeError("No room codes left")
+
+    def release(self, *codes):
+        """방 삭제/종료 시 코드 반납"""
+        with self._lock:
+            if self._in_use is None:
+                return  # 아직 사용 중인 코드를 읽기 전이면 그때 DB에서 반영됨
+            for code in codes:
+                code = int(code)
+                if code in self._in_use:
+                    self._in_use.discard(code)  # 아직 pool 안에 있음
+                else:
+                    self._pool.append(code)
+
+    def reset(self):
+        """pool을 버리고 다음 할당 때 DB 기준으로 다시 생성"""
+        with self._lock:
+            self._pool = None
+            self._in_use = None
+
+
+# 프로세스 전역 할당기
+room_codes = RoomCodeAllocator()
@@ -1,18 +1,67 @@
 import json
-import asyncio
-from datetime import datetime, timedelta
+import time
+from urllib.parse import parse_qs
+from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import Player
+from .models import Room, Player
+from .registry import registry
+from .db import consumer_database_sync_to_async, status_writer
+from . import lobby
+from . import reaper
+from . import aggregator
+from . import metrics
+from . import ratelimit
+from . import resume
+from . import samples
+from . import scoring
+from . import spectators
+from .outbox import Outbox
+from .timers import ping_supervisor, resume_timers
+from .game_clock import game_clock
+from .history import history
+from .resume import replay
+from .protocol import (
+    group_event,
+    encode_json,
+    encode_heart_rate,
+    decode_inbound,
+    FrameError,
+    SUBPROTOCOL_BINARY,
+    PONG_FRAME,
+    INVALID_JSON_FRAME,
+    SPECTATOR_READ_ONLY_FRAME,
+)
 
 class GameConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         """ WebSocket 연결 시 실행 """
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'game_{self.room_id}'
-        self.last_ping = datetime.now()  # 마지막 ping 시간 초기화
+        self.last_ping = time.monotonic()  # 마지막 ping 시간 초기화
+        self.ping_timeout = getattr(settings, 'PING_TIMEOUT_SECONDS', 15)  # 게임 중 ping 제한 시간
         self.player_id = None  # player_id는 나중에 설정됨
-        self.ping_check_task = None  # ping 체크 태스크
+        self.slot = None  # 내 플레이어의 자리 번호 (바이너리 프레임용)
+        self.slot_players = {}  # slot -> player_id (바이너리 수신용 캐시)
+        self.limiter = ratelimit.create(self.handle_heart_rate)  # heart_rate 수신 제한 (None이면 제한 없음)
+        self.outbox = Outbox(self.send_frame, self.evict_slow)  # 그룹 이벤트 송신 큐
+        self.replayed_through = 0  # 재연결 시 다시 보낸 마지막 event_seq (그 이하 그룹 이벤트는 중복)
+        self.replaced = False  # 같은 플레이어가 다른 소켓으로 resume 했는지
+        self.session_owner = False  # 세션 토큰으로 플레이어를 지정했는지 (재개/이전 소켓 교체 권한)
+
+        # 바이너리 서브프로토콜 협상 (요청하지 않은 클라이언트는 기존 JSON)
+        self.binary = SUBPROTOCOL_BINARY in self.scope.get('subprotocols', [])
+
+        # 재시작 직후 첫 연결이면 진행 중이던 게임의 종료 시각 복원
+        await game_clock.ensure_restored()
+
+        # 오래된 방 정리 태스크 (ROOM_REAP_INTERVAL 설정 시에만)
+        reaper.ensure_running()
+
+        # 방별 심박수 집계기 (HEART_RATE_TICK_HZ 설정 시에만 사용)
+        self.aggregator = aggregator.join(self.channel_layer, self.room_group_name)
+
+        # 관전자 그룹용 저주기 심박수 스냅샷 (SPECTATOR_SNAPSHOT_HZ)
+        self.spectator_feed = spectators.join_feed(self.channel_layer, self.room_id)
 
         # 그룹에 참가
         await self.channel_layer.group_add(
@@ -21,13 +70,51 @@ class GameConsumer(AsyncWebsocketConsumer):
         )
 
         # WebSocket 연결 수락
-        await self.accept()
+        await self.accept(subprotocol=SUBPROTOCOL_BINARY if self.binary else None)
+        metrics.connection_opened(self.room_id)
+
+        # 재연결이면 놓친 이벤트만, 아니면 방 전체 상태 한 번 전송 (이후 변경은 lobby_update로)
+        if not await self.resume_session():
+            event_seq = replay.current(self.room_id)
+            snapshot = await consumer_database_sync_to_async(lobby.snapshot)(self.room_id)
+            if snapshot is not None:
+                snapshot['event_seq'] = event_seq
+                await self.send(text_data=encode_json(snapshot))
+
+        # 최근 심박수 기록 (중간 입장/재연결 시 그래프 채우기)
+        recent = history.message(self.room_id)
+        if recent is not None:
+            await self.send(text_data=encode_json(recent))
+
+        # delta 모드: 현재 심박수 전체 상태(keyframe)부터
+        if self.aggregator and self.aggregator.delta and self.aggregator.latest:
+            await self.outbox.put_latest(self.aggregator.keyframe_event())
 
     async def disconnect(self, close_code):
         """ WebSocket 연결 해제 시 실행 """
-        # ping 체크 태스크 취소
-        if self.ping_check_task:
-            self.ping_check_task.cancel()
+        metrics.connection_closed(self.room_id)
+
+        # 보내지 못한 그룹 이벤트 정리
+        self.outbox.close()
+
+        # 수신 제한으로 보관 중이던 heart_rate 정리
+        if self.limiter:
+            self.limiter.close()
+
+        # ping 타임아웃 감시 해제
+        ping_supervisor.cancel(self.channel_name)
+        if resume.active.get((self.room_id, self.player_id)) == self.channel_name:
+            del resume.active[(self.room_id, self.player_id)]
+
+        # 버퍼에 남은 심박수 샘플 기록
+        await samples.buffer.flush()
+
+        # 집계기에서 빠지기 (마지막 소켓이면 집계기도 정리됨, 다른 소켓이 이어받았으면 스냅샷에 남김)
+        player_id = None if self.replaced else self.player_id
+        if self.aggregator:
+            aggregator.leave(self.room_group_name, player_id)
+        if self.spectator_feed:
+            spectators.leave_feed(self.room_id, player_id)
 
         # 그룹에서 나가기
         await self.channel_layer.group_discard(
@@ -35,24 +122,43 @@ class GameConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-    async def receive(self, text_data):
-        """ 클라이언트로부터 메시지 받을 때 실행 """
+    async def receive(self, text_data=None, bytes_data=None):
+        """ 클라이언트로부터 메시지 받을 때 실행 (메시지 타입별 처리 시간 기록) """
+        start = time.perf_counter()
+        message_type = await self.handle_message(text_data, bytes_data)
+        metrics.ws_messages.inc(message_type)
+        metrics.ws_receive_seconds.observe(time.perf_counter() - start, message_type)
+
+    async def handle_message(self, text_data, bytes_data):
+        """
+        메시지 처리
+        반환: 메트릭 레이블용 메시지 타입 (알 수 없는 타입은 'unknown'으로 묶음)
+        """
+        # 바이너리 프레임 (heart_rate 전용)
+        if bytes_data is not None:
+            await self.receive_binary(bytes_data)
+            return 'binary'
+
         # json 파싱
         try:
             data = json.loads(text_data)
         except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({'error':'Invalid JSON'}))
-            return
+            await self.send(text_data=INVALID_JSON_FRAME)
+            return 'invalid'
 
-        message_type = data.get('type')
+        message_type = data.get('type') if isinstance(data, dict) else None
 
         # Ping/Pong 처리 (연결 유지 확인)
         if message_type == 'ping':
-            self.last_ping = datetime.now()  # ping 받으면 시간 갱신
-            await self.send(text_data=json.dumps({
-                'type': 'pong'
-            }))
-            return
+            self.last_ping = time.monotonic()  # ping 받으면 시간 갱신
+            ping_supervisor.touch(self.channel_name, self.ping_timeout)
+            await self.send(text_data=PONG_FRAME)
+            return message_type
+
+        # 받은 프레임 수 알림 (송신 큐 flow control, rooms/outbox.py)
+        if message_type == 'ack':
+            self.outbox.ack(data.get('received'))
+            return message_type
 
         # 플레이어 ready 상태 변경
         if message_type == 'player_ready':
@@ -60,145 +166,436 @@ class GameConsumer(AsyncWebsocketConsumer):
 
             # DB에서 플레이어 상태를 READY로 변경
             result = await self.set_player_ready(player_id)
+            if result:
+                registry.set_player_status(self.room_id, player_id, Player.Status.READY)
 
             if result:
-                # 방의 모든 클라이언트에게 알림
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'send_player_ready',
-                        'player_id': player_id,
-                        'nickname': result['nickname']
-                    }
-                )
+                # 방의 모든 클라이언트와 관전자에게 알림 (프레임은 여기서 한 번만 인코딩)
+                event = replay.event(self.room_id, 'send_player_ready', {
+                    'type': 'player_ready',
+                    'player_id': player_id,
+                    'nickname': result['nickname']
+                })
+                await self.channel_layer.group_send(self.room_group_name, event)
+                await spectators.forward(self.channel_layer, self.room_id, event)
             else:
                 await self.send(text_data=json.dumps({
                     'type': 'error',
                     'message': 'Player not found'
                 }))
-            return
+            return message_type
+
+        # delta 모드에서 seq가 건너뛴 클라이언트의 전체 상태 요청
+        if message_type == 'request_keyframe':
+            if self.aggregator and self.aggregator.delta:
+                await self.outbox.put_latest(self.aggregator.keyframe_event())
+            else:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Delta snapshots are disabled'
+                }))
+            return message_type
 
         # 심박수 데이터 처리
         if message_type == 'heart_rate':
-            # 심박수 데이터 브로드캐스트
-            player_id = data.get('player_id')
-            bpm = data.get('bpm')
-
-            # player_id 저장 (처음 심박수 받을 때)
-            if not self.player_id:
-                self.player_id = player_id
-                # ping 체크 태스크 시작 (게임 중일 때만)
-                if await self.is_player_playing(player_id):
-                    self.ping_check_task = asyncio.create_task(self.check_ping_timeout())
-
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'send_heart_rate',
-                    'player_id': player_id,
-                    'bpm': bpm,
-                }
-            )
+            await self.submit_heart_rate(data.get('player_id'), data.get('bpm'))
+            return message_type
+
+        return 'unknown'
+
+    async def receive_binary(self, bytes_data):
+        """바이너리 heart_rate 프레임 처리 (slot → player_id 변환 후 JSON과 동일하게 처리)"""
+        try:
+            slot, bpm = decode_inbound(bytes_data)
+        except FrameError as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+            return
+
+        player_id = self.slot_players.get(slot)
+        if player_id is None:
+            player_id = await self.resolve_slot(slot)
+            if player_id is None:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Player not found'
+                }))
+                return
+            self.slot_players[slot] = player_id
+
+        await self.submit_heart_rate(player_id, bpm)
+
+    async def submit_heart_rate(self, player_id, bpm):
+        """수신 제한 적용 (초과분은 최신 값만 남겼다가 토큰이 차면 handle_heart_rate)"""
+        if self.limiter:
+            await self.limiter.submit(player_id, bpm)
+        else:
+            await self.handle_heart_rate(player_id, bpm)
+
+    async def handle_heart_rate(self, player_id, bpm):
+        """심박수 데이터 브로드캐스트"""
+        # player_id 저장 (처음 심박수 받을 때, 토큰 없이 연결한 기존 클라이언트)
+        if not self.player_id:
+            await self.bind_player(player_id)
+
+        # 바이너리 전송/저장/점수 계산은 내 플레이어의 정상 범위 정수 BPM만 (나머지는 JSON 중계만)
+        valid = isinstance(bpm, int) and 0 < bpm < 1000
+        slot = self.slot if valid and player_id == self.player_id else None
+
+        if slot is not None:
+            # 재연결용 최근 기록 (고정 크기 링 버퍼, 로비 그래프용으로 게임 전에도 기록)
+            history.add(self.room_id, player_id, slot, bpm)
+
+            # 게임 중일 때만 통계용 샘플 저장 + 점수 누적
+            # (로비에서는 퇴장한 자리를 다음 참가자가 이어받으므로 slot 기준 샘플이 다른 플레이어에게 매핑됨)
+            room_state = registry.get_room(self.room_id)
+            if room_state is not None and room_state.status == Room.Status.PLAYING:
+                # 버퍼에만 넣고 INSERT는 나중에 한 번에
+                samples.buffer.add(self.room_id, slot, bpm)
+                await scoring.record(self.channel_layer, self.room_group_name, room_state, player_id, bpm)
+
+        # 관전자: 최신 값만 저장 (SPECTATOR_SNAPSHOT_HZ마다 관전자 그룹으로 전송)
+        if self.spectator_feed:
+            self.spectator_feed.update(player_id, bpm, slot)
+
+        # 집계기 사용 시: 최신 값만 저장하고 tick마다 room_snapshot으로 묶어서 전송
+        if self.aggregator:
+            self.aggregator.update(player_id, bpm, slot)
+            return
+
+        # 바이너리 클라이언트용 프레임도 보내는 쪽에서 한 번만 인코딩
+        binary = encode_heart_rate(slot, bpm) if slot is not None else None
+
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            group_event('send_heart_rate', {
+                'type': 'heart_rate',
+                'player_id': player_id,
+                'bpm': bpm,
+            }, binary=binary, key=player_id)
+        )
+
+    async def bind_player(self, player_id, owner=False):
+        """
+        이 소켓의 플레이어 지정 (ping 감시, 샘플 저장/점수/최근 기록 대상)
+        - owner=False: 첫 heart_rate의 player_id (기존 방식) → 토큰으로 연결한 소켓이 있으면 지정하지 않음
+        - owner=True: 세션 토큰으로 연결 → resume.active 기록 (재개 / 이전 소켓 교체는 이 소켓만)
+        """
+        if not owner and resume.active.get((self.room_id, player_id)) is not None:
+            return
+        player_info = await self.lookup_player(player_id)
+        if not player_info:
+            return
+        self.player_id = player_id
+        self.slot = player_info['slot']
+        # ping 타임아웃 감시 시작 (게임 중일 때만, 마지막 ping 기준)
+        if player_info['status'] == Player.Status.PLAYING:
+            remaining = self.ping_timeout - (time.monotonic() - self.last_ping)
+            ping_supervisor.schedule(self.channel_name, remaining, self.handle_ping_timeout)
+        if owner:
+            self.session_owner = True
+            resume.active[(self.room_id, player_id)] = self.channel_name
+
+    async def resume_session(self):
+        """
+        세션 토큰 / 재연결 처리 (?token=<session_token>&last_seq=<n>, 둘 다 선택)
+        - token: 방 생성/참가 응답의 session_token → 이 소켓을 그 플레이어로 지정
+          (같은 플레이어의 이전 소켓 종료, ping 타임아웃 유예 취소)
+          토큰 없이 연결한 소켓은 기존처럼 첫 heart_rate로 플레이어 지정 (재개/교체 권한 없음)
+        - last_seq: 그 이후 제어 이벤트만 다시 전송
+        반환: 놓친 이벤트를 다시 보냈으면 True (방 전체 상태 전송 생략)
+        """
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+
+        token = params.get('token', [None])[0]
+        player_id = resume.read_token(token, self.room_id) if token else None
+        if player_id is not None:
+            resume_timers.cancel(resume.grace_key(self.room_id, player_id))
+            previous = resume.active.get((self.room_id, player_id))
+            if previous is not None and previous != self.channel_name:
+                ping_supervisor.cancel(previous)
+                await self.channel_layer.send(previous, {'type': 'session_replaced'})
+            await self.bind_player(player_id, owner=True)
+
+        try:
+            last_seq = int(params['last_seq'][0])
+        except (KeyError, ValueError):
+            return False
+        missed = replay.since(self.room_id, last_seq)
+        if missed is None:
+            return False
+        for text in missed:
+            await self.send(text_data=text)
+        self.replayed_through = last_seq + len(missed)
+        await self.send(text_data=encode_json({
+            'type': 'resumed',
+            'event_seq': self.replayed_through,
+            'replayed': len(missed),
+        }))
+        return True
+
+    async def put_control(self, event):
+        """제어 이벤트 전송 (재연결 때 이미 다시 보낸 event_seq는 건너뜀, 번호 없는 이벤트는 그대로)"""
+        event_seq = event.get('event_seq')
+        if event_seq is None or event_seq > self.replayed_through:
+            await self.outbox.put(event)
+
+    # ===== 그룹 이벤트 핸들러 =====
+    # 보내는 쪽에서 group_event()로 미리 인코딩한 프레임을 그대로 전달 (재직렬화 없음)
+    # 소켓에 바로 쓰지 않고 outbox에 넣음 (심박수는 플레이어별 최신 값만, 제어 이벤트는 순서대로 전부)
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        """모든 송신 프레임 수 집계 (클라이언트 ack와 비교하는 outbox 전송 창 기준)"""
+        if text_data is not None or bytes_data is not None:
+            self.outbox.sent_frame()
+        await AsyncWebsocketConsumer.send(self, text_data, bytes_data, close)
+
+    async def send_frame(self, event):
+        """바이너리 클라이언트에게는 바이너리 프레임이 있으면 그것을, 아니면 JSON 전송"""
+        if self.binary and 'bytes' in event:
+            await self.send(bytes_data=event['bytes'])
+        else:
+            await self.send(text_data=event['text'])
+
+    def apply_group_event(self, event):
+        """
+        방 상태를 바꾸는 제어 이벤트를 이 워커의 레지스트리에도 반영 (다른 워커에서 일어난 변경 포함)
+        반환: 디코딩한 payload
+        """
+        payload = json.loads(event['text'])
+        registry.apply_event(self.room_id, payload)
+        return payload
+
+    @metrics.handler
     async def send_player_ready(self, event):
         """그룹의 모든 클라이언트에게 플레이어 ready 상태 전송"""
-        await self.send(text_data=json.dumps({
-            'type': 'player_ready',
-            'player_id': event['player_id'],
-            'nickname': event['nickname']
-        }))
+        self.apply_group_event(event)
+        await self.put_control(event)
+
+    @metrics.handler
+    async def send_lobby_update(self, event):
+        """REST 뷰에서 일어난 방 변경(참가/퇴장/시작/삭제) 전송"""
+        payload = self.apply_group_event(event)
+        if payload['event'] == lobby.GAME_STARTED:
+            scoring.set_owner(self.room_id, event.get('score_channel'))
+            # 토큰으로 연결해 둔 플레이어는 게임 시작부터 ping 타임아웃 감시
+            state = registry.get_player(self.room_id, self.player_id)
+            if state is not None and state.status == Player.Status.PLAYING:
+                self.last_ping = time.monotonic()
+                ping_supervisor.schedule(self.channel_name, self.ping_timeout, self.handle_ping_timeout)
+        await self.put_control(event)
 
+    @metrics.handler
     async def send_heart_rate(self, event):
         """그룹의 모든 클라이언트에게 심박수 전송"""
-        # WebSocket으로 메시지 보내기
-        await self.send(text_data=json.dumps({
-            'type': 'heart_rate',
-            'player_id': event['player_id'],
-            'bpm': event['bpm'],
-        }))
+        await self.outbox.put_latest(event)
+
+    @metrics.handler
+    async def send_room_snapshot(self, event):
+        """그룹의 모든 클라이언트에게 방 전체 최신 심박수 스냅샷 전송"""
+        # delta 모드에서 이전 프레임을 아직 못 보냈으면 delta를 이어 붙이지 않고 현재 전체 상태로 교체
+        if self.aggregator and self.aggregator.delta and self.outbox.has_latest('room_snapshot'):
+            event = self.aggregator.keyframe_event()
+        await self.outbox.put_latest(event)
 
+    @metrics.handler
+    async def send_score_update(self, event):
+        """그룹의 모든 클라이언트에게 실시간 점수 전송"""
+        await self.outbox.put(event)
+
+    @metrics.handler
+    async def send_game_over(self, event):
+        """게임 종료(시간 만료) 알림과 최종 순위 전송"""
+        # 게임이 끝났으므로 ping 타임아웃 감시도 종료 (다른 워커가 종료시킨 방이면 점수 전달 대상도 정리)
+        ping_supervisor.cancel(self.channel_name)
+        self.apply_group_event(event)
+        scoring.finish(self.room_id)
+        await self.put_control(event)
+
+    @metrics.handler
     async def player_disconnected(self, event):
         """플레이어 연결 끊김 알림을 모든 클라이언트에게 전송"""
-        await self.send(text_data=json.dumps({
-            'type': 'player_disconnected',
-            'player_id': event['player_id'],
-            'nickname': event['nickname']
-        }))
+        self.apply_group_event(event)
+        await self.put_control(event)
 
-    @database_sync_to_async
-    def is_player_playing(self, player_id):
-        """플레이어가 PLAYING 상태인지 확인"""
-        try:
-            player = Player.objects.get(player_id=player_id)
-            return player.status == Player.Status.PLAYING
-        except Player.DoesNotExist:
-            return False
+    async def session_replaced(self, event):
+        """같은 플레이어가 다른 소켓으로 resume → 이 소켓은 FINISHED 처리 없이 종료"""
+        ping_supervisor.cancel(self.channel_name)
+        self.replaced = True
+        await self.close(code=4001)
 
-    @database_sync_to_async
-    def get_player_info(self, player_id):
-        """플레이어 정보 가져오기"""
-        try:
-            player = Player.objects.get(player_id=player_id)
+    async def evict_slow(self):
+        """송신이 밀린 연결 끊기 (outbox가 호출)"""
+        await self.close(code=4008)
+
+    # ===== 플레이어 조회 (레지스트리 우선, 없을 때만 DB) =====
+
+    async def lookup_player(self, player_id):
+        """플레이어 정보 가져오기 - 레지스트리에 있으면 DB 조회 없음"""
+        state = registry.get_player(self.room_id, player_id)
+        if state is not None:
             return {
-                'nickname': player.nickname,
-                'status': player.status
+                'nickname': state.nickname,
+                'status': state.status,
+                'slot': state.slot
             }
-        except Player.DoesNotExist:
-            return None
+        return await self.get_player_info(player_id)
 
-    @database_sync_to_async
-    def set_player_ready(self, player_id):
-        """플레이어 상태를 READY로 변경"""
+    async def resolve_slot(self, slot):
+        """방 안의 slot 번호로 player_id 찾기 - 레지스트리 우선"""
+        room_state = registry.get_room(self.room_id)
+        if room_state is not None:
+            state = room_state.player_by_slot(slot)
+            if state is not None:
+                return state.player_id
+        return await self.get_player_id_by_slot(slot)
+
+    @metrics.db_seconds.time('get_player_info')
+    @consumer_database_sync_to_async
+    def get_player_info(self, player_id):
+        """플레이어 정보 가져오기 (DB) - 조회한 플레이어는 레지스트리에 채워둠"""
         try:
-            player = Player.objects.get(player_id=player_id)
-            player.status = Player.Status.READY
-            player.save()
-            return {'nickname': player.nickname}
+            player = Player.objects.select_related('room').get(player_id=player_id)
         except Player.DoesNotExist:
             return None
+        registry.add_player(player, room=player.room)
+        return {
+            'nickname': player.nickname,
+            'status': player.status,
+            'slot': player.slot
+        }
 
-    @database_sync_to_async
-    def set_player_finished(self, player_id):
-        """플레이어 상태를 FINISHED로 변경"""
-        try:
-            player = Player.objects.get(player_id=player_id)
-            player.status = Player.Status.FINISHED
-            player.save()
-            return True
-        except Player.DoesNotExist:
-            return False
+    @metrics.db_seconds.time('get_player_id_by_slot')
+    @consumer_database_sync_to_async
+    def get_player_id_by_slot(self, slot):
+        """방 안의 slot 번호로 player_id 찾기 (DB)"""
+        player = Player.objects.select_related('room').filter(
+            room_id=self.room_id, slot=slot
+        ).first()
+        if player is None:
+            return None
+        registry.add_player(player, room=player.room)
+        return player.player_id
+
+    async def set_player_ready(self, player_id):
+        """
+        플레이어 상태를 READY로 변경하고 방의 ready_count 증가
+        - 같은 방의 동시 ready는 status_writer가 모아서 한 번에 기록
+        - 이미 READY인 플레이어의 중복 ready는 카운터를 건드리지 않음
+        - 게임 중/종료 후(PLAYING/FINISHED)의 ready는 기록하지 않고 None
+        """
+        nickname = await status_writer.set_status(self.room_id, player_id, Player.Status.READY)
+        return {'nickname': nickname} if nickname is not None else None
+
+    async def set_player_finished(self, player_id):
+        """플레이어 상태를 FINISHED로 변경 (ping 타임아웃이 몰리면 방별로 모아서 기록)"""
+        nickname = await status_writer.set_status(self.room_id, player_id, Player.Status.FINISHED)
+        return nickname is not None
 
-    async def check_ping_timeout(self):
+    async def handle_ping_timeout(self):
         """
-        5초마다 ping 타임아웃 체크
-        15초(3번 실패) 동안 ping이 없으면 연결 끊김 처리
+        ping 타임아웃 처리 (ping_supervisor가 만료 시 호출)
+        PING_TIMEOUT_SECONDS 동안 ping이 없으면 연결 끊김 처리
+        RESUME_GRACE_SECONDS가 있으면 그동안 resume을 기다렸다가 FINISHED 처리 (토큰으로 연결한 소켓만)
         """
+        grace = getattr(settings, 'RESUME_GRACE_SECONDS', 10)
+        if grace and self.session_owner:
+            resume_timers.schedule(resume.grace_key(self.room_id, self.player_id), grace, self.finish_player)
+        else:
+            await self.finish_player()
+
+        # WebSocket 연결 끊기
+        await self.close()
+
+    async def finish_player(self):
+        """플레이어를 FINISHED로 바꾸고 방에 알림 (소켓이 이미 닫혔어도 동작)"""
+        # 플레이어 정보 가져오기
+        player_info = await self.lookup_player(self.player_id)
+
+        if player_info:
+            # 플레이어 상태를 FINISHED로 변경
+            await self.set_player_finished(self.player_id)
+            registry.set_player_status(self.room_id, self.player_id, Player.Status.FINISHED)
+
+            # 방의 모든 사람과 관전자에게 알림
+            event = replay.event(self.room_id, 'player_disconnected', {
+                'type': 'player_disconnected',
+                'player_id': self.player_id,
+                'nickname': player_info['nickname']
+            })
+            await self.channel_layer.group_send(self.room_group_name, event)
+            await spectators.forward(self.channel_layer, self.room_id, event)
+
+
+class SpectatorConsumer(AsyncWebsocketConsumer):
+    """
+    관전자 (ws/spectate/<room_id>/) - 읽기 전용
+    - spectate_<room_id> 그룹만 참가 (플레이어 그룹 fan-out에 영향 없음)
+    - 심박수는 SPECTATOR_SNAPSHOT_HZ 주기의 room_snapshot, 나머지는 플레이어와 같은 제어 이벤트
+    - 받는 메시지는 ping / ack만 처리 (heart_rate / player_ready 등은 error)
+    """
+    async def connect(self):
+        self.room_id = self.scope['url_route']['kwargs']['room_id']
+        self.group_name = spectators.group_name(self.room_id)
+        self.binary = SUBPROTOCOL_BINARY in self.scope.get('subprotocols', [])
+        self.outbox = Outbox(self.send_frame, self.evict_slow)
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept(subprotocol=SUBPROTOCOL_BINARY if self.binary else None)
+
+        # 방 전체 상태 + (이 프로세스에 있으면) 최근 심박수 기록과 현재 스냅샷
+        snapshot = await consumer_database_sync_to_async(lobby.snapshot)(self.room_id)
+        if snapshot is not None:
+            await self.send(text_data=encode_json(snapshot))
+        recent = history.message(self.room_id)
+        if recent is not None:
+            await self.send(text_data=encode_json(recent))
+        feed = spectators.get_feed(self.room_id)
+        if feed is not None and feed.latest:
+            await self.outbox.put_latest(feed.snapshot_event())
+
+    async def disconnect(self, close_code):
+        self.outbox.close()
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """ping에만 pong (ack는 송신 큐에 반영), 나머지 메시지는 거부"""
         try:
-            while True:
-                await asyncio.sleep(5)  # 5초마다 체크
-
-                # 마지막 ping이 15초 이상 지났으면
-                if datetime.now() - self.last_ping > timedelta(seconds=15):
-                    # 플레이어 정보 가져오기
-                    player_info = await self.get_player_info(self.player_id)
-
-                    if player_info:
-                        # 플레이어 상태를 FINISHED로 변경
-                        await self.set_player_finished(self.player_id)
-
-                        # 방의 모든 사람에게 알림
-                        await self.channel_layer.group_send(
-                            self.room_group_name,
-                            {
-                                'type': 'player_disconnected',
-                                'player_id': self.player_id,
-                                'nickname': player_info['nickname']
-                            }
-                        )
-
-                    # WebSocket 연결 끊기
-                    await self.close()
-                    break
-
-        except asyncio.CancelledError:
-            # 태스크가 취소되면 조용히 종료
-            pass
\ No newline at end of file
+            data = json.loads(text_data) if text_data is not None else None
+        except json.JSONDecodeError:
+            await self.send(text_data=INVALID_JSON_FRAME)
+            return
+        message_type = data.get('type') if isinstance(data, dict) else None
+        if message_type == 'ping':
+            await self.send(text_data=PONG_FRAME)
+        elif message_type == 'ack':
+            self.outbox.ack(data.get('received'))
+        else:
+            await self.send(text_data=SPECTATOR_READ_ONLY_FRAME)
+
+    # GameConsumer와 같은 전송 방식 (바이너리 서브프로토콜, outbox, ack 기반 느린 연결 끊기)
+    send = GameConsumer.send
+    send_frame = GameConsumer.send_frame
+    evict_slow = GameConsumer.evict_slow
+
+    # ===== 그룹 이벤트 핸들러 (심박수 스냅샷은 최신 값만, 제어 이벤트는 순서대로) =====
+
+    async def send_room_snapshot(self, event):
+        await self.outbox.put_latest(event)
+
+    async def send_lobby_update(self, event):
+        await self.outbox.put(event)
+
+    async def send_player_ready(self, event):
+        await self.outbox.put(event)
+
+    async def send_score_update(self, event):
+        await self.outbox.put(event)
+
+    async def send_game_over(self, event):
+        await self.outbox.put(event)
+
+    async def player_disconnected(self, event):
+        await self.outbox.put(event)
@@ -0,0 +1,109 @@
+"""
+Consumer 전용 DB 실행기
+- 기본 database_sync_to_async는 REST 뷰와 같은 sync 스레드를 공유 → 버스트 시 REST 요청 뒤에 줄을 섬
+- Consumer의 DB 호출은 전용 스레드 풀(CONSUMER_DB_WORKERS개)에서 실행 (동시 실행 수 상한)
+- 상태 변경(READY, FINISHED)은 잠깐(CONSUMER_STATUS_WRITE_WINDOW초) 모아서 트랜잭션 하나로,
+  방마다 filter(...).update() 한 번으로 기록 (방 전체가 동시에 ready 하거나 ping 타임아웃이 몰릴 때)
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from channels.db import DatabaseSyncToAsync
+from .models import Room, Player
+from . import room_cache
+from . import metrics
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'CONSUMER_DB_WORKERS', 4),
+    thread_name_prefix='consumer-db',
+)
+
+
+def consumer_database_sync_to_async(func):
+    """database_sync_to_async와 같지만 Consumer 전용 스레드 풀에서 실행"""
+    return DatabaseSyncToAsync(func, thread_sensitive=False, executor=executor)
+
+
+# 상태별로 바꿀 수 있는 이전 상태 (READY는 대기 중일 때만 - PLAYING/FINISHED를 되돌리지 않음)
+TRANSITIONS = {
+    Player.Status.READY: (Player.Status.WAITING,),
+    Player.Status.FINISHED: (Player.Status.WAITING, Player.Status.READY, Player.Status.PLAYING),
+}
+
+
+class StatusWriter:
+    """
+    플레이어 상태 변경을 CONSUMER_STATUS_WRITE_WINDOW초 동안 모아서 트랜잭션 하나로 기록
+    - (room_id, status)별로 filter(...).update() 한 번 (SQLite writer 잠금을 한 번만 잡음)
+    set_status()는 배치가 기록된 뒤 플레이어 닉네임을 반환 (방에 없거나 그 상태로 바꿀 수 없으면 None)
+    """
+    def __init__(self, window):
+        self.window = window
+        self.pending = {}  # (room_id, status) -> {player_id: [Future, ...]}
+        self.writes = 0  # 실행한 트랜잭션 수
+        self.coalesced = 0  # 트랜잭션으로 합쳐진 요청 수
+
+    async def set_status(self, room_id, player_id, status):
+        if not self.pending:
+            asyncio.create_task(self._flush_later())
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault((room_id, status), {}).setdefault(player_id, []).append(future)
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        pending, self.pending = self.pending, {}
+        batches = {key: list(players) for key, players in pending.items()}
+        try:
+            nicknames = await self._write(batches)
+        except Exception as e:
+            for players in pending.values():
+                for futures in players.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+            return
+        self.writes += 1
+        for (room_id, _), players in pending.items():
+            for player_id, futures in players.items():
+                self.coalesced += len(futures)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(nicknames.get((room_id, player_id)))
+
+    @metrics.db_seconds.time('write_status')
+    @consumer_database_sync_to_async
+    def _write(self, batches):
+        """
+        방/상태마다 SELECT 1번 + Player UPDATE 1번 (+ READY면 Room 카운터 UPDATE 1번)
+        - 바꿀 수 있는 이전 상태는 UPDATE의 WHERE에 넣고, 카운터는 실제로 바뀐 행 수만큼 증가
+          (중복 ready, 게임 중/종료 후 ready는 카운터를 올리지 않음)
+        반환: (room_id, player_id) -> nickname (이미 같은 상태이거나 바꾼 플레이어만, 바꿀 수 없으면 없음)
+        """
+        nicknames = {}
+        with transaction.atomic():
+            for (room_id, status), player_ids in batches.items():
+                sources = TRANSITIONS[status]
+                rows = Player.objects.filter(
+                    room_id=room_id, player_id__in=player_ids
+                ).values_list('player_id', 'nickname', 'status')
+                for player_id, nickname, current in rows:
+                    if current == status or current in sources:
+                        nicknames[(room_id, player_id)] = nickname
+                changed = Player.objects.filter(
+                    room_id=room_id, player_id__in=player_ids, status__in=sources
+                ).update(status=status)
+                if not changed:
+                    continue
+                if status == Player.Status.READY:
+                    Room.objects.filter(room_id=room_id).update(
+                        ready_count=F('ready_count') + changed, last_activity_at=timezone.now()
+                    )
+                room_cache.bump_on_commit(room_id)
+        return nicknames
+
+
+status_writer = StatusWriter(window=getattr(settings, 'CONSUMER_STATUS_WRITE_WINDOW', 0.01))
@@ -0,0 +1,104 @@
+"""
+종료된 게임의 심박수 타임라인 내보내기 (NDJSON / CSV 스트리밍)
+- DRF 직렬화/Response로 한 번에 만들지 않고 StreamingHttpResponse로 줄 단위 전송
+- DB는 iterator(chunk_size=SAMPLE_EXPORT_CHUNK_SIZE)로 조금씩 읽음 → 샘플 수와 관계없이 메모리 일정
+- resolution_ms를 주면 (slot, 구간)별 평균 BPM 한 줄로 다운샘플 (보관하는 값은 slot 수만큼)
+
+ASGI(daphne)에서는 동기 iterator를 통째로 list로 바꿔서 보내므로 async iterator로 감싸서 전달
+(DB 읽기는 chunk마다 sync_to_async, 같은 요청 스레드에서 실행)
+"""
+import csv
+import itertools
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .models import HeartRateSample
+
+CSV_HEADER = ('recorded_at_ms', 'slot', 'player_id', 'bpm')
+
+
+def iter_samples(room_id):
+    """(recorded_at_ms, slot, bpm) 시간순 (rooms_sample_room_time_idx 사용)"""
+    return HeartRateSample.objects.filter(room_id=room_id).order_by('recorded_at_ms').values_list(
+        'recorded_at_ms', 'slot', 'bpm'
+    ).iterator(chunk_size=getattr(settings, 'SAMPLE_EXPORT_CHUNK_SIZE', 2000))
+
+
+def downsample(samples, resolution_ms):
+    """
+    resolution_ms 구간마다 slot별 평균 BPM (시각은 구간 시작)
+    입력이 시간순이므로 구간이 바뀔 때 이전 구간을 내보냄
+    """
+    bucket = None
+    sums = {}  # slot -> [합계, 개수]
+    for recorded_at_ms, slot, bpm in samples:
+        current = recorded_at_ms // resolution_ms
+        if current != bucket:
+            yield from _flush_bucket(bucket, resolution_ms, sums)
+            bucket = current
+            sums = {}
+        entry = sums.get(slot)
+        if entry is None:
+            sums[slot] = [bpm, 1]
+        else:
+            entry[0] += bpm
+            entry[1] += 1
+    yield from _flush_bucket(bucket, resolution_ms, sums)
+
+
+def _flush_bucket(bucket, resolution_ms, sums):
+    for slot in sorted(sums):
+        total, count = sums[slot]
+        yield bucket * resolution_ms, slot, round(total / count)
+
+
+def ndjson_lines(samples, players):
+    """players: slot -> player_id"""
+    encoded = {slot: json.dumps(player_id) for slot, player_id in players.items()}
+    for recorded_at_ms, slot, bpm in samples:
+        player_id = encoded.get(slot, 'null')
+        yield f'{{"t":{recorded_at_ms},"slot":{slot},"player_id":{player_id},"bpm":{bpm}}}\n'
+
+
+class _Echo:
+    """csv.writer가 쓴 줄을 그대로 반환 (Django 문서의 CSV 스트리밍 방식)"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(samples, players):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for recorded_at_ms, slot, bpm in samples:
+        yield writer.writerow((recorded_at_ms, slot, players.get(slot, ''), bpm))
+
+
+def _chunks(lines, lines_per_chunk):
+    """줄 여러 개를 묶은 문자열 (전송 횟수 줄이기)"""
+    while True:
+        chunk = ''.join(itertools.islice(lines, lines_per_chunk))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _async_chunks(lines, lines_per_chunk):
+    chunks = _chunks(lines, lines_per_chunk)
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def stream(room_id, players, fmt, resolution_ms=None, asynchronous=False):
+    """StreamingHttpResponse에 넘길 iterator (asynchronous=True면 ASGI용 async iterator)"""
+    samples = iter_samples(room_id)
+    if resolution_ms:
+        samples = downsample(samples, resolution_ms)
+    lines = csv_lines(samples, players) if fmt == 'csv' else ndjson_lines(samples, players)
+    lines_per_chunk = getattr(settings, 'SAMPLE_EXPORT_CHUNK_SIZE', 2000)
+    if asynchronous:
+        return _async_chunks(lines, lines_per_chunk)
+    return _chunks(lines, lines_per_chunk)
@@ -0,0 +1,153 @@
+"""
+서버 기준 게임 시계
+- GameStartView가 방의 종료 시각(started_at + time_limit_seconds)을 등록
+- 프로세스 전역 데드라인 힙 하나로 모든 게임 중인 방을 관리 (방마다 태스크 없음)
+- 같은 tick에 끝난 방들은 모아서 Room/Player 상태를 bulk update() 몇 번으로 FINISHED 처리
+- 각 방 그룹에 game_over(최종 순위 포함) 전송
+- 종료된 방의 재개용 이벤트는 RESUME_GRACE_SECONDS 뒤 버림 (DB 삭제는 reaper, 보통 다른 프로세스)
+"""
+import asyncio
+import contextvars
+import logging
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Room, Player
+from .registry import registry
+from .db import consumer_database_sync_to_async
+from .codes import room_codes
+from . import room_cache
+from .timers import DeadlineScheduler
+from . import scoring
+from .history import history
+from .resume import replay
+from . import spectators
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# SQLite 바인드 변수 제한을 넘지 않도록 한 번에 처리할 방 수
+FINISH_CHUNK_SIZE = 500
+
+
+class GameClock:
+    """게임 중인 방들의 종료 시각 관리"""
+    def __init__(self):
+        self.scheduler = DeadlineScheduler(resolution=0.25, batch_callback=self.expire)
+        # 종료 후 재개 유예가 지난 방의 메모리 상태 정리
+        self.retired = DeadlineScheduler(resolution=1.0, batch_callback=self.retire)
+        self.restored = False
+
+    def __len__(self):
+        """현재 진행 중인 게임 수"""
+        return len(self.scheduler)
+
+    async def start(self, room_id, time_limit_seconds):
+        """
+        게임 시작 시 종료 시각 등록
+        반환: 다른 워커가 이 방의 점수 샘플을 보낼 채널 (멀티 워커 채널 레이어가 아니면 None)
+        """
+        self.scheduler.schedule(room_id, time_limit_seconds)
+        return await scoring.open_inbox(get_channel_layer())
+
+    def start_sync(self, room_id, time_limit_seconds):
+        """동기 뷰(GameStartView)에서 호출용"""
+        return async_to_sync(self._start_detached)(room_id, time_limit_seconds)
+
+    async def _start_detached(self, room_id, time_limit_seconds):
+        """
+        빈 Context에서 등록 → 스케줄러/점수 수신 태스크가 요청의 async_to_sync 컨텍스트를 물려받지 않음
+        (물려받으면 만료 콜백의 DB 호출이 이미 끝난 요청 스레드로 보내져 실패)
+        """
+        task = asyncio.get_running_loop().create_task(
+            self.start(room_id, time_limit_seconds), context=contextvars.Context()
+        )
+        return await task
+
+    def cancel(self, room_id):
+        """게임 도중 방이 삭제된 경우"""
+        self.scheduler.cancel(room_id)
+
+    async def ensure_restored(self):
+        """
+        프로세스 재시작 후 첫 연결 시 한 번만 실행
+        DB에 PLAYING으로 남아 있는 방의 종료 시각을 다시 등록 (이미 지난 방은 바로 종료)
+        """
+        if self.restored:
+            return
+        self.restored = True
+        now = timezone.now()
+        for room_id, started_at, time_limit in await self._playing_rooms():
+            remaining = (started_at + timedelta(seconds=time_limit) - now).total_seconds()
+            if room_id not in self.scheduler:
+                self.scheduler.schedule(room_id, max(remaining, 0))
+
+    @database_sync_to_async
+    def _playing_rooms(self):
+        return list(
+            Room.objects.filter(status=Room.Status.PLAYING, started_at__isnull=False)
+            .values_list('room_id', 'started_at', 'time_limit_seconds')
+        )
+
+    async def expire(self, room_ids):
+        """
+        같은 tick에 종료된 방들을 한 번에 처리
+        game_over는 이 워커가 실제로 FINISHED로 바꾼 방만 전송
+        (멀티 워커에서 재시작 후 여러 워커가 같은 방을 복원해도 한 번만)
+        """
+        finished = await self._finish_rooms(room_ids)
+
+        grace = getattr(settings, 'RESUME_GRACE_SECONDS', 10)
+        channel_layer = get_channel_layer()
+        for room_id in finished:
+            registry.drop_room(room_id)
+            history.drop(room_id)
+            event = replay.event(room_id, 'send_game_over', {
+                'type': 'game_over',
+                'room_id': room_id,
+                'ranking': scoring.finish(room_id),
+            })
+            await channel_layer.group_send(f'game_{room_id}', event)
+            await spectators.forward(channel_layer, room_id, event)
+            # 재연결한 클라이언트가 game_over를 다시 받을 수 있도록 유예 시간 동안은 보관
+            self.retired.schedule(room_id, grace)
+
+    async def retire(self, room_ids):
+        """종료 후 유예 시간이 지난 방의 재개용 이벤트 버리기"""
+        for room_id in room_ids:
+            replay.drop(room_id)
+
+    @metrics.db_seconds.time('finish_rooms')
+    @consumer_database_sync_to_async
+    def _finish_rooms(self, room_ids):
+        """
+        Room/Player 상태를 청크 단위 bulk update로 FINISHED 변경 (room_code는 반납)
+        반환: PLAYING에서 FINISHED로 바꾼 room_id 목록 (이미 끝났거나 삭제된 방 제외)
+        """
+        finished = []
+        for i in range(0, len(room_ids), FINISH_CHUNK_SIZE):
+            chunk = room_ids[i:i + FINISH_CHUNK_SIZE]
+            with transaction.atomic():
+                playing = Room.objects.select_for_update().filter(room_id__in=chunk, status=Room.Status.PLAYING)
+                rows = list(playing.values_list('room_id', 'room_code'))
+                ids = [room_id for room_id, _ in rows]
+                Room.objects.filter(room_id__in=ids).update(
+                    status=Room.Status.FINISHED, finished_at=timezone.now()
+                )
+                Player.objects.filter(
+                    room_id__in=ids
+                ).exclude(status=Player.Status.FINISHED).update(status=Player.Status.FINISHED)
+                for room_id in ids:
+                    room_cache.bump_on_commit(room_id)
+            room_codes.release(*[code for _, code in rows])
+            finished.extend(ids)
+        logger.info("Finished %d rooms", len(finished))
+        return finished
+
+
+# 프로세스 전역 게임 시계
+game_clock = GameClock()
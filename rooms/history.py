@@ -0,0 +1,117 @@
+"""
+방별 최근 심박수 기록 (재연결/중간 입장 시 그래프 채우기용)
+- 플레이어마다 고정 크기 링 버퍼 (array('H') BPM + array('Q') 서버 수신 시각 ms)
+  → 미리 할당한 배열에 인덱스로 덮어쓰기만 함 (추가 시 리스트 증가/재할당 없음)
+- 플레이어당 N = HEART_RATE_HISTORY_SECONDS × HEART_RATE_INGRESS_RATE개 (10바이트 × N)
+  → 수신 제한 속도로 보내도 보관 기간 전체가 남고, 방 메모리는 인원 수 × N으로 고정
+- 연결 직후 최근 HEART_RATE_HISTORY_SECONDS초 분량을 history 메시지 하나로 전송
+- 플레이어 퇴장 시 그 플레이어만, 게임 종료 / 방 삭제 시 방 전체 제거
+
+프로세스 단위 (샘플을 받은 소켓이 있는 프로세스에만 기록됨 - registry와 같은 제약)
+"""
+import time
+from array import array
+from django.conf import settings
+
+# 수신 제한이 없을 때(HEART_RATE_INGRESS_RATE = 0) 크기 계산에 쓰는 초당 샘플 수
+UNLIMITED_RATE_ASSUMED = 10
+
+
+class PlayerHistory:
+    """플레이어 한 명의 링 버퍼"""
+    __slots__ = ('slot', 'bpm', 'recorded_at_ms', 'head', 'count')
+
+    def __init__(self, slot, size):
+        self.slot = slot
+        self.bpm = array('H', bytes(2 * size))
+        self.recorded_at_ms = array('Q', bytes(8 * size))
+        self.head = 0  # 다음에 쓸 위치
+        self.count = 0
+
+    def append(self, recorded_at_ms, bpm):
+        i = self.head
+        self.bpm[i] = bpm
+        self.recorded_at_ms[i] = recorded_at_ms
+        i += 1
+        self.head = i if i < len(self.bpm) else 0
+        if self.count < len(self.bpm):
+            self.count += 1
+
+    def since(self, cutoff_ms, now_ms):
+        """cutoff_ms 이후 샘플 (오래된 것부터) → (age_ms 목록, bpm 목록)"""
+        size = len(self.bpm)
+        start = (self.head - self.count) % size
+        ages = []
+        bpms = []
+        for k in range(self.count):
+            i = (start + k) % size
+            recorded_at_ms = self.recorded_at_ms[i]
+            if recorded_at_ms >= cutoff_ms:
+                ages.append(now_ms - recorded_at_ms)
+                bpms.append(self.bpm[i])
+        return ages, bpms
+
+
+class HistoryStore:
+    """room_id -> {player_id: PlayerHistory}"""
+    def __init__(self, size, seconds):
+        self.size = size
+        self.seconds = seconds
+        self.rooms = {}
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def add(self, room_id, player_id, slot, bpm, now_ms=None):
+        if not self.size:
+            return
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        players = self.rooms.get(room_id)
+        if players is None:
+            players = self.rooms[room_id] = {}
+        player = players.get(player_id)
+        if player is None:
+            player = players[player_id] = PlayerHistory(slot, self.size)
+        player.append(now_ms, bpm)
+
+    def message(self, room_id, now_ms=None):
+        """
+        history 메시지 (기록이 없으면 None)
+        players[].age_ms: now_ms 기준 경과 시간, players[].bpm과 같은 순서 (오래된 것부터)
+        """
+        players = self.rooms.get(room_id)
+        if not players:
+            return None
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        cutoff_ms = now_ms - self.seconds * 1000
+        entries = []
+        for player_id, player in players.items():
+            ages, bpms = player.since(cutoff_ms, now_ms)
+            if bpms:
+                entries.append({'player_id': player_id, 'slot': player.slot, 'age_ms': ages, 'bpm': bpms})
+        if not entries:
+            return None
+        return {'type': 'history', 'now_ms': now_ms, 'players': entries}
+
+    def drop_player(self, room_id, player_id):
+        """퇴장한 플레이어 기록 제거 (그 slot을 다음 참가자가 이어받으므로)"""
+        players = self.rooms.get(room_id)
+        if players is not None:
+            players.pop(player_id, None)
+
+    def drop(self, room_id):
+        self.rooms.pop(room_id, None)
+
+
+def history_size(seconds, rate):
+    """플레이어당 보관할 샘플 수 = 보관 기간 × 초당 최대 수신 수 (seconds가 0이면 사용 안 함)"""
+    return seconds * (rate or UNLIMITED_RATE_ASSUMED)
+
+
+_seconds = getattr(settings, 'HEART_RATE_HISTORY_SECONDS', 60)
+history = HistoryStore(
+    size=history_size(_seconds, getattr(settings, 'HEART_RATE_INGRESS_RATE', 10)),
+    seconds=_seconds,
+)
@@ -0,0 +1,292 @@
+"""
+단일 서버용 멀티 프로세스 채널 레이어 (Redis 없이)
+- 한 서버에서 Daphne 워커 여러 개가 같은 방 그룹(game_<room_id>)을 공유
+- 워커마다 Unix 도메인 소켓 하나를 열고, 다른 워커로 가는 메시지는 워커 간 연결로 전달
+  (워커 쌍마다 연결 하나를 재사용, 길이 헤더 + pickle 프레임)
+- 그룹 멤버십은 공유 디렉터리에 파일로 저장 (groups/<group>/<channel_name>)
+  group_send는 워커별로 캐시한 목록을 사용하고, 디렉터리 mtime이 바뀌었을 때만 다시 읽음
+  (stat 한 번만 이벤트 루프에서, listdir은 스레드에서)
+- 같은 워커 안의 전달은 InMemoryChannelLayer와 동일 (큐에 바로 넣음)
+
+settings.py 예시:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "rooms.layers.UnixSocketChannelLayer",
+            "CONFIG": {"path": "/tmp/heartsync-layer"},
+        }
+    }
+
+주의
+- 메시지는 pickle로 전달하므로 소켓 디렉터리는 서버 실행 계정만 접근 가능(0700)해야 함
+- 응답이 없는 워커(프로세스 종료)는 group_send 중에 발견되면 멤버십에서 제거됨
+"""
+import asyncio
+import atexit
+import logging
+import os
+import pickle
+import random
+import string
+import struct
+import tempfile
+import time
+from pathlib import Path
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+
+logger = logging.getLogger(__name__)
+
+# 프레임 길이 헤더 (uint32)
+_LENGTH = struct.Struct('!I')
+
+# 워커 간 연결의 송신 버퍼가 이 크기를 넘으면 drain() 대기
+WRITE_BUFFER_HIGH_WATER = 1024 * 1024
+
+# 파일 시스템 mtime 해상도 여유 (초)
+# 목록을 읽기 시작한 시각이 mtime에서 이만큼 지나지 않았으면 같은 mtime 안에 또 바뀌었을 수 있으므로 캐시를 믿지 않음
+MTIME_GRANULARITY = 0.05
+
+
+def _random_name(length=12):
+    return ''.join(random.choice(string.ascii_letters) for _ in range(length))
+
+
+class UnixSocketChannelLayer(InMemoryChannelLayer):
+    """
+    워커(프로세스)별 Unix 소켓 + 공유 디렉터리 그룹 멤버십
+    채널 이름: specific.<worker_id>!<random> → worker_id로 어느 워커의 채널인지 판단
+    """
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path=None, expiry=60, group_expiry=86400, capacity=100,
+                 channel_capacity=None, **kwargs):
+        super().__init__(
+            expiry=expiry,
+            group_expiry=group_expiry,
+            capacity=capacity,
+            channel_capacity=channel_capacity,
+            **kwargs,
+        )
+        self.path = Path(path or Path(tempfile.gettempdir()) / 'heartsync-layer')
+        self.groups_path = self.path / 'groups'
+        self.groups_path.mkdir(parents=True, exist_ok=True)
+        self._groups_dir = str(self.groups_path)
+        os.chmod(self.path, 0o700)
+
+        self.worker_id = f"w{os.getpid()}{_random_name(6)}"
+        self.socket_path = self.path / f"{self.worker_id}.sock"
+        self._server = None
+        self._writers = {}  # worker_id -> StreamWriter
+        self._peers = set()  # 다른 워커에서 들어온 연결을 읽는 태스크
+        self._loop = None
+        self._memberships = set()  # 이 워커가 추가한 (group, channel) - 종료 시 정리용
+        self._members = {}  # group -> (디렉터리 mtime_ns, 읽기 시작 시각, 멤버 목록)
+        atexit.register(self._cleanup)
+
+    # ===== 소켓 =====
+
+    async def _ensure_server(self):
+        """현재 이벤트 루프에서 수신 소켓 준비 (루프가 바뀌면 다시 생성)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._writers = {}
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=str(self.socket_path))
+
+    async def _handle_peer(self, reader, writer):
+        """다른 워커가 보낸 프레임을 로컬 채널 큐에 넣음"""
+        task = asyncio.current_task()
+        self._peers.add(task)
+        try:
+            while True:
+                header = await reader.readexactly(_LENGTH.size)
+                data = await reader.readexactly(_LENGTH.unpack(header)[0])
+                channels, blob = pickle.loads(data)
+                for channel in channels:
+                    try:
+                        self._put_local(channel, pickle.loads(blob))
+                    except ChannelFull:
+                        pass
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # 상대 워커 종료 또는 이 워커의 이벤트 루프 종료
+            pass
+        finally:
+            self._peers.discard(task)
+            writer.close()
+
+    def _put_local(self, channel, message):
+        """이 워커의 채널 큐에 메시지 추가 (InMemoryChannelLayer.send와 동일)"""
+        queue = self.channels.setdefault(
+            channel, asyncio.Queue(maxsize=self.get_capacity(channel))
+        )
+        try:
+            queue.put_nowait((time.time() + self.expiry, message))
+        except asyncio.QueueFull:
+            raise ChannelFull(channel)
+
+    def _worker_of(self, channel):
+        """채널 이름에서 워커 ID 추출 (프로세스 전용 채널이 아니면 None)"""
+        if '!' not in channel:
+            return None
+        return channel[:channel.index('!')].rsplit('.', 1)[-1]
+
+    async def _writer_for(self, worker_id):
+        """다른 워커로 가는 연결 (워커당 하나를 계속 재사용)"""
+        await self._ensure_server()
+        writer = self._writers.get(worker_id)
+        if writer is not None and not writer.is_closing():
+            return writer
+        try:
+            _, writer = await asyncio.open_unix_connection(str(self.path / f"{worker_id}.sock"))
+        except (ConnectionRefusedError, FileNotFoundError):
+            self._writers.pop(worker_id, None)
+            return None
+        self._writers[worker_id] = writer
+        return writer
+
+    async def _send_remote(self, worker_id, channels, message):
+        """
+        다른 워커로 전달 (채널 여러 개를 프레임 하나로)
+        반환: 워커가 살아 있으면 True
+        """
+        writer = await self._writer_for(worker_id)
+        if writer is None:
+            return False
+        blob = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        data = pickle.dumps((channels, blob), pickle.HIGHEST_PROTOCOL)
+        writer.write(_LENGTH.pack(len(data)) + data)
+        # 받는 워커가 밀리면 보내는 쪽도 잠시 대기 (메모리 무한 증가 방지)
+        if writer.transport.get_write_buffer_size() > WRITE_BUFFER_HIGH_WATER:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                self._writers.pop(worker_id, None)
+        return True
+
+    # ===== Channel layer API =====
+
+    async def new_channel(self, prefix="specific."):
+        await self._ensure_server()
+        return "%s.%s!%s" % (prefix, self.worker_id, _random_name())
+
+    async def receive(self, channel):
+        await self._ensure_server()
+        return await super().receive(channel)
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        worker_id = self._worker_of(channel)
+        if worker_id is None or worker_id == self.worker_id:
+            await super().send(channel, message)
+        else:
+            await self._send_remote(worker_id, [channel], message)
+
+    # ===== Groups extension =====
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        group_path = self.groups_path / group
+        try:
+            group_path.mkdir(exist_ok=True)
+            (group_path / channel).touch()
+        except FileNotFoundError:
+            # 다른 워커가 빈 그룹 디렉터리를 막 지운 경우 - 한 번 더 시도
+            group_path.mkdir(exist_ok=True)
+            (group_path / channel).touch()
+        self._memberships.add((group, channel))
+
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        self._discard_file(group, channel)
+        self._memberships.discard((group, channel))
+
+    def _discard_file(self, group, channel):
+        group_path = self.groups_path / group
+        try:
+            (group_path / channel).unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            group_path.rmdir()  # 비었을 때만 삭제됨
+        except OSError:
+            pass
+
+    async def _group_members(self, group):
+        """그룹 멤버 목록 (디렉터리 mtime이 그대로면 캐시, 바뀌었으면 스레드에서 다시 읽음)"""
+        group_path = os.path.join(self._groups_dir, group)  # Path보다 가벼움 (메시지마다 호출)
+        try:
+            mtime_ns = os.stat(group_path).st_mtime_ns
+        except FileNotFoundError:
+            self._members.pop(group, None)
+            return []
+        cached = self._members.get(group)
+        if cached is not None and cached[0] == mtime_ns and cached[1] - mtime_ns / 1e9 > MTIME_GRANULARITY:
+            return cached[2]
+        read_at = time.time()
+        try:
+            members = await asyncio.to_thread(os.listdir, group_path)
+        except FileNotFoundError:
+            self._members.pop(group, None)
+            return []
+        self._members[group] = (mtime_ns, read_at, members)
+        return members
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        members = await self._group_members(group)
+        if not members:
+            return
+
+        # 워커별로 묶어서 워커당 프레임 한 번
+        by_worker = {}
+        for channel in members:
+            by_worker.setdefault(self._worker_of(channel), []).append(channel)
+
+        for worker_id, channels in by_worker.items():
+            if worker_id is None or worker_id == self.worker_id:
+                for channel in channels:
+                    try:
+                        await super().send(channel, message)
+                    except ChannelFull:
+                        pass
+            elif not await self._send_remote(worker_id, channels, message):
+                # 종료된 워커의 멤버십 정리
+                for channel in channels:
+                    self._discard_file(group, channel)
+
+    # ===== Flush / 종료 =====
+
+    async def flush(self):
+        await super().flush()
+        for group, channel in list(self._memberships):
+            self._discard_file(group, channel)
+        self._memberships.clear()
+        self._members.clear()
+
+    async def close(self):
+        """워커 간 연결과 수신 소켓 닫기"""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        for task in list(self._peers):
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        self._loop = None
+
+    def _cleanup(self):
+        """프로세스 종료 시 소켓 파일과 이 워커의 멤버십 제거"""
+        for group, channel in list(self._memberships):
+            self._discard_file(group, channel)
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,74 @@
+"""
+로비 상태 푸시 (RoomDetailView 폴링 대체)
+- REST 뷰가 방/플레이어를 바꾸면 방 그룹(game_<room_id>, 관전자 그룹)에 작은 변경분(lobby_update) 전송
+- WebSocket 연결 직후에는 방 전체 상태(lobby_snapshot)를 한 번 전송
+- version은 room_cache의 방 버전 (GET /api/rooms/{room_id}/ 응답 ETag와 같은 값)
+
+전송은 DB 커밋 후 (롤백된 변경이 나가지 않도록, room_cache.bump_on_commit 다음 순서)
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from .serializers import PlayerSerializer
+from . import room_cache
+from . import spectators
+from .resume import replay
+
+# lobby_update의 event 종류
+PLAYER_JOINED = 'player_joined'
+PLAYER_LEFT = 'player_left'
+GAME_STARTED = 'game_started'
+ROOM_DELETED = 'room_deleted'
+
+
+def publish(room_id, event, internal=None, **fields):
+    """
+    커밋 후 방 그룹에 lobby_update 전송 (동기 REST 뷰에서 호출)
+    internal: 그룹 메시지에만 붙이는 값 (워커 간 전달용, 클라이언트 프레임에는 포함 안 됨)
+    """
+    def send():
+        payload = {
+            'type': 'lobby_update',
+            'event': event,
+            'room_id': room_id,
+            'version': room_cache.get_version(room_id),
+            **fields,
+        }
+        channel_layer = get_channel_layer()
+        message = replay.event(room_id, 'send_lobby_update', payload)
+        if internal:
+            message.update(internal)
+        async_to_sync(channel_layer.group_send)(f'game_{room_id}', message)
+        async_to_sync(spectators.forward)(channel_layer, room_id, message)
+    transaction.on_commit(send)
+
+
+def player_joined(player):
+    publish(player.room_id, PLAYER_JOINED, player=dict(PlayerSerializer(player).data))
+
+
+def player_left(room_id, player_id):
+    publish(room_id, PLAYER_LEFT, player_id=player_id)
+
+
+def game_started(room, score_channel=None):
+    """score_channel: 점수판을 가진 워커의 수신 채널 (멀티 워커일 때, scoring.open_inbox)"""
+    publish(room.room_id, GAME_STARTED, internal={'score_channel': score_channel}, game_settings={
+        'mode': room.mode,
+        'time_limit': room.time_limit_seconds,
+        'bpm_min': room.bpm_min,
+        'bpm_max': room.bpm_max,
+    }, started_at=room.started_at.isoformat())
+
+
+def room_deleted(room_id):
+    publish(room_id, ROOM_DELETED)
+
+
+def snapshot(room_id):
+    """연결 직후 보낼 방 전체 상태 (방이 없으면 None, 캐시된 방 상세 재사용)"""
+    version = room_cache.get_version(room_id)
+    data = room_cache.load_detail(room_id, version)
+    if data is None:
+        return None
+    return {'type': 'lobby_snapshot', 'version': version, **data}
@@ -0,0 +1,102 @@
+"""
+브로드캐스트 직렬화 마이크로 벤치마크
+python manage.py bench_broadcast [--iterations 2000] [--sizes 2 4 16]
+
+구독자 수(방 인원)별로 group_send 1회당 CPU 시간을 측정
+- legacy: 받는 Consumer마다 핸들러에서 json.dumps (기존 방식)
+- pre-encoded: 보내는 쪽에서 한 번만 인코딩, 핸들러는 그대로 전달 (Outbox를 거쳐 소켓 전송까지)
+"""
+import asyncio
+import json
+import time
+from django.core.management.base import BaseCommand
+from channels.layers import InMemoryChannelLayer
+from rooms import metrics
+from rooms.consumers import GameConsumer
+from rooms.outbox import Outbox
+from rooms.protocol import group_event
+
+
+class LegacyConsumer(GameConsumer):
+    """기존 방식 비교용: 받는 쪽에서 매번 직렬화 (전송 경로는 GameConsumer와 같은 Outbox)"""
+    @metrics.handler
+    async def send_heart_rate(self, event):
+        await self.outbox.put_latest({
+            'text': json.dumps({
+                'type': 'heart_rate',
+                'player_id': event['player_id'],
+                'bpm': event['bpm'],
+            }),
+            'key': event['player_id'],
+        })
+
+
+def legacy_event(player_id, bpm):
+    return {'type': 'send_heart_rate', 'player_id': player_id, 'bpm': bpm}
+
+
+def pre_encoded_event(player_id, bpm):
+    return group_event('send_heart_rate', {
+        'type': 'heart_rate',
+        'player_id': player_id,
+        'bpm': bpm,
+    })
+
+
+async def make_consumer(consumer_class, layer):
+    """connect() 없이 그룹 이벤트 핸들러만 쓸 수 있는 Consumer (소켓 전송은 횟수만 셈)"""
+    consumer = consumer_class()
+    consumer.channel_name = await layer.new_channel()
+    consumer.binary = False
+    consumer.sent = 0
+
+    async def send(text_data=None, bytes_data=None, close=False):
+        consumer.sent += 1
+
+    async def evict():
+        raise RuntimeError("benchmark consumer evicted")
+
+    consumer.send = send
+    consumer.outbox = Outbox(consumer.send_frame, evict)
+    return consumer
+
+
+async def run_case(consumer_class, make_event, subscribers, iterations):
+    """channel layer를 거쳐 구독자 전원에게 전달되는 비용 측정 (브로드캐스트 1회당 µs)"""
+    layer = InMemoryChannelLayer(capacity=iterations + 1)
+    group = 'game_bench'
+    consumers = []
+    for _ in range(subscribers):
+        consumer = await make_consumer(consumer_class, layer)
+        await layer.group_add(group, consumer.channel_name)
+        consumers.append(consumer)
+
+    player_id = '8a6e0804-2bd0-4672-b79e-d97358845ebf'
+    start = time.process_time()
+    for i in range(iterations):
+        await layer.group_send(group, make_event(player_id, 60 + i % 100))
+        for consumer in consumers:
+            event = await layer.receive(consumer.channel_name)
+            await consumer.send_heart_rate(event)
+        await asyncio.sleep(0)  # outbox 전송 태스크 실행
+    elapsed = time.process_time() - start
+    if any(consumer.sent != iterations for consumer in consumers):
+        raise RuntimeError("not every broadcast reached every subscriber")
+    return elapsed / iterations * 1_000_000
+
+
+class Command(BaseCommand):
+    help = "브로드캐스트 1회당 CPU 시간 측정 (legacy vs pre-encoded)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--sizes', type=int, nargs='+', default=[2, 4, 16])
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(f"{'subscribers':>11} {'legacy µs':>10} {'pre-encoded µs':>15} {'saved':>7}")
+        for size in options['sizes']:
+            legacy = asyncio.run(run_case(LegacyConsumer, legacy_event, size, iterations))
+            encoded = asyncio.run(run_case(GameConsumer, pre_encoded_event, size, iterations))
+            saved = (1 - encoded / legacy) * 100 if legacy else 0
+            self.stdout.write(f"{size:>11} {legacy:>10.1f} {encoded:>15.1f} {saved:>6.1f}%")
@@ -0,0 +1,113 @@
+"""
+채널 레이어 벤치마크 (InMemoryChannelLayer vs UnixSocketChannelLayer)
+python manage.py bench_channel_layer [--messages 2000] [--subscribers 4] [--workers 2]
+
+방 하나(그룹 하나)에 구독자를 두고 group_send 했을 때
+- 지연: 메시지를 하나씩 보내고 모든 구독자가 받을 때까지 기다리면서 측정 (p50/p95/p99)
+- 처리량: 쉬지 않고 보냈을 때 초당 전달된 메시지 수 (구독자 기준)
+
+UnixSocket 레이어는 워커 여러 개를 같은 프로세스 안의 레이어 인스턴스 여러 개로 흉내냄
+(구독자를 워커에 번갈아 배치, 보내는 쪽은 첫 번째 워커) → 소켓 전달 경로를 그대로 거침
+"""
+import asyncio
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from channels.layers import InMemoryChannelLayer
+from rooms.layers import UnixSocketChannelLayer
+
+GROUP = 'game_bench'
+FRAME = '{"type":"heart_rate","player_id":"8a6e0804-2bd0-4672-b79e-d97358845ebf","bpm":%d}'
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def subscribe(layers, subscribers):
+    """구독자를 레이어(워커)에 번갈아 배치"""
+    channels = []
+    for i in range(subscribers):
+        layer = layers[i % len(layers)]
+        channel = await layer.new_channel()
+        await layer.group_add(GROUP, channel)
+        channels.append((layer, channel))
+    return channels
+
+
+async def measure_latency(layers, channels, messages):
+    """한 번에 메시지 하나씩: group_send → 모든 구독자 receive 까지"""
+    sender = layers[0]
+    latencies = []
+    for i in range(messages):
+        sent_at = time.perf_counter()
+        await sender.group_send(GROUP, {'type': 'send_heart_rate', 'text': FRAME % (60 + i % 100)})
+        received = await asyncio.gather(*(layer.receive(channel) for layer, channel in channels))
+        now = time.perf_counter()
+        latencies.extend(now - sent_at for _ in received)
+    return latencies
+
+
+async def measure_throughput(layers, channels, messages):
+    """쉬지 않고 보내고 모든 구독자가 전부 받을 때까지의 처리량"""
+    sender = layers[0]
+
+    async def drain(layer, channel):
+        for _ in range(messages):
+            await layer.receive(channel)
+
+    receivers = [asyncio.create_task(drain(layer, channel)) for layer, channel in channels]
+    start = time.perf_counter()
+    for i in range(messages):
+        await sender.group_send(GROUP, {'type': 'send_heart_rate', 'text': FRAME % (60 + i % 100)})
+        if i % 50 == 0:
+            await asyncio.sleep(0)  # 받는 쪽에 차례를 넘겨 큐가 넘치지 않게
+    await asyncio.gather(*receivers)
+    return messages * len(channels) / (time.perf_counter() - start)
+
+
+async def run_case(layers, subscribers, messages):
+    for layer in layers:
+        layer.capacity = messages + 1
+    channels = await subscribe(layers, subscribers)
+    latencies = await measure_latency(layers, channels, messages)
+    throughput = await measure_throughput(layers, channels, messages)
+    for layer, channel in channels:
+        await layer.group_discard(GROUP, channel)
+    for layer in layers:
+        await layer.close()
+    return {
+        'throughput': throughput,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = "InMemoryChannelLayer와 UnixSocketChannelLayer의 처리량/지연 비교"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--subscribers', type=int, default=4)
+        parser.add_argument('--workers', type=int, default=2)
+
+    def handle(self, *args, **options):
+        messages = options['messages']
+        subscribers = options['subscribers']
+        workers = options['workers']
+
+        results = [('in-memory', asyncio.run(run_case([InMemoryChannelLayer()], subscribers, messages)))]
+        with tempfile.TemporaryDirectory(prefix='hs-bench-') as path:
+            layers = [UnixSocketChannelLayer(path=path) for _ in range(workers)]
+            results.append((f"unix-socket x{workers}", asyncio.run(run_case(layers, subscribers, messages))))
+            for layer in layers:
+                layer._cleanup()
+
+        self.stdout.write(f"{messages} group_send x {subscribers} subscribers")
+        self.stdout.write(f"{'layer':<16} {'msg/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, r in results:
+            self.stdout.write(
+                f"{name:<16} {r['throughput']:>10.0f} {r['p50']:>8.3f} {r['p95']:>8.3f} {r['p99']:>8.3f}"
+            )
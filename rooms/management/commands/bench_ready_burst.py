@@ -0,0 +1,91 @@
+"""
+READY 버스트 벤치마크 (Consumer DB 호출)
+python manage.py bench_ready_burst [--rooms 50] [--players 4]
+
+방마다 모든 플레이어가 동시에 player_ready를 보냈을 때 DB 기록에 걸린 시간
+- per-player: 플레이어마다 기본 database_sync_to_async로 UPDATE (기존 방식)
+- coalesced: rooms.db.status_writer가 방별로 모아서 UPDATE 한 번
+
+현재 DATABASES 설정(WAL, CONN_MAX_AGE 등)을 그대로 사용
+벤치용 방을 만들고 끝나면 삭제함
+"""
+import asyncio
+import time
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from rooms.db import status_writer
+from rooms.models import Room, Player
+
+
+def create_rooms(rooms, players):
+    created = []
+    for _ in range(rooms):
+        room = Room.objects.create(player_count=players)
+        ids = [
+            Player.objects.create(room=room, nickname=f'bench{i}', is_host=(i == 0), slot=i).player_id
+            for i in range(players)
+        ]
+        created.append((room.room_id, ids))
+    return created
+
+
+def reset(created):
+    room_ids = [room_id for room_id, _ in created]
+    Player.objects.filter(room_id__in=room_ids).update(status=Player.Status.WAITING)
+    Room.objects.filter(room_id__in=room_ids).update(ready_count=0)
+
+
+@database_sync_to_async
+def set_ready_per_player(room_id, player_id):
+    """기존 방식: 플레이어 하나씩 트랜잭션"""
+    with transaction.atomic():
+        updated = Player.objects.filter(
+            player_id=player_id, room_id=room_id
+        ).exclude(status=Player.Status.READY).update(status=Player.Status.READY)
+        if updated:
+            Room.objects.filter(room_id=room_id).update(ready_count=F('ready_count') + 1)
+
+
+async def run_per_player(created):
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        set_ready_per_player(room_id, player_id)
+        for room_id, ids in created for player_id in ids
+    ))
+    return time.perf_counter() - start
+
+
+async def run_coalesced(created):
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        status_writer.set_status(room_id, player_id, Player.Status.READY)
+        for room_id, ids in created for player_id in ids
+    ))
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "방 전체 동시 ready 시 DB 기록 시간 비교 (per-player vs coalesced)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=50)
+        parser.add_argument('--players', type=int, default=4)
+
+    def handle(self, *args, **options):
+        created = create_rooms(options['rooms'], options['players'])
+        try:
+            per_player = asyncio.run(run_per_player(created))
+            reset(created)
+            writes_before = status_writer.writes
+            coalesced = asyncio.run(run_coalesced(created))
+            writes = status_writer.writes - writes_before
+        finally:
+            Room.objects.filter(room_id__in=[room_id for room_id, _ in created]).delete()
+
+        requests = options['rooms'] * options['players']
+        self.stdout.write(f"{options['rooms']} rooms x {options['players']} players ready at once")
+        self.stdout.write(f"{'mode':<11} {'ms':>9} {'transactions':>13}")
+        self.stdout.write(f"{'per-player':<11} {per_player * 1000:>9.1f} {requests:>13}")
+        self.stdout.write(f"{'coalesced':<11} {coalesced * 1000:>9.1f} {writes:>13}")
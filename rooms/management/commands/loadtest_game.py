@@ -0,0 +1,238 @@
+"""
+GameConsumer 부하 테스트 (네트워크 없이 프로세스 안에서 실행)
+python manage.py loadtest_game [--rooms 10] [--players 4] [--rate 2] [--duration 5] [--tick-hz N]
+                               [--keyframe-interval N]
+
+heart_sync_backend.asgi.application에 WebsocketCommunicator로 직접 연결해서 실제 흐름 그대로 진행
+1. REST로 방 생성 / 참가 (django.test.Client)
+2. 플레이어마다 WebSocket 연결 → player_ready 전송 → 모두 ready 알림을 받을 때까지 대기
+3. REST로 게임 시작
+4. 플레이어마다 --rate Hz로 heart_rate 전송 (--duration초)
+
+측정
+- 지연: heart_rate 전송 → 같은 방 각 소켓이 그 값을 받을 때까지 (p50/p95/p99)
+- 처리량: 전달된 프레임 수 / 초, 서버 → 클라이언트 바이트 수 / 초
+- CPU: 전송 구간의 프로세스 CPU 시간 / 전달된 프레임 수 (부하 생성기 자신의 비용 포함)
+
+DB는 임시 파일에 만든 테스트 DB를 사용하고 끝나면 삭제
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+# heart_rate 값으로 어떤 전송인지 구분 (플레이어별로 100~999 순환)
+BPM_BASE = 100
+BPM_SPAN = 900
+RECEIVE_TIMEOUT = 30
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class LoadTest:
+    def __init__(self, rooms, players, rate, duration):
+        self.rooms = rooms
+        self.players = players
+        self.rate = rate
+        self.duration = duration
+        self.client = Client()
+        self.sockets = []  # (room_id, player_id, communicator)
+        self.sent_at = {}  # (player_id, bpm) -> perf_counter
+        self.latencies = []
+        self.delivered = 0
+        self.sent = 0
+        self.received_bytes = 0
+        self.measuring = False
+        self.ready_seen = {}  # communicator -> 받은 player_ready 수
+        self.last_seen = {}  # (communicator, player_id) -> 마지막으로 받은 bpm (스냅샷 중복 제외)
+
+    # ===== REST =====
+
+    def post(self, path, data):
+        response = self.client.post(path, data, content_type='application/json')
+        if response.status_code >= 400:
+            raise RuntimeError(f"{path} -> {response.status_code} {response.content[:200]!r}")
+        return response.json()
+
+    def create_rooms(self):
+        created = []
+        for r in range(self.rooms):
+            room = self.post('/api/rooms/', {'host_nickname': f'host{r}'})
+            player_ids = [room['players'][0]['player_id']]
+            tokens = [room['session_token']]
+            for p in range(1, self.players):
+                joined = self.post('/api/rooms/join/', {
+                    'room_code': room['room_code'],
+                    'nickname': f'p{r}-{p}',
+                })
+                player_ids.append(joined['player_id'])
+                tokens.append(joined['session_token'])
+            created.append((room['room_id'], player_ids, tokens))
+        return created
+
+    def start_games(self, created):
+        for room_id, player_ids, _ in created:
+            self.post(f'/api/rooms/{room_id}/start/', {
+                'player_id': player_ids[0],
+                'mode': 'steady_beat',
+                'time_limit_seconds': int(self.duration) + 60,
+                'bpm_min': 60,
+                'bpm_max': 180,
+            })
+
+    # ===== WebSocket =====
+
+    async def connect(self, created):
+        from heart_sync_backend.asgi import application
+
+        for room_id, player_ids, tokens in created:
+            for player_id, token in zip(player_ids, tokens):
+                communicator = WebsocketCommunicator(application, f'/ws/game/{room_id}/?token={token}')
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise RuntimeError(f"WebSocket connect failed: {room_id}")
+                self.sockets.append((room_id, player_id, communicator))
+                self.ready_seen[communicator] = 0
+
+    async def read(self, communicator):
+        """소켓 하나의 수신 루프"""
+        while True:
+            text = await communicator.receive_from(timeout=RECEIVE_TIMEOUT)
+            received_at = time.perf_counter()
+            if self.measuring:
+                self.received_bytes += len(text.encode())
+            message = json.loads(text)
+            kind = message.get('type')
+            if kind == 'player_ready':
+                self.ready_seen[communicator] += 1
+            elif kind == 'heart_rate':
+                self.record(communicator, message['player_id'], message['bpm'], received_at)
+            elif kind == 'room_snapshot':
+                for entry in message['players']:
+                    if entry['bpm'] == 0:  # delta 모드의 퇴장 표시
+                        continue
+                    self.record(communicator, entry['player_id'], entry['bpm'], received_at)
+
+    def record(self, communicator, player_id, bpm, received_at):
+        """처음 받은 값만 집계 (스냅샷은 같은 최신값을 다시 보낼 수 있음)"""
+        if self.last_seen.get((communicator, player_id)) == bpm:
+            return
+        self.last_seen[(communicator, player_id)] = bpm
+        sent_at = self.sent_at.get((player_id, bpm))
+        if sent_at is None or not self.measuring:
+            return
+        self.delivered += 1
+        self.latencies.append(received_at - sent_at)
+
+    async def ready_all(self):
+        for _, player_id, communicator in self.sockets:
+            await communicator.send_to(text_data=json.dumps({'type': 'player_ready', 'player_id': player_id}))
+        # 모든 소켓이 방 인원만큼 player_ready를 받을 때까지 대기
+        while any(seen < self.players for seen in self.ready_seen.values()):
+            await asyncio.sleep(0.01)
+
+    async def send_heart_rates(self, index, player_id, communicator):
+        """플레이어 하나의 전송 루프 (누적 오차 없는 주기, 플레이어마다 시작 시점 분산)"""
+        interval = 1 / self.rate
+        count = int(self.duration * self.rate)
+        start = time.perf_counter() + interval * (index % 97) / 97
+        for seq in range(count):
+            delay = start + seq * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            bpm = BPM_BASE + seq % BPM_SPAN
+            self.sent_at[(player_id, bpm)] = time.perf_counter()
+            await communicator.send_to(text_data=json.dumps({
+                'type': 'heart_rate', 'player_id': player_id, 'bpm': bpm,
+            }))
+            self.sent += 1
+            if seq % max(int(self.rate * 5), 1) == 0:
+                await communicator.send_to(text_data='{"type":"ping"}')
+
+    async def run(self):
+        created = await sync_to_async(self.create_rooms)()
+        await self.connect(created)
+        readers = [asyncio.create_task(self.read(c)) for _, _, c in self.sockets]
+        try:
+            await self.ready_all()
+            await sync_to_async(self.start_games)(created)
+
+            self.measuring = True
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(
+                self.send_heart_rates(i, player_id, communicator)
+                for i, (_, player_id, communicator) in enumerate(self.sockets)
+            ))
+            await asyncio.sleep(0.5)  # 전송 중인 프레임 수신 대기
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            self.measuring = False
+        finally:
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+            for _, _, communicator in self.sockets:
+                await communicator.disconnect()
+        return wall, cpu
+
+
+class Command(BaseCommand):
+    help = "WebsocketCommunicator로 R개 방 x P명 심박수 부하 테스트 (지연/처리량/CPU)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=10)
+        parser.add_argument('--players', type=int, default=4)
+        parser.add_argument('--rate', type=float, default=2.0, help="플레이어당 초당 heart_rate 수")
+        parser.add_argument('--duration', type=float, default=5.0, help="전송 시간 (초)")
+        parser.add_argument('--tick-hz', type=float, default=None,
+                            help="HEART_RATE_TICK_HZ 덮어쓰기 (0이면 샘플마다 브로드캐스트)")
+        parser.add_argument('--keyframe-interval', type=int, default=None,
+                            help="HEART_RATE_KEYFRAME_INTERVAL 덮어쓰기 (집계 모드 delta 전송)")
+
+    def handle(self, *args, **options):
+        if options['tick_hz'] is not None:
+            settings.HEART_RATE_TICK_HZ = options['tick_hz']
+        if options['keyframe_interval'] is not None:
+            settings.HEART_RATE_KEYFRAME_INTERVAL = options['keyframe_interval']
+
+        with tempfile.TemporaryDirectory(prefix='hs-loadtest-') as path:
+            settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(path, 'loadtest.sqlite3')
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                test = LoadTest(options['rooms'], options['players'], options['rate'], options['duration'])
+                wall, cpu = asyncio.run(test.run())
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.report(test, wall, cpu, options)
+
+    def report(self, test, wall, cpu, options):
+        tick = getattr(settings, 'HEART_RATE_TICK_HZ', 0)
+        keyframe = getattr(settings, 'HEART_RATE_KEYFRAME_INTERVAL', 0)
+        self.stdout.write(
+            f"{options['rooms']} rooms x {options['players']} players, "
+            f"{options['rate']:g} Hz, {options['duration']:g}s, tick_hz={tick:g}, keyframe={keyframe}"
+        )
+        self.stdout.write(f"sent            {test.sent}")
+        self.stdout.write(f"delivered       {test.delivered}")
+        self.stdout.write(f"msg/s           {test.delivered / wall:.0f}")
+        self.stdout.write(f"KB/s out        {test.received_bytes / wall / 1024:.1f}")
+        if test.latencies:
+            for p in (50, 95, 99):
+                self.stdout.write(f"p{p:<2} ms         {percentile(test.latencies, p) * 1000:.2f}")
+        if test.delivered:
+            self.stdout.write(f"CPU µs/msg      {cpu / test.delivered * 1e6:.1f}")
@@ -0,0 +1,43 @@
+"""
+오래된 방 정리
+python manage.py reap_rooms [--batch-size 500] [--finished-ttl 600] [--waiting-ttl 3600]
+
+FINISHED/WAITING 방 중 보관 시간이 지난 방을 배치 단위로 삭제하고
+배치마다 삭제한 행 수와 걸린 시간을 출력 (cron으로 주기 실행)
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rooms import reaper
+from rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = "보관 시간이 지난 FINISHED/WAITING 방을 배치 단위로 삭제"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'ROOM_REAP_BATCH_SIZE', 500))
+        parser.add_argument('--finished-ttl', type=int,
+                            default=getattr(settings, 'ROOM_FINISHED_TTL_SECONDS', 600))
+        parser.add_argument('--waiting-ttl', type=int,
+                            default=getattr(settings, 'ROOM_WAITING_TTL_SECONDS', 3600))
+
+    def handle(self, *args, **options):
+        results = reaper.reap(
+            batch_size=options['batch_size'],
+            ttls={
+                Room.Status.FINISHED: options['finished_ttl'],
+                Room.Status.WAITING: options['waiting_ttl'],
+            },
+        )
+
+        self.stdout.write(f"{'batch':>5} {'status':<9} {'rooms':>7} {'players':>8} {'samples':>9} {'ms':>8}")
+        for i, r in enumerate(results, 1):
+            self.stdout.write(
+                f"{i:>5} {r.status:<9} {r.rooms:>7} {r.players:>8} {r.samples:>9} {r.seconds * 1000:>8.1f}"
+            )
+        self.stdout.write(
+            f"{'total':>5} {'':<9} {sum(r.rooms for r in results):>7} "
+            f"{sum(r.players for r in results):>8} {sum(r.samples for r in results):>9} "
+            f"{sum(r.seconds for r in results) * 1000:>8.1f}"
+        )
@@ -0,0 +1,278 @@
+"""
+프로세스 내 메트릭 (Prometheus 텍스트 형식, 외부 라이브러리 없음)
+- Counter / Histogram: 고정 버킷, 기록 한 번 = bisect + 정수 덧셈 몇 번 (수 µs 이하)
+- Gauge: 값을 따로 저장하지 않고 수집(/metrics 요청) 시점에 함수로 계산
+- 레이블은 호출하는 쪽에서 고정된 값만 사용 (메시지 타입, 핸들러 이름, URL 이름)
+  → room_id 같은 끝없이 늘어나는 값은 레이블로 쓰지 않고 합계/최댓값으로 집계
+
+GET /metrics/ 로 노출 (워커가 여러 개면 워커별 값 - 수집 쪽에서 합산)
+"""
+import bisect
+import functools
+import threading
+import time
+from asgiref.sync import iscoroutinefunction
+from channels.layers import get_channel_layer
+from django.http import HttpResponse
+
+# 초 단위 지연 버킷 (0.1ms ~ 2.5s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}  # 레이블 값 tuple -> 누적값
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values = {}  # 레이블 값 tuple -> [버킷별 개수..., +Inf 개수, 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def time(self, *labels):
+        """동기/비동기 함수 실행 시간을 기록하는 데코레이터"""
+        def decorator(func):
+            if iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start, *labels)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *labels)
+            return wrapper
+        return decorator
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, counts in list(self._values.items()):
+            counts = list(counts)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', bound))} {cumulative}"
+            cumulative += counts[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {counts[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """수집 시점에 func()로 값 계산 (func는 숫자 또는 {레이블 값 tuple: 숫자} 반환)"""
+    metric_type = 'gauge'
+
+    def __init__(self, name, help_text, func, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.labelnames = labelnames
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        value = self.func()
+        if isinstance(value, dict):
+            for labels, v in value.items():
+                yield f"{self.name}{_format_labels(self.labelnames, labels)} {v}"
+        else:
+            yield f"{self.name} {value}"
+
+
+class CounterFunc(Gauge):
+    """수집 시점에 func()로 읽는 counter (다른 모듈이 이미 세고 있는 누적값)"""
+    metric_type = 'counter'
+
+
+# ===== 메트릭 정의 =====
+
+ws_messages = Counter(
+    'heartsync_ws_messages_total', "WebSocket으로 받은 메시지 수", ('type',))
+ws_receive_seconds = Histogram(
+    'heartsync_ws_receive_seconds', "GameConsumer.receive 처리 시간", ('type',))
+ws_send_seconds = Histogram(
+    'heartsync_ws_send_seconds', "그룹 이벤트 핸들러(send_*) 처리 시간", ('handler',))
+group_delivery_seconds = Histogram(
+    'heartsync_group_delivery_seconds', "group_send → 핸들러 도착까지 시간 (채널 레이어 대기 포함)", ('handler',))
+db_seconds = Histogram(
+    'heartsync_db_seconds', "Consumer DB 호출 시간 (스레드 풀 대기 포함)", ('call',))
+http_seconds = Histogram(
+    'heartsync_http_request_seconds', "REST API 처리 시간", ('view', 'method', 'status'))
+ws_outbox_superseded = Counter(
+    'heartsync_ws_outbox_superseded_total', "느린 소켓에서 더 새 값에 밀려 보내지 않은 심박수 이벤트 수")
+ws_evicted = Counter(
+    'heartsync_ws_evicted_total', "송신이 밀려서 끊은 연결 수")
+heart_rate_limited = Counter(
+    'heartsync_heart_rate_limited_total', "수신 제한으로 합치거나(coalesced) 버린(dropped) heart_rate 수", ('result',))
+
+
+def handler(func):
+    """
+    Consumer 그룹 이벤트 핸들러(send_*)용 데코레이터
+    - 처리 시간 (ws_send_seconds)
+    - group_send 시각(event['sent_at'], protocol.group_event가 기록)부터 도착까지 (group_delivery_seconds)
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(self, event):
+        start = time.perf_counter()
+        sent_at = event.get('sent_at')
+        if sent_at is not None:
+            group_delivery_seconds.observe(time.monotonic() - sent_at, name)
+        try:
+            return await func(self, event)
+        finally:
+            ws_send_seconds.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+# 방별 연결 수 (GameConsumer connect/disconnect에서 갱신, 노출은 합계/방 수/최댓값만)
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def connection_opened(room_id):
+    with _connections_lock:
+        _connections[room_id] = _connections.get(room_id, 0) + 1
+
+
+def connection_closed(room_id):
+    with _connections_lock:
+        count = _connections.get(room_id, 0) - 1
+        if count > 0:
+            _connections[room_id] = count
+        else:
+            _connections.pop(room_id, None)
+
+
+def _connections_total():
+    return sum(list(_connections.values()))
+
+
+def _connections_max_per_room():
+    return max(list(_connections.values()), default=0)
+
+
+def _channel_queue_depth():
+    """InMemory 계열 채널 레이어의 채널별 대기 메시지 수 (다른 레이어면 비어 있음)"""
+    channels = getattr(get_channel_layer(), 'channels', None) or {}
+    depths = [queue.qsize() for queue in list(channels.values())]
+    return {('total',): sum(depths), ('max',): max(depths, default=0)}
+
+
+def _gauges():
+    from . import samples
+    from .db import status_writer
+    from .game_clock import game_clock
+    from .history import history
+    from .registry import registry
+    from .resume import replay
+    from .timers import ping_supervisor, resume_timers
+
+    return [
+        Gauge('heartsync_ws_connections', "열린 WebSocket 수", _connections_total),
+        Gauge('heartsync_ws_rooms', "WebSocket이 하나 이상 연결된 방 수", lambda: len(_connections)),
+        Gauge('heartsync_ws_room_connections_max', "방 하나의 최대 WebSocket 수", _connections_max_per_room),
+        Gauge('heartsync_channel_queue_depth', "채널 레이어 대기 메시지 수", _channel_queue_depth, ('stat',)),
+        Gauge('heartsync_sample_buffer_pending', "DB에 아직 기록하지 않은 심박수 샘플 수",
+              lambda: len(samples.buffer.pending)),
+        CounterFunc('heartsync_sample_buffer_dropped_total', "버퍼 상한 초과로 버린 샘플 수",
+                    lambda: samples.buffer.dropped),
+        CounterFunc('heartsync_status_writes_total', "StatusWriter가 실행한 트랜잭션 수",
+                    lambda: status_writer.writes),
+        Gauge('heartsync_games_playing', "게임 시계에 등록된 진행 중인 게임 수", lambda: len(game_clock)),
+        Gauge('heartsync_ping_supervised_connections', "ping 타임아웃을 감시 중인 연결 수 (게임 중인 플레이어 소켓)",
+              lambda: len(ping_supervisor)),
+        Gauge('heartsync_resume_pending', "ping 타임아웃 후 세션 재개를 기다리는 플레이어 수",
+              lambda: len(resume_timers)),
+        Gauge('heartsync_registry_rooms', "레지스트리에 캐시된 방 수", lambda: len(registry)),
+        Gauge('heartsync_history_rooms', "최근 심박수 기록을 보관 중인 방 수", lambda: len(history)),
+        Gauge('heartsync_replay_rooms', "재개용 제어 이벤트를 보관 중인 방 수", lambda: len(replay)),
+    ]
+
+
+METRICS = [
+    ws_messages, ws_receive_seconds, ws_send_seconds, group_delivery_seconds, db_seconds, http_seconds,
+    heart_rate_limited, ws_outbox_superseded, ws_evicted,
+]
+
+
+def render():
+    """Prometheus 텍스트 형식 (0.0.4)"""
+    lines = []
+    for metric in METRICS + _gauges():
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics/"""
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class MetricsMiddleware:
+    """REST 요청 처리 시간 기록 (레이블: URL 이름, 메서드, 상태 코드)"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+        if view != 'metrics':
+            http_seconds.observe(time.perf_counter() - start, view, request.method, response.status_code)
+        return response
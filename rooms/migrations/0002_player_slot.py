@@ -0,0 +1,29 @@
+# Generated by Django 5.1 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+def assign_slots(apps, schema_editor):
+    """기존 플레이어에게 입장 순서대로 slot 번호 부여"""
+    Player = apps.get_model("rooms", "Player")
+    slots = {}
+    for player in Player.objects.order_by("room_id", "joined_at"):
+        player.slot = slots.get(player.room_id, 0)
+        slots[player.room_id] = player.slot + 1
+        player.save(update_fields=["slot"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="player",
+            name="slot",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(assign_slots, migrations.RunPython.noop),
+    ]
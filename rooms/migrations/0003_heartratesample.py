@@ -0,0 +1,49 @@
+# Generated by Django 5.1 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0002_player_slot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HeartRateSample",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.PositiveSmallIntegerField()),
+                ("recorded_at_ms", models.BigIntegerField()),
+                ("bpm", models.PositiveSmallIntegerField()),
+                (
+                    "room",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="samples",
+                        to="rooms.room",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["recorded_at_ms"],
+                "indexes": [
+                    models.Index(
+                        fields=["room", "recorded_at_ms"],
+                        name="rooms_sample_room_time_idx",
+                    )
+                ],
+            },
+        ),
+    ]
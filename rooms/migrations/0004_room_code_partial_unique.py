@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0003_heartratesample"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="room",
+            name="room_code",
+            field=models.CharField(db_index=True, editable=False, max_length=6),
+        ),
+        migrations.AddConstraint(
+            model_name="room",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "finished"), _negated=True),
+                fields=("room_code",),
+                name="unique_active_room_code",
+            ),
+        ),
+    ]
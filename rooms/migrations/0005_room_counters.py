@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-18 12:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counters(apps, schema_editor):
+    """기존 방의 player_count/ready_count 계산"""
+    Room = apps.get_model("rooms", "Room")
+    rooms = Room.objects.annotate(
+        total=Count("players"),
+        ready=Count("players", filter=Q(players__status="ready")),
+    )
+    for room in rooms:
+        room.player_count = room.total
+        room.ready_count = room.ready
+        room.save(update_fields=["player_count", "ready_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0004_room_code_partial_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="room",
+            name="player_count",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="room",
+            name="ready_count",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0005_room_counters"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="player",
+            name="room",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="players",
+                to="rooms.room",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["room", "status"], name="rooms_player_room_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                fields=["status", "created_at"], name="rooms_room_status_created_idx"
+            ),
+        ),
+    ]
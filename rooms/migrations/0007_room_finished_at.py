@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-18 13:31
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_finished_at(apps, schema_editor):
+    """기존 종료된 방의 종료 시각 (시작 시각 + 제한 시간, 시작 기록이 없으면 생성 시각)"""
+    Room = apps.get_model("rooms", "Room")
+    for room in Room.objects.filter(status="finished", finished_at__isnull=True):
+        if room.started_at is not None:
+            room.finished_at = room.started_at + timedelta(seconds=room.time_limit_seconds)
+        else:
+            room.finished_at = room.created_at
+        room.save(update_fields=["finished_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0006_reaper_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="room",
+            name="finished_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                fields=["status", "finished_at"], name="rooms_room_status_finished_idx"
+            ),
+        ),
+        migrations.RunPython(fill_finished_at, migrations.RunPython.noop),
+    ]
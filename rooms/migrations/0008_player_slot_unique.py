@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0007_room_finished_at"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="player",
+            constraint=models.UniqueConstraint(
+                fields=("room", "slot"), name="unique_player_slot"
+            ),
+        ),
+    ]
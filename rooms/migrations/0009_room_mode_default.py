@@ -0,0 +1,24 @@
+# Generated by Django 5.1 on 2026-10-18 14:05
+# Room.mode의 default="steady_beat"는 모델에만 있고 0001_initial에는 빠져 있던 것 (slot 추가와 무관해서 따로 분리)
+# 컬럼 정의는 그대로 (SQLite는 테이블을 다시 만들지만 데이터/인덱스 동일) → 이전 0002를 이미 적용한 DB에도 적용 가능
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0008_player_slot_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="room",
+            name="mode",
+            field=models.CharField(
+                choices=[("steady_beat", "Steady Beat"), ("pulse_rush", "Pulse Rush")],
+                default="steady_beat",
+                max_length=20,
+            ),
+        ),
+    ]
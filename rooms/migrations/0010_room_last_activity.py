@@ -0,0 +1,38 @@
+# Generated by Django 5.1 on 2026-10-18 14:01
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_last_activity_at(apps, schema_editor):
+    """기존 방은 생성 시각을 마지막 활동 시각으로 (이전 WAITING 보관 기준과 같음)"""
+    Room = apps.get_model("rooms", "Room")
+    Room.objects.update(last_activity_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0009_room_mode_default"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="room",
+            name="rooms_room_status_created_idx",
+        ),
+        migrations.AddField(
+            model_name="room",
+            name="last_activity_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                fields=["status", "last_activity_at"],
+                name="rooms_room_status_activity_idx",
+            ),
+        ),
+        migrations.RunPython(fill_last_activity_at, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.utils import timezone
+from .codes import room_codes
 
 
 class Room(models.Model):
@@ -19,8 +21,8 @@ class Room(models.Model):
     # 방 고유 ID (시스템 내부용)
     room_id = models.CharField(max_length=8, primary_key=True, editable=False)
     
-    # 방 코드 (사용자 초대용, 중복 불가)
-    room_code = models.CharField(max_length=6, unique=True, editable=False)
+    # 방 코드 (사용자 초대용, 진행 중인 방끼리 중복 불가 - 종료된 방의 코드는 재사용)
+    room_code = models.CharField(max_length=6, db_index=True, editable=False)
     
     # 방 상태 (기본값: 대기 중)
     status = models.CharField(
@@ -31,6 +33,10 @@ class Room(models.Model):
     
     # 최대 인원 (기본값: 4명)
     max_players = models.IntegerField(default=4)
+
+    # 인원 카운터 (COUNT 쿼리 대신 사용, 조건부 F() UPDATE로만 변경)
+    player_count = models.PositiveSmallIntegerField(default=0)
+    ready_count = models.PositiveSmallIntegerField(default=0)
     
     # 방 생성 시간 (자동 저장)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -51,22 +57,49 @@ class Room(models.Model):
     
     # 게임 시작 시간 (게임 시작 전에는 None)
     started_at = models.DateTimeField(null=True, blank=True)
+
+    # 게임 종료 시간 (game_clock이 FINISHED로 바꿀 때 기록, reaper의 보관 시간 기준)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # 마지막 로비 활동 시간 (생성/참가/퇴장/ready, reaper의 WAITING 보관 시간 기준)
+    last_activity_at = models.DateTimeField(default=timezone.now)
     
     # ===== 메서드 =====
     def save(self, *args, **kwargs):
-        """room_id와 room_code 자동 생성"""
+        """room_id와 room_code 자동 생성 (room_code는 codes.room_codes에서 할당)"""
         if not self.room_id:
-            self.room_id = str(uuid.uuid4())[:8]
+            self.room_id = uuid.uuid4().hex[:8]
         if not self.room_code:
-            self.room_code = str(uuid.uuid4().int)[:6]
+            self.room_code = room_codes.allocate()
         super().save(*args, **kwargs)
     
+    def next_free_slot(self):
+        """비어 있는 가장 작은 slot 번호 (입장 시 플레이어에게 할당)"""
+        used = set(self.players.values_list('slot', flat=True))
+        slot = 0
+        while slot in used:
+            slot += 1
+        return slot
+
     def __str__(self):
         return f"Room {self.room_code}"
     
     # ===== 메타 정보 =====
     class Meta:
         ordering = ['-created_at']  # 최근 생성 순
+        constraints = [
+            # 종료되지 않은 방끼리만 room_code 유일
+            models.UniqueConstraint(
+                fields=['room_code'],
+                condition=~models.Q(status='finished'),
+                name='unique_active_room_code',
+            ),
+        ]
+        indexes = [
+            # reaper: 상태별 오래된 방 조회 (WAITING은 마지막 활동 시각, FINISHED는 종료 시각 기준)
+            models.Index(fields=['status', 'last_activity_at'], name='rooms_room_status_activity_idx'),
+            models.Index(fields=['status', 'finished_at'], name='rooms_room_status_finished_idx'),
+        ]
 
 
 
@@ -80,10 +113,12 @@ class Player(models.Model):
         FINISHED = 'finished', '완료'       # 게임 종료
 
     player_id = models.CharField(max_length=36, primary_key=True, editable=False)
-    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='players')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='players', db_index=False)
     nickname = models.CharField(max_length=10)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.WAITING)
     is_host = models.BooleanField(default=False)
+    # 방 안에서의 자리 번호 (0부터, 바이너리 프레임에서 player_id 대신 사용)
+    slot = models.PositiveSmallIntegerField(default=0)
     joined_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
@@ -96,4 +131,34 @@ class Player(models.Model):
     
     class Meta:
         ordering = ['joined_at']
+        constraints = [
+            # 방 안에서 slot은 한 명만 (샘플/바이너리 프레임이 slot으로 플레이어를 구분)
+            models.UniqueConstraint(fields=['room', 'slot'], name='unique_player_slot'),
+        ]
+        indexes = [
+            # 방별 플레이어/상태 조회 (room_id 단독 조회도 이 인덱스로 처리)
+            models.Index(fields=['room', 'status'], name='rooms_player_room_status_idx'),
+        ]
+
 
+class HeartRateSample(models.Model):
+    """
+    심박수 샘플 (시계열)
+    - 게임 결과 통계(평균/최소/최대 BPM, time_in_zone) 계산용
+    - 샘플 수가 많으므로 필드를 최소화 (player_id 대신 방 안의 slot 번호)
+    - Consumer가 직접 INSERT 하지 않고 samples.SampleBuffer가 모아서 bulk_create
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='samples', db_index=False)
+    slot = models.PositiveSmallIntegerField()
+    recorded_at_ms = models.BigIntegerField()  # 서버 수신 시각 (epoch 밀리초)
+    bpm = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.room_id}#{self.slot} {self.bpm}bpm"
+
+    class Meta:
+        ordering = ['recorded_at_ms']
+        indexes = [
+            # 방별 타임라인 조회 (room_id 단독 조회도 이 인덱스로 처리)
+            models.Index(fields=['room', 'recorded_at_ms'], name='rooms_sample_room_time_idx'),
+        ]
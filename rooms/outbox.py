@@ -0,0 +1,114 @@
+"""
+Consumer별 송신 큐
+- 그룹 이벤트 핸들러는 소켓에 직접 쓰지 않고 여기에 넣기만 함 → 채널 레이어 큐는 바로 비워짐
+- 심박수(heart_rate / room_snapshot): 보낸 플레이어(event['key'])별 최신 값 하나만 보관
+  → 느린 클라이언트는 중간 값을 건너뛰고 가장 최근 BPM만 받음 (방 인원 수만큼만 메모리 사용)
+- 제어 이벤트(player_ready, player_disconnected, lobby_update, game_over ...): 순서대로 모두 전송
+- 제어 이벤트가 먼저, 남은 심박수는 그 다음
+- 보낼 이벤트가 있는데 CONSUMER_SLOW_EVICT_SECONDS 동안 전송이 하나도 끝나지 않거나
+  제어 큐가 CONSUMER_CONTROL_QUEUE_MAX를 넘으면 느린 연결로 보고 끊음 (evict 콜백)
+
+느린 클라이언트 판단 기준 = 클라이언트 ack (credit window)
+- Daphne의 send()는 Twisted 전송 버퍼에 쓰고 바로 반환 → 소켓이 밀려도 send()가 막히지 않음
+  (send()가 끝났다고 클라이언트가 받은 것이 아님)
+- 클라이언트가 {"type": "ack", "received": <지금까지 받은 프레임 수>}를 보내면 그때부터 flow control 사용
+  → 보냈지만 ack되지 않은 프레임이 CONSUMER_ACK_WINDOW개면 ack가 올 때까지 전송 대기
+  (그동안 심박수는 최신 값으로 교체, 계속 밀리면 위 기준으로 끊음)
+- ack를 보내지 않는 클라이언트는 send()가 막힐 때만 밀린 것으로 판단 → Daphne에서는 교체/끊기가 일어나지 않음
+"""
+import asyncio
+import time
+from collections import deque
+from django.conf import settings
+from . import metrics
+
+
+class Outbox:
+    def __init__(self, send, evict):
+        self.send = send  # async (event) → 소켓 전송
+        self.evict = evict  # async () → 연결 끊기
+        self.control = deque()
+        self.latest = {}  # key -> 최신 심박수 이벤트 (dict 순서 = 처음 들어온 순서)
+        self.busy_since = None  # 보낼 이벤트가 남아 있는 동안 마지막으로 전송이 진행된 시각
+        self.task = None
+        self.closed = False
+        self.evict_after = getattr(settings, 'CONSUMER_SLOW_EVICT_SECONDS', 10)
+        self.control_max = getattr(settings, 'CONSUMER_CONTROL_QUEUE_MAX', 100)
+        self.window = getattr(settings, 'CONSUMER_ACK_WINDOW', 64)
+        self.sent = 0  # 이 소켓으로 보낸 프레임 수 (outbox 밖에서 보낸 것 포함, sent_frame)
+        self.acked = None  # 클라이언트가 받았다고 알린 프레임 수 (None이면 ack 사용 안 함)
+        self.credit = asyncio.Event()
+
+    def sent_frame(self):
+        """소켓으로 프레임 하나를 보낼 때마다 호출 (Consumer.send)"""
+        self.sent += 1
+
+    def ack(self, received):
+        """클라이언트 ack - 받은 프레임 수만큼 전송 창을 다시 엶"""
+        if not isinstance(received, int) or isinstance(received, bool):
+            return
+        self.acked = max(self.acked or 0, min(received, self.sent))
+        if self.sent - self.acked < self.window:
+            self.credit.set()
+
+    def _blocked(self):
+        return self.acked is not None and self.window and self.sent - self.acked >= self.window
+
+    async def put(self, event):
+        """제어 이벤트 (순서 보장, 버리지 않음)"""
+        if self.closed:
+            return
+        self.control.append(event)
+        await self._wake()
+
+    async def put_latest(self, event):
+        """심박수 이벤트 (같은 key의 이전 값은 버림)"""
+        if self.closed:
+            return
+        key = event.get('key')
+        if self.latest.pop(key, None) is not None:
+            metrics.ws_outbox_superseded.inc()
+        self.latest[key] = event
+        await self._wake()
+
+    def has_latest(self, key):
+        """같은 key의 심박수 이벤트가 아직 전송 대기 중인지"""
+        return key in self.latest
+
+    async def _wake(self):
+        now = time.monotonic()
+        if self.busy_since is None:
+            self.busy_since = now
+        elif now - self.busy_since > self.evict_after or len(self.control) > self.control_max:
+            metrics.ws_evicted.inc()
+            self.close()
+            await self.evict()
+            return
+        if self.task is None:
+            self.task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            while self.control or self.latest:
+                # ack 안 된 프레임이 창만큼 쌓이면 대기 (그동안 들어온 심박수는 최신 값으로 교체됨)
+                while self._blocked():
+                    self.credit.clear()
+                    await self.credit.wait()
+                if self.control:
+                    event = self.control.popleft()
+                else:
+                    key = next(iter(self.latest))
+                    event = self.latest.pop(key)
+                await self.send(event)
+                self.busy_since = time.monotonic()
+            self.busy_since = None
+        finally:
+            self.task = None
+
+    def close(self):
+        """남은 이벤트 버리고 전송 태스크 종료"""
+        self.closed = True
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+        self.control.clear()
+        self.latest.clear()
@@ -0,0 +1,139 @@
+"""
+WebSocket 프레임 인코딩
+- 브로드캐스트 payload는 보내는 쪽에서 한 번만 인코딩해서 그룹 이벤트에 첨부
+- 받는 쪽 핸들러는 인코딩된 프레임을 그대로 전달 (재직렬화 없음)
+
+바이너리 서브프로토콜 (heartsync.bin.v1)
+- 연결 시 Sec-WebSocket-Protocol로 협상, 협상하지 않은 클라이언트는 기존 JSON 그대로
+- heart_rate / room_snapshot만 고정 길이 바이너리로 전송 (나머지 제어 메시지는 JSON)
+- player_id(UUID 36자) 대신 방 안의 slot 번호(Player.slot) 사용
+
+서버 → 클라이언트 (network byte order)
+    header : kind(uint8) + server_time_ms(uint32, 밀리초 epoch 하위 32비트)
+    record : slot(uint8) + bpm(uint16) + age_ms(uint16, 샘플 수신 후 경과 시간)
+    heart_rate    = header + record
+    room_snapshot = header + count(uint8) + record * count
+    room_keyframe / room_delta (delta 모드) = header + seq(uint32) + count(uint8) + record * count
+                                             (delta의 bpm 0 = 퇴장한 플레이어)
+
+클라이언트 → 서버
+    heart_rate = kind(uint8) + slot(uint8) + bpm(uint16)
+"""
+import json
+import struct
+import time
+
+
+def encode_json(payload):
+    """payload를 공백 없는 JSON 텍스트 프레임으로 인코딩"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def group_event(handler_type, payload, binary=None, key=None):
+    """
+    group_send용 이벤트 생성
+    - handler_type: 받는 쪽 Consumer 핸들러 이름 (예: 'send_heart_rate')
+    - payload: 클라이언트에게 보낼 메시지 (여기서 한 번만 인코딩됨)
+    - binary: 바이너리 서브프로토콜 클라이언트용 프레임 (있을 때만 첨부)
+    - key: 받는 쪽 Outbox에서 같은 key는 최신 이벤트만 전송 (심박수: 보낸 player_id)
+    - sent_at: 전달 지연 측정용 (metrics.handler, monotonic은 같은 서버의 프로세스 간에도 공유됨)
+    """
+    event = {
+        'type': handler_type,
+        'text': encode_json(payload),
+        'sent_at': time.monotonic(),
+    }
+    if binary is not None:
+        event['bytes'] = binary
+    if key is not None:
+        event['key'] = key
+    return event
+
+
+# 자주 쓰는 고정 프레임은 미리 인코딩
+PONG_FRAME = encode_json({'type': 'pong'})
+INVALID_JSON_FRAME = encode_json({'error': 'Invalid JSON'})
+SPECTATOR_READ_ONLY_FRAME = encode_json({'type': 'error', 'message': 'Spectators are read-only'})
+
+
+# ===== 바이너리 서브프로토콜 =====
+
+SUBPROTOCOL_BINARY = 'heartsync.bin.v1'
+
+FRAME_HEART_RATE = 0x01
+FRAME_ROOM_SNAPSHOT = 0x02
+FRAME_ROOM_KEYFRAME = 0x03
+FRAME_ROOM_DELTA = 0x04
+
+_HEADER = struct.Struct('!BI')  # kind, server_time_ms
+_COUNT = struct.Struct('!B')  # 스냅샷 레코드 수
+_SEQ = struct.Struct('!I')  # delta 모드 프레임 번호
+_RECORD = struct.Struct('!BHH')  # slot, bpm, age_ms
+_INBOUND_HEART_RATE = struct.Struct('!BBH')  # kind, slot, bpm
+
+_UINT16_MAX = 0xFFFF
+
+
+class FrameError(ValueError):
+    """잘못된 바이너리 프레임"""
+
+
+def server_time_ms():
+    """서버 시각 (밀리초 epoch 하위 32비트, 클라이언트가 자기 시계로 복원)"""
+    return int(time.time() * 1000) & 0xFFFFFFFF
+
+
+def _clamp16(value):
+    return max(0, min(int(value), _UINT16_MAX))
+
+
+def encode_heart_rate(slot, bpm, now_ms=None):
+    """단일 heart_rate 바이너리 프레임"""
+    if now_ms is None:
+        now_ms = server_time_ms()
+    return (
+        _HEADER.pack(FRAME_HEART_RATE, now_ms)
+        + _RECORD.pack(slot, _clamp16(bpm), 0)
+    )
+
+
+def encode_snapshot(records, now_ms=None):
+    """
+    room_snapshot 바이너리 프레임
+    - records: (slot, bpm, age_ms) 목록
+    """
+    if now_ms is None:
+        now_ms = server_time_ms()
+    records = list(records)[:255]
+    parts = [_HEADER.pack(FRAME_ROOM_SNAPSHOT, now_ms), _COUNT.pack(len(records))]
+    for slot, bpm, age_ms in records:
+        parts.append(_RECORD.pack(slot, _clamp16(bpm), _clamp16(age_ms)))
+    return b''.join(parts)
+
+
+def encode_snapshot_delta(seq, keyframe, records, now_ms=None):
+    """
+    delta 모드 room_snapshot 바이너리 프레임
+    - keyframe이면 전체 상태, 아니면 바뀐 플레이어만
+    """
+    if now_ms is None:
+        now_ms = server_time_ms()
+    records = list(records)[:255]
+    kind = FRAME_ROOM_KEYFRAME if keyframe else FRAME_ROOM_DELTA
+    parts = [_HEADER.pack(kind, now_ms), _SEQ.pack(seq), _COUNT.pack(len(records))]
+    for slot, bpm, age_ms in records:
+        parts.append(_RECORD.pack(slot, _clamp16(bpm), _clamp16(age_ms)))
+    return b''.join(parts)
+
+
+def decode_inbound(data):
+    """
+    클라이언트가 보낸 바이너리 프레임 해석
+    반환: (slot, bpm)
+    """
+    if len(data) != _INBOUND_HEART_RATE.size:
+        raise FrameError('Invalid frame length')
+    kind, slot, bpm = _INBOUND_HEART_RATE.unpack(data)
+    if kind != FRAME_HEART_RATE:
+        raise FrameError('Unknown frame type')
+    return slot, bpm
@@ -0,0 +1,98 @@
+"""
+연결별 heart_rate 수신 제한 (토큰 버킷)
+- 클라이언트 하나가 소켓이 허용하는 만큼 heart_rate를 보내면 프레임마다 방 전체로 group_send
+  → 채널 레이어가 밀려서 다른 방까지 느려짐
+- 연결마다 초당 HEART_RATE_INGRESS_RATE개, 순간 HEART_RATE_INGRESS_BURST개까지만 바로 처리
+- 초과분은 버리지 않고 플레이어별 최신 값 하나로 합쳐 두었다가 토큰이 차면 처리 (중간 값만 버림)
+"""
+import asyncio
+import time
+from django.conf import settings
+from . import metrics
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self):
+        """토큰 하나 사용 (없으면 False)"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """다음 토큰까지 남은 시간 (초)"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class IngressLimiter:
+    """
+    연결 하나의 heart_rate 수신 제한
+    - submit(): 토큰이 있으면 바로 forward(player_id, bpm), 없으면 최신 값으로 보관
+    - 보관한 값은 토큰이 찰 때 태스크 하나가 forward (그 사이 들어온 이전 값은 버림)
+    메트릭 heartsync_heart_rate_limited_total
+    - coalesced: 보관했다가 최신 값으로 처리한 프레임
+    - dropped: 더 새 값에 밀려 처리하지 않은 프레임
+    """
+    def __init__(self, rate, burst, forward):
+        self.bucket = TokenBucket(rate, burst)
+        self.forward = forward
+        self.pending = {}  # player_id -> 최신 bpm
+        self.task = None
+
+    async def submit(self, player_id, bpm):
+        if self.bucket.consume():
+            if self.pending.pop(player_id, None) is not None:
+                metrics.heart_rate_limited.inc('dropped')
+            await self.forward(player_id, bpm)
+            return
+
+        if player_id in self.pending:
+            metrics.heart_rate_limited.inc('dropped')
+        self.pending[player_id] = bpm
+        if self.task is None:
+            self.task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            while self.pending:
+                await asyncio.sleep(self.bucket.wait_time())
+                while self.pending and self.bucket.consume():
+                    player_id = next(iter(self.pending))
+                    bpm = self.pending.pop(player_id)
+                    metrics.heart_rate_limited.inc('coalesced')
+                    await self.forward(player_id, bpm)
+        finally:
+            self.task = None
+
+    def close(self):
+        """연결 종료: 보관 중인 값은 버림"""
+        if self.task is not None:
+            self.task.cancel()
+        if self.pending:
+            metrics.heart_rate_limited.inc('dropped', amount=len(self.pending))
+            self.pending.clear()
+
+
+def create(forward):
+    """설정값으로 IngressLimiter 생성 (HEART_RATE_INGRESS_RATE가 0이면 None → 제한 없음)"""
+    rate = getattr(settings, 'HEART_RATE_INGRESS_RATE', 10)
+    if not rate:
+        return None
+    burst = getattr(settings, 'HEART_RATE_INGRESS_BURST', 20)
+    return IngressLimiter(rate, burst, forward)
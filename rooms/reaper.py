@@ -0,0 +1,185 @@
+"""
+오래된 방 정리 (reaper)
+- FINISHED 방: 게임 종료(finished_at) 후 ROOM_FINISHED_TTL_SECONDS가 지나면 삭제
+  (생성 시각 기준이면 오래 기다리거나 오래 플레이한 방이 끝나자마자 삭제되어 내보내기를 할 수 없음)
+- WAITING 방: 마지막 활동(생성/참가/퇴장/ready) 후 ROOM_WAITING_TTL_SECONDS가 지나면 삭제 (클라이언트가 사라진 로비)
+- PLAYING 방은 game_clock이 FINISHED로 바꾸므로 대상 아님
+
+SQLite가 오래 잠기지 않도록 ROOM_REAP_BATCH_SIZE개씩 나눠서 삭제
+- 심박수 샘플은 방 하나에 수천~수만 행 → 먼저 ROOM_REAP_SAMPLE_BATCH_SIZE행씩 각각 짧은 트랜잭션으로 삭제
+- 그다음 플레이어/방을 트랜잭션 하나로 삭제 (그 사이 활동이 있었던 방은 다시 확인해서 남김)
+조회는 Room(status, last_activity_at) / Room(status, finished_at) 인덱스를 사용
+
+실행 방법
+- python manage.py reap_rooms (cron 등)
+- ROOM_REAP_INTERVAL > 0 이면 서버 프로세스 안에서 주기적으로 실행 (첫 WebSocket 연결 때 시작)
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from channels.db import database_sync_to_async
+from .models import Room, Player, HeartRateSample
+from .codes import room_codes
+from .registry import registry
+from .game_clock import game_clock
+from .history import history
+from .resume import replay
+from . import room_cache
+from . import lobby
+from . import scoring
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult:
+    """배치 하나의 삭제 결과"""
+    __slots__ = ('status', 'rooms', 'players', 'samples', 'seconds')
+
+    def __init__(self, status, rooms, players, samples, seconds):
+        self.status = status
+        self.rooms = rooms
+        self.players = players
+        self.samples = samples
+        self.seconds = seconds
+
+
+def cleanup_room(room_id, room_code=None):
+    """
+    DB에서 삭제된 방의 메모리 상태 정리 (레지스트리, 캐시 버전, 점수판, 게임 시계, 심박수 기록, 재개용 이벤트)
+    room_code를 주면 코드 pool에 반납 (종료된 방은 이미 반납됐으므로 주지 않음)
+    """
+    if room_code is not None:
+        room_codes.release(room_code)
+    registry.drop_room(room_id)
+    room_cache.bump_on_commit(room_id)
+    lobby.room_deleted(room_id)
+    scoring.finish(room_id)
+    game_clock.cancel(room_id)
+    history.drop(room_id)
+    replay.drop(room_id)
+
+
+def get_ttls():
+    """상태별 보관 시간 (초)"""
+    return {
+        Room.Status.FINISHED: getattr(settings, 'ROOM_FINISHED_TTL_SECONDS', 600),
+        Room.Status.WAITING: getattr(settings, 'ROOM_WAITING_TTL_SECONDS', 3600),
+    }
+
+
+# 상태별 보관 시간 기준 시각
+TTL_FIELDS = {
+    Room.Status.FINISHED: 'finished_at',
+    Room.Status.WAITING: 'last_activity_at',
+}
+
+
+def delete_samples(room_ids, limit):
+    """
+    방들의 심박수 샘플을 limit행씩 나눠서 삭제 (배치마다 짧은 트랜잭션 하나)
+    반환: (삭제한 행 수, DB가 잠겨 있던 시간 합계)
+    """
+    total = 0
+    seconds = 0.0
+    while True:
+        started = time.perf_counter()
+        with transaction.atomic():
+            batch = HeartRateSample.objects.filter(room_id__in=room_ids).order_by().values('pk')[:limit]
+            deleted, _ = HeartRateSample.objects.filter(pk__in=batch).delete()
+        seconds += time.perf_counter() - started
+        total += deleted
+        if deleted < limit:
+            return total, seconds
+
+
+def reap_batch(status, cutoff, batch_size, sample_batch_size=None):
+    """기준 시각(TTL_FIELDS)이 cutoff 이전인 status 방을 최대 batch_size개 삭제 (없으면 None)"""
+    sample_batch_size = sample_batch_size or getattr(settings, 'ROOM_REAP_SAMPLE_BATCH_SIZE', 5000)
+    field = TTL_FIELDS[status]
+    expired = Room.objects.filter(status=status, **{f'{field}__lt': cutoff})
+    rows = list(expired.order_by(field).values_list('room_id', 'room_code')[:batch_size])
+    if not rows:
+        return None
+    room_ids = [room_id for room_id, _ in rows]
+
+    # 행 수가 가장 많은 샘플부터 따로 (WAITING 방은 게임 전이라 샘플 없음 → 다시 활동해도 잃는 것 없음)
+    samples, seconds = delete_samples(room_ids, sample_batch_size)
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        # 샘플을 지우는 동안 참가/ready가 있었던 WAITING 방은 제외
+        rows = list(expired.filter(room_id__in=room_ids).values_list('room_id', 'room_code'))
+        room_ids = [room_id for room_id, _ in rows]
+        # 자식 테이블은 시그널이 없으므로 모델별 DELETE 한 번씩
+        players, _ = Player.objects.filter(room_id__in=room_ids).delete()
+        _, deleted = Room.objects.filter(room_id__in=room_ids).delete()
+        rooms = deleted.get(Room._meta.label, 0)
+    seconds += time.perf_counter() - started  # DB가 잠겨 있던 시간
+
+    for room_id, room_code in rows:
+        cleanup_room(room_id, None if status == Room.Status.FINISHED else room_code)
+
+    return BatchResult(status, rooms, players, samples, seconds)
+
+
+def reap(batch_size=None, ttls=None, now=None):
+    """
+    만료된 방 전부 삭제 (배치 단위)
+    반환: BatchResult 목록
+    """
+    batch_size = batch_size or getattr(settings, 'ROOM_REAP_BATCH_SIZE', 500)
+    ttls = ttls or get_ttls()
+    now = now or timezone.now()
+
+    results = []
+    for status, ttl in ttls.items():
+        cutoff = now - timedelta(seconds=ttl)
+        while True:
+            result = reap_batch(status, cutoff, batch_size)
+            if result is None:
+                break
+            results.append(result)
+            if result.rooms == 0:
+                break
+    return results
+
+
+# ===== 서버 프로세스 안에서 주기 실행 =====
+
+_task = None
+
+
+def ensure_running():
+    """ROOM_REAP_INTERVAL > 0 이면 주기 실행 태스크 시작 (이미 실행 중이면 무시)"""
+    global _task
+    interval = getattr(settings, 'ROOM_REAP_INTERVAL', 0)
+    if interval <= 0:
+        return
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run(interval))
+
+
+async def _run(interval):
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                results = await database_sync_to_async(reap)()
+            except Exception:
+                logger.exception("Room reaper failed")
+                continue
+            if results:
+                logger.info(
+                    "Reaped %d rooms, %d players, %d samples in %d batches (%.3fs)",
+                    sum(r.rooms for r in results),
+                    sum(r.players for r in results),
+                    sum(r.samples for r in results),
+                    len(results),
+                    sum(r.seconds for r in results),
+                )
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,196 @@
+"""
+프로세스 내 방/플레이어 상태 레지스트리
+- GameConsumer가 메시지 처리 중에 DB를 조회하지 않도록 방/플레이어 상태를 메모리에 보관
+- REST 뷰(생성/참가/퇴장/시작/삭제)가 변경할 때마다 함께 갱신
+- 멀티 워커: 다른 워커에서 일어난 변경은 방 그룹 이벤트(lobby_update 등)를 받을 때 apply_event로 반영
+- 레지스트리에 없으면 Consumer가 DB에서 읽어서 채움 (DB가 원본, 레지스트리는 캐시)
+- 게임이 끝난 방은 game_over 때 버림, 게임 중이 아닌 방은 ROOM_REGISTRY_IDLE_SECONDS 동안 변경이 없으면 버림
+  (새 방을 등록할 때 확인 → 방이 늘어나지 않으면 정리할 것도 없음)
+"""
+import threading
+import time
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from .models import Room, Player
+
+
+class PlayerState:
+    """플레이어 하나의 캐시된 상태"""
+    __slots__ = ('player_id', 'nickname', 'status', 'slot', 'is_host')
+
+    def __init__(self, player_id, nickname, status, slot, is_host):
+        self.player_id = player_id
+        self.nickname = nickname
+        self.status = status
+        self.slot = slot
+        self.is_host = is_host
+
+    @classmethod
+    def from_model(cls, player):
+        return cls(player.player_id, player.nickname, player.status, player.slot, player.is_host)
+
+    @classmethod
+    def from_dict(cls, data):
+        """PlayerSerializer 출력(lobby_update의 player)에서 생성"""
+        return cls(data['player_id'], data['nickname'], data['status'], data['slot'], data['is_host'])
+
+
+class RoomState:
+    """방 하나의 캐시된 상태 (게임 설정 + 플레이어 목록)"""
+    __slots__ = ('room_id', 'status', 'mode', 'time_limit_seconds',
+                 'bpm_min', 'bpm_max', 'started_at', 'players', 'touched')
+
+    def __init__(self, room):
+        self.players = {}  # player_id -> PlayerState
+        self.touched = time.monotonic()  # 마지막 변경 시각 (유휴 방 정리 기준)
+        self.refresh(room)
+
+    def refresh(self, room):
+        """Room 모델 인스턴스의 값으로 갱신"""
+        self.room_id = room.room_id
+        self.status = room.status
+        self.mode = room.mode
+        self.time_limit_seconds = room.time_limit_seconds
+        self.bpm_min = room.bpm_min
+        self.bpm_max = room.bpm_max
+        self.started_at = room.started_at
+
+    def player_by_slot(self, slot):
+        for player in self.players.values():
+            if player.slot == slot:
+                return player
+        return None
+
+
+class RoomRegistry:
+    """
+    room_id -> RoomState
+    - 쓰기는 REST 뷰(동기 스레드)와 Consumer(이벤트 루프)에서 모두 일어나므로 lock으로 보호
+    - 읽기는 lock 없이 dict 조회만 (GIL로 충분)
+    """
+    def __init__(self, idle_seconds=None):
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.idle_seconds = idle_seconds
+        self._swept = time.monotonic()
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def warm(self, room, players):
+        """방 전체 상태를 (다시) 채움 - 게임 시작 시 호출"""
+        with self._lock:
+            state = RoomState(room)
+            for player in players:
+                state.players[player.player_id] = PlayerState.from_model(player)
+            self._insert(state)
+            return state
+
+    def get_room(self, room_id):
+        return self._rooms.get(room_id)
+
+    def get_player(self, room_id, player_id):
+        state = self._rooms.get(room_id)
+        if state is None:
+            return None
+        return state.players.get(player_id)
+
+    def add_player(self, player, room=None):
+        """플레이어 추가 (room을 넘기면 방이 없을 때 방도 함께 등록)"""
+        with self._lock:
+            state = self._rooms.get(player.room_id)
+            if state is None:
+                if room is None:
+                    return None
+                state = RoomState(room)
+                self._insert(state)
+            player_state = PlayerState.from_model(player)
+            state.players[player.player_id] = player_state
+            state.touched = time.monotonic()
+            return player_state
+
+    def remove_player(self, room_id, player_id):
+        with self._lock:
+            state = self._rooms.get(room_id)
+            if state is not None:
+                state.players.pop(player_id, None)
+                state.touched = time.monotonic()
+
+    def set_player_status(self, room_id, player_id, status):
+        state = self._rooms.get(room_id)
+        player = state.players.get(player_id) if state is not None else None
+        if player is not None:
+            player.status = status
+            state.touched = time.monotonic()
+
+    def _insert(self, state):
+        """새 방 등록 (lock 안에서 호출) - 정리 주기가 지났으면 유휴 방도 정리"""
+        self._rooms[state.room_id] = state
+        now = state.touched
+        if self.idle_seconds and now - self._swept >= self.idle_seconds:
+            self._swept = now
+            self._evict_idle(now - self.idle_seconds)
+
+    def _evict_idle(self, cutoff):
+        """cutoff 이후 변경이 없는 게임 중이 아닌 방 버리기 (게임 중인 방은 game_over 때 버림)"""
+        idle = [
+            room_id for room_id, state in self._rooms.items()
+            if state.status != Room.Status.PLAYING and state.touched < cutoff
+        ]
+        for room_id in idle:
+            del self._rooms[room_id]
+
+    def apply_event(self, room_id, payload):
+        """
+        방 그룹 이벤트(lobby_update, player_ready, player_disconnected, game_over)를 이 워커의 캐시에 반영
+        - 이 워커가 보낸 이벤트면 이미 반영된 값이라 결과가 같음
+        - 이 워커에 없는 방은 건너뜀 (필요할 때 Consumer가 DB에서 채움)
+        """
+        message_type = payload.get('type')
+        if message_type == 'player_ready':
+            self.set_player_status(room_id, payload['player_id'], Player.Status.READY)
+        elif message_type == 'player_disconnected':
+            self.set_player_status(room_id, payload['player_id'], Player.Status.FINISHED)
+        elif message_type == 'game_over':
+            self.drop_room(room_id)
+        elif message_type == 'lobby_update':
+            self._apply_lobby_update(room_id, payload)
+
+    def _apply_lobby_update(self, room_id, payload):
+        event = payload['event']
+        if event == 'player_joined':
+            with self._lock:
+                state = self._rooms.get(room_id)
+                if state is not None:
+                    player = PlayerState.from_dict(payload['player'])
+                    state.players[player.player_id] = player
+                    state.touched = time.monotonic()
+        elif event == 'player_left':
+            self.remove_player(room_id, payload['player_id'])
+        elif event == 'game_started':
+            state = self._rooms.get(room_id)
+            if state is not None:
+                game_settings = payload['game_settings']
+                state.mode = game_settings['mode']
+                state.time_limit_seconds = game_settings['time_limit']
+                state.bpm_min = game_settings['bpm_min']
+                state.bpm_max = game_settings['bpm_max']
+                state.started_at = parse_datetime(payload['started_at'])
+                state.status = Room.Status.PLAYING
+                state.touched = time.monotonic()
+                for player in state.players.values():
+                    player.status = Player.Status.PLAYING
+        elif event == 'room_deleted':
+            self.drop_room(room_id)
+
+    def drop_room(self, room_id):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+
+
+# 프로세스 전역 레지스트리
+registry = RoomRegistry(idle_seconds=getattr(settings, 'ROOM_REGISTRY_IDLE_SECONDS', 600))
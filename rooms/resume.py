@@ -0,0 +1,131 @@
+"""
+WebSocket 세션 재개 (모바일 네트워크 끊김 대응)
+- 방별 제어 이벤트(lobby_update, player_ready, player_disconnected, game_over)에 event_seq 번호를 붙이고
+  최근 RESUME_REPLAY_WINDOW개를 인코딩된 프레임 그대로 보관
+  (score_update / 심박수는 최신 값만 의미가 있으므로 번호 없음 - 다음 전송이나 history로 복구)
+- 세션 토큰: 방 생성/참가 응답으로만 발급 (player_id는 lobby_snapshot에 공개되므로 player_id만으로는 연결을 지정하지 않음)
+- 연결/재연결: ws/game/<room_id>/?token=<session_token>&last_seq=<n>
+  - last_seq 이후 이벤트가 창 안에 모두 있으면 그것만 다시 보냄 (lobby_snapshot 생략)
+  - 토큰이 유효하면 플레이어 연결을 이어받음 (이전 소켓 종료, ping 타임아웃 취소)
+- ping 타임아웃 시 바로 FINISHED 처리하지 않고 RESUME_GRACE_SECONDS 동안 재개를 기다림
+- 보관한 이벤트는 게임 종료 후 RESUME_GRACE_SECONDS가 지나면 버림 (game_clock),
+  시작하지 않은 로비까지 합쳐 최대 RESUME_REPLAY_MAX_ROOMS개 방 (가장 오래 이벤트가 없던 방부터 버림)
+
+번호와 보관 창, 재개 대기는 프로세스 단위
+→ UnixSocketChannelLayer(멀티 워커)에서는 RESUME_REPLAY_WINDOW / RESUME_GRACE_SECONDS를 0으로 (rooms/checks.py)
+"""
+import threading
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.core import signing
+from .protocol import group_event
+
+TOKEN_SALT = 'rooms.resume'
+
+
+class _RoomLog:
+    __slots__ = ('seq', 'events')
+
+    def __init__(self, size, seq=0):
+        self.seq = seq
+        self.events = deque(maxlen=size)  # (event_seq, 인코딩된 텍스트 프레임)
+
+
+class ReplayLog:
+    """
+    room_id -> 최근 제어 이벤트 (REST 스레드와 이벤트 루프에서 같이 쓰므로 lock)
+    - 방 수는 max_rooms까지 (마지막 이벤트 순서, 넘으면 가장 오래된 방부터 버림)
+    - 버린 방을 다시 기록할 때는 지금까지 쓴 가장 큰 번호 다음부터
+      → 이전 번호로 재개하는 클라이언트는 창 밖으로 판단되어 전체 상태를 받음
+    """
+    def __init__(self, size, max_rooms=None):
+        self.size = size
+        self.max_rooms = max_rooms
+        self.rooms = OrderedDict()
+        self.floor = 0  # 버린 방의 마지막 번호 중 최댓값
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def event(self, room_id, handler_type, payload):
+        """group_event()와 같지만 event_seq를 붙이고 보관 창에 기록 (창 크기 0이면 번호 없이 group_event())"""
+        if not self.size:
+            return group_event(handler_type, payload)
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = _RoomLog(self.size, self.floor + 1 if self.floor else 0)
+                if self.max_rooms and len(self.rooms) > self.max_rooms:
+                    self._forget(next(iter(self.rooms)))
+            else:
+                self.rooms.move_to_end(room_id)
+            room.seq += 1
+            payload['event_seq'] = room.seq
+            event = group_event(handler_type, payload)
+            event['event_seq'] = room.seq
+            room.events.append((room.seq, event['text']))
+        return event
+
+    def current(self, room_id):
+        """마지막으로 붙인 event_seq (없으면 0)"""
+        room = self.rooms.get(room_id)
+        return room.seq if room is not None else 0
+
+    def since(self, room_id, last_seq):
+        """
+        last_seq 이후 이벤트 프레임 목록
+        창 밖으로 밀려났거나 last_seq가 이 프로세스의 번호보다 크면(서버 재시작 등) None → 전체 상태 다시 받기
+        창 크기 0(재개 사용 안 함)이면 항상 None
+        """
+        if not self.size:
+            return None
+        with self.lock:
+            room = self.rooms.get(room_id)
+            seq = room.seq if room is not None else 0
+            if last_seq > seq:
+                return None
+            if last_seq == seq:
+                return []
+            if not room.events or room.events[0][0] > last_seq + 1:
+                return None
+            return [text for event_seq, text in room.events if event_seq > last_seq]
+
+    def drop(self, room_id):
+        with self.lock:
+            self._forget(room_id)
+
+    def _forget(self, room_id):
+        room = self.rooms.pop(room_id, None)
+        if room is not None:
+            self.floor = max(self.floor, room.seq)
+
+
+def make_token(room_id, player_id):
+    """세션 토큰 (RoomCreateView / JoinRoomView 응답에만 포함)"""
+    return signing.dumps([room_id, player_id], salt=TOKEN_SALT)
+
+
+def read_token(token, room_id):
+    """토큰의 player_id (서명/만료/방이 맞지 않으면 None)"""
+    try:
+        token_room_id, player_id = signing.loads(
+            token, salt=TOKEN_SALT, max_age=getattr(settings, 'RESUME_TOKEN_MAX_AGE', 3600)
+        )
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    return player_id if token_room_id == room_id else None
+
+
+def grace_key(room_id, player_id):
+    """ping 타임아웃 후 재개 대기 항목 (timers.resume_timers key)"""
+    return f'resume:{room_id}:{player_id}'
+
+
+replay = ReplayLog(
+    size=getattr(settings, 'RESUME_REPLAY_WINDOW', 200),
+    max_rooms=getattr(settings, 'RESUME_REPLAY_MAX_ROOMS', 1000),
+)
+
+# (room_id, player_id) -> 현재 그 플레이어를 맡은 소켓의 channel_name
+active = {}
@@ -0,0 +1,77 @@
+"""
+방 상세 응답 캐시 (GET /api/rooms/{room_id}/)
+- 방마다 버전 번호를 캐시에 두고, Room/Player가 바뀔 때마다 bump()로 증가
+- 직렬화된 방 상세는 (room_id, 버전) 키로 캐시 → 버전이 바뀌면 자연스럽게 무효화
+- ETag = room_id + 버전 → If-None-Match가 같으면 DB/Serializer 없이 304
+
+버전은 DB 커밋 후에 올려야 함 (커밋 전 상태가 새 버전으로 캐시되지 않도록)
+→ 변경 지점에서는 bump_on_commit() 사용
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import Room
+from .serializers import RoomDetailSerializer
+
+
+def _version_key(room_id):
+    return f'room:{room_id}:version'
+
+
+def _detail_key(room_id, version):
+    return f'room:{room_id}:detail:{version}'
+
+
+def get_version(room_id):
+    """
+    현재 버전 (없으면 새로 생성)
+    캐시에서 버전이 사라졌다가 다시 생길 때 예전 ETag와 겹치지 않도록 시작값은 현재 시각(ms)
+    """
+    key = _version_key(room_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(room_id):
+    """방 버전 증가 (캐시된 상세 응답과 ETag 무효화)"""
+    try:
+        cache.incr(_version_key(room_id))
+    except ValueError:
+        get_version(room_id)  # 버전이 없으면 새 시작값으로 생성
+
+
+def bump_on_commit(room_id):
+    """현재 트랜잭션이 커밋된 뒤 bump (트랜잭션 밖이면 바로 실행)"""
+    transaction.on_commit(lambda: bump(room_id))
+
+
+def etag(room_id, version):
+    return f'"{room_id}.{version}"'
+
+
+def get_detail(room_id, version):
+    return cache.get(_detail_key(room_id, version))
+
+
+def set_detail(room_id, version, data):
+    cache.set(
+        _detail_key(room_id, version),
+        data,
+        getattr(settings, 'ROOM_DETAIL_CACHE_TIMEOUT', 300),
+    )
+
+
+def load_detail(room_id, version):
+    """캐시된 방 상세 (없으면 DB에서 직렬화 후 캐시, 방이 없으면 None)"""
+    data = get_detail(room_id, version)
+    if data is None:
+        room = Room.objects.prefetch_related('players').filter(room_id=room_id).first()
+        if room is None:
+            return None
+        data = dict(RoomDetailSerializer(room).data)
+        set_detail(room_id, version, data)
+    return data
@@ -1,7 +1,8 @@
 from django.urls import path
-from .consumers import GameConsumer
+from .consumers import GameConsumer, SpectatorConsumer
 
 # WebSocket URL 패턴
 websocket_urlpatterns = [
     path('ws/game/<str:room_id>/', GameConsumer.as_asgi()),
+    path('ws/spectate/<str:room_id>/', SpectatorConsumer.as_asgi()),
 ]
\ No newline at end of file
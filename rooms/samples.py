@@ -0,0 +1,105 @@
+"""
+심박수 샘플 write-behind 버퍼
+- Consumer는 샘플을 메모리 버퍼에 넣기만 함 (샘플마다 INSERT 하지 않음)
+- 버퍼가 HEART_RATE_FLUSH_SIZE개 차거나 HEART_RATE_FLUSH_INTERVAL초가 지나면 bulk_create
+- 소켓 연결 해제 시에도 flush
+- 게임 중(PLAYING)인 방의 샘플만 들어옴 (Consumer에서 확인)
+
+프로세스가 비정상 종료되면 잃을 수 있는 샘플은 아직 flush되지 않은 것뿐:
+    최대 HEART_RATE_FLUSH_SIZE개 또는 HEART_RATE_FLUSH_INTERVAL초 분량 중 먼저 도달하는 쪽
+    (+ 쓰기 중이던 배치 1개)
+DB가 느려서 쓰기가 밀리면 HEART_RATE_BUFFER_MAX개를 넘는 가장 오래된 샘플부터 버림 (메모리 상한)
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from .models import Room, HeartRateSample
+from .db import consumer_database_sync_to_async
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SampleBuffer:
+    """프로세스 단위 심박수 샘플 버퍼"""
+    def __init__(self, flush_size, flush_interval, max_pending):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = deque(maxlen=max_pending)  # (room_id, slot, recorded_at_ms, bpm)
+        self.dropped = 0  # 상한 초과로 버린 샘플 수
+        self.written = 0  # DB에 기록한 샘플 수
+        self.task = None  # 주기 flush 태스크
+        self.lock = asyncio.Lock()  # flush 직렬화 (SQLite writer는 하나뿐)
+
+    def add(self, room_id, slot, bpm):
+        """샘플 추가 (동기, DB 접근 없음)"""
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append((room_id, slot, int(time.time() * 1000), bpm))
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+        # 크기 임계값 도달 시 바로 flush
+        if len(self.pending) >= self.flush_size and not self.lock.locked():
+            asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """쌓인 샘플을 한 번에 기록"""
+        if not self.pending:
+            return
+
+        async with self.lock:
+            batch = list(self.pending)
+            self.pending.clear()
+            if not batch:
+                return
+            try:
+                self.written += await self._write(batch)
+            except Exception:
+                # 배치를 버리고 계속 진행 (다음 flush에 영향 없음)
+                logger.exception("Failed to write %d heart rate samples", len(batch))
+
+    @metrics.db_seconds.time('write_samples')
+    @consumer_database_sync_to_async
+    def _write(self, batch):
+        """반환: 기록한 샘플 수"""
+        try:
+            with transaction.atomic():
+                self._bulk_create(batch)
+            return len(batch)
+        except IntegrityError:
+            # flush 전에 삭제된 방의 샘플이 섞여 있으면 그 방 것만 빼고 다시 기록
+            room_ids = {sample[0] for sample in batch}
+            alive = set(Room.objects.filter(room_id__in=room_ids).values_list('room_id', flat=True))
+            batch = [sample for sample in batch if sample[0] in alive]
+            self._bulk_create(batch)
+            return len(batch)
+
+    def _bulk_create(self, batch):
+        HeartRateSample.objects.bulk_create(
+            [
+                HeartRateSample(room_id=room_id, slot=slot, recorded_at_ms=recorded_at_ms, bpm=bpm)
+                for room_id, slot, recorded_at_ms, bpm in batch
+            ],
+            batch_size=500,
+        )
+
+    async def _run(self):
+        """시간 임계값 flush"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+
+buffer = SampleBuffer(
+    flush_size=getattr(settings, 'HEART_RATE_FLUSH_SIZE', 200),
+    flush_interval=getattr(settings, 'HEART_RATE_FLUSH_INTERVAL', 1.0),
+    max_pending=getattr(settings, 'HEART_RATE_BUFFER_MAX', 10000),
+)
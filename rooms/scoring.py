@@ -0,0 +1,246 @@
+"""
+실시간 점수 계산 엔진 (steady_beat / pulse_rush)
+- 심박수 샘플이 들어올 때마다 플레이어별 누적 상태만 갱신 (샘플당 O(1), 저장된 샘플 재조회 없음)
+- 누적 상태: 목표 구간 체류 시간, 평균/분산(Welford), 최소/최대, 연속 유지(streak)
+- SCORE_UPDATE_INTERVAL초마다 변경이 있으면 score_update를 방 그룹으로 전송
+- 게임 종료 시 순위는 플레이어 수만큼의 정렬로 끝남
+
+모드별 목표 구간
+- steady_beat: bpm_min <= bpm <= bpm_max 유지
+- pulse_rush: bpm >= bpm_max 까지 끌어올려 유지
+
+점수 = 목표 구간 체류 초 * 10 + 최장 연속 유지 초 * 5
+
+멀티 워커 (UnixSocketChannelLayer)
+- 점수판은 게임을 시작한 워커(게임 시계가 있는 워커)에만 둠 → score_update / game_over 순위가 방 전체 기준
+- 다른 워커는 샘플을 그 워커의 수신 채널로 전달 (game_started 그룹 이벤트의 score_channel)
+"""
+import asyncio
+import math
+import time
+from django.conf import settings
+from .models import Room
+from .protocol import group_event
+from .layers import UnixSocketChannelLayer
+from .registry import registry
+from . import spectators
+
+# 샘플 간격이 이보다 길면 (센서 끊김 등) 이 시간까지만 인정
+MAX_SAMPLE_GAP_MS = 5000
+
+
+class PlayerScore:
+    """플레이어 한 명의 누적 점수 상태"""
+    __slots__ = ('count', 'mean', 'm2', 'min_bpm', 'max_bpm',
+                 'zone_ms', 'streak_ms', 'best_streak_ms',
+                 'last_ms', 'last_in_zone')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # 편차 제곱합 (Welford)
+        self.min_bpm = None
+        self.max_bpm = None
+        self.zone_ms = 0
+        self.streak_ms = 0
+        self.best_streak_ms = 0
+        self.last_ms = None
+        self.last_in_zone = False
+
+    def add(self, bpm, now_ms, in_zone):
+        """샘플 하나 반영 - 이전 샘플부터 지금까지의 시간은 이전 샘플의 구간 상태로 계산"""
+        if self.last_ms is not None:
+            elapsed = min(now_ms - self.last_ms, MAX_SAMPLE_GAP_MS)
+            if self.last_in_zone:
+                self.zone_ms += elapsed
+                self.streak_ms += elapsed
+                self.best_streak_ms = max(self.best_streak_ms, self.streak_ms)
+
+        if not in_zone:
+            self.streak_ms = 0
+        self.last_ms = now_ms
+        self.last_in_zone = in_zone
+
+        # 평균/분산 (Welford)
+        self.count += 1
+        delta = bpm - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (bpm - self.mean)
+
+        self.min_bpm = bpm if self.min_bpm is None else min(self.min_bpm, bpm)
+        self.max_bpm = bpm if self.max_bpm is None else max(self.max_bpm, bpm)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / self.count) if self.count > 1 else 0.0
+
+    @property
+    def score(self):
+        return self.zone_ms // 100 + self.best_streak_ms // 200
+
+    def as_dict(self, player_id):
+        return {
+            'player_id': player_id,
+            'score': self.score,
+            'time_in_zone': self.zone_ms // 1000,
+            'streak': self.streak_ms // 1000,
+            'best_streak': self.best_streak_ms // 1000,
+            'avg_bpm': round(self.mean),
+            'min_bpm': self.min_bpm,
+            'max_bpm': self.max_bpm,
+            'stddev_bpm': round(self.stddev, 1),
+        }
+
+
+class RoomScoreboard:
+    """방 하나의 점수판 + 주기적 score_update 전송 태스크 (플레이어/관전자 그룹)"""
+    def __init__(self, channel_layer, group_name, room_id, mode, bpm_min, bpm_max, interval):
+        self.channel_layer = channel_layer
+        self.group_name = group_name
+        self.room_id = room_id
+        self.mode = mode
+        self.bpm_min = bpm_min if bpm_min is not None else 0
+        self.bpm_max = bpm_max if bpm_max is not None else math.inf
+        self.interval = interval
+        self.players = {}  # player_id -> PlayerScore
+        self.dirty = False
+        self.task = None
+
+    def in_zone(self, bpm):
+        if self.mode == Room.Mode.PULSE_RUSH:
+            return bpm >= self.bpm_max
+        return self.bpm_min <= bpm <= self.bpm_max
+
+    def add(self, player_id, bpm, now_ms=None):
+        if now_ms is None:
+            now_ms = int(time.monotonic() * 1000)
+        player = self.players.get(player_id)
+        if player is None:
+            player = self.players[player_id] = PlayerScore()
+        player.add(bpm, now_ms, self.in_zone(bpm))
+        self.dirty = True
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def ranking(self):
+        """점수 내림차순 순위 (동점이면 목표 구간 체류 시간 순)"""
+        ordered = sorted(
+            self.players.items(),
+            key=lambda item: (item[1].score, item[1].zone_ms),
+            reverse=True,
+        )
+        return [
+            {'rank': rank, **score.as_dict(player_id)}
+            for rank, (player_id, score) in enumerate(ordered, start=1)
+        ]
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if not self.dirty:
+                    continue
+                self.dirty = False
+                event = group_event('send_score_update', {
+                    'type': 'score_update',
+                    'scores': self.ranking(),
+                })
+                await self.channel_layer.group_send(self.group_name, event)
+                await spectators.forward(self.channel_layer, self.room_id, event)
+        except asyncio.CancelledError:
+            pass
+
+
+# 프로세스 단위 방별 점수판 (room_id -> RoomScoreboard)
+_scoreboards = {}
+
+# 다른 워커가 시작한 게임: room_id -> 점수판을 가진 워커의 수신 채널
+_owners = {}
+
+# 이 워커의 점수 샘플 수신 채널과 태스크 (멀티 워커 채널 레이어에서 게임을 시작했을 때만)
+_inbox = None
+_inbox_task = None
+
+
+def _add(channel_layer, group_name, room_state, player_id, bpm, now_ms=None):
+    scoreboard = _scoreboards.get(room_state.room_id)
+    if scoreboard is None:
+        scoreboard = RoomScoreboard(
+            channel_layer, group_name, room_state.room_id,
+            room_state.mode, room_state.bpm_min, room_state.bpm_max,
+            getattr(settings, 'SCORE_UPDATE_INTERVAL', 1.0),
+        )
+        _scoreboards[room_state.room_id] = scoreboard
+    scoreboard.add(player_id, bpm, now_ms)
+
+
+async def record(channel_layer, group_name, room_state, player_id, bpm):
+    """
+    게임 중인 방의 샘플을 점수판에 반영
+    room_state: registry.RoomState (모드, BPM 구간)
+    다른 워커가 시작한 게임이면 그 워커로 전달 (시각은 여기서 찍음 - 같은 서버라 monotonic 공유)
+    """
+    owner = _owners.get(room_state.room_id)
+    if owner is not None and owner != _inbox:
+        await channel_layer.send(owner, {
+            'type': 'score.sample',
+            'room_id': room_state.room_id,
+            'player_id': player_id,
+            'bpm': bpm,
+            'now_ms': int(time.monotonic() * 1000),
+        })
+        return
+    _add(channel_layer, group_name, room_state, player_id, bpm)
+
+
+def set_owner(room_id, channel):
+    """game_started 그룹 이벤트를 받은 워커에서 호출 (channel이 None이면 단일 워커 → 각자 기록)"""
+    if channel is not None:
+        _owners[room_id] = channel
+
+
+async def open_inbox(channel_layer):
+    """
+    게임을 시작하는 워커에서 호출 - 다른 워커가 보낸 샘플을 받는 채널 (워커당 하나, 처음 한 번만 생성)
+    반환: 채널 이름 (멀티 워커 채널 레이어가 아니면 None)
+    """
+    global _inbox, _inbox_task
+    if not isinstance(channel_layer, UnixSocketChannelLayer):
+        return None
+    if _inbox_task is None or _inbox_task.done():
+        _inbox = await channel_layer.new_channel('scoring.')
+        _inbox_task = asyncio.create_task(_receive_samples(channel_layer, _inbox))
+    return _inbox
+
+
+async def _receive_samples(channel_layer, channel):
+    """다른 워커의 샘플을 이 워커의 점수판에 반영 (이미 끝났거나 모르는 방은 버림)"""
+    while True:
+        message = await channel_layer.receive(channel)
+        room_state = registry.get_room(message['room_id'])
+        if room_state is None or room_state.status != Room.Status.PLAYING:
+            continue
+        _add(
+            channel_layer, f"game_{message['room_id']}", room_state,
+            message['player_id'], message['bpm'], message['now_ms'],
+        )
+
+
+def get_scoreboard(room_id):
+    return _scoreboards.get(room_id)
+
+
+def finish(room_id):
+    """게임 종료 - 최종 순위를 반환하고 점수판 제거"""
+    _owners.pop(room_id, None)
+    scoreboard = _scoreboards.pop(room_id, None)
+    if scoreboard is None:
+        return []
+    scoreboard.stop()
+    return scoreboard.ranking()
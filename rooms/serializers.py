@@ -10,13 +10,13 @@ from .models import Room, Player
 class PlayerSerializer(serializers.ModelSerializer):
     """
     플레이어 정보 Serializer
-    - 플레이어 ID, 닉네임, 상태, 방장 여부를 포함
-    - player_id와 is_host는 자동 생성/설정되므로 읽기 전용
+    - 플레이어 ID, 닉네임, 상태, 방장 여부, 자리 번호(slot)를 포함
+    - player_id, is_host, slot은 자동 생성/설정되므로 읽기 전용
     """
     class Meta:
         model = Player
-        fields = ['player_id', 'nickname', 'status', 'is_host']
-        read_only_fields = ['player_id', 'is_host']
+        fields = ['player_id', 'nickname', 'status', 'is_host', 'slot']
+        read_only_fields = ['player_id', 'is_host', 'slot']
 
 
 class RoomSerializer(serializers.ModelSerializer):
@@ -0,0 +1,38 @@
+"""
+관전자 (ws/spectate/<room_id>/)
+- 플레이어 그룹(game_<room_id>)과 분리된 spectate_<room_id> 그룹 → 관전자가 많아도 플레이어 쪽 fan-out은 그대로
+- 심박수는 샘플마다 보내지 않고 SPECTATOR_SNAPSHOT_HZ 주기의 room_snapshot으로만 전송
+  (플레이어 소켓이 있는 프로세스에서 방별 집계기 하나가 관전자 그룹으로 브로드캐스트)
+- 제어 이벤트(lobby_update, player_ready, player_disconnected, score_update, game_over)는
+  보내는 쪽이 같은 인코딩 이벤트를 관전자 그룹에도 한 번 더 group_send
+"""
+from django.conf import settings
+from . import aggregator
+
+
+def group_name(room_id):
+    return f'spectate_{room_id}'
+
+
+def join_feed(channel_layer, room_id):
+    """
+    플레이어 소켓 연결 시 호출 - 관전자용 심박수 집계기 (SPECTATOR_SNAPSHOT_HZ가 0이면 None)
+    관전자 그룹은 delta 없이 매번 전체 스냅샷 (주기가 낮아서 keyframe 관리 이득이 적음)
+    """
+    hz = getattr(settings, 'SPECTATOR_SNAPSHOT_HZ', 1)
+    if not hz:
+        return None
+    return aggregator.join(channel_layer, group_name(room_id), tick_hz=hz, keyframe_interval=0)
+
+
+def leave_feed(room_id, player_id=None):
+    aggregator.leave(group_name(room_id), player_id)
+
+
+def get_feed(room_id):
+    return aggregator.get(group_name(room_id))
+
+
+async def forward(channel_layer, room_id, event):
+    """플레이어 그룹에 보낸 제어 이벤트를 관전자 그룹에도 전송"""
+    await channel_layer.group_send(group_name(room_id), event)
@@ -1,3 +1,1385 @@
-from django.test import TestCase
+"""
+REST 뷰 쿼리 수 / 캐시 테스트
+- 방 변경 API(시작/삭제/퇴장)가 실행하는 SQL 수를 고정해서, 쿼리가 늘어나면 테스트가 실패하도록 함
+- 참가/퇴장/시작: 정원 초과 참가 거부, 퇴장 직후 참가, 조회 후 바뀐 ready 상태로 퇴장, 준비 인원이 맞을 때만 시작
+- 방 상세 조회는 방이 바뀌지 않았으면 DB 조회 없이 캐시 응답 또는 304
+- /metrics/ 는 Prometheus 텍스트 형식 (누적값은 _total counter, room_id 레이블 없음, ping 감시 연결 수와 재개 대기 수는 따로)
+- 심박수 내보내기: NDJSON/CSV 스트리밍, resolution_ms 다운샘플, ASGI 요청은 async iterator
+- heart_rate 수신 제한: 토큰 초과분은 최신 값 하나로 합쳐서 나중에 처리
+- 로비 푸시: WebSocket 연결 직후 lobby_snapshot, 참가/퇴장 시 lobby_update
+- 바이너리 프레임: heart_rate / snapshot / delta 인코딩 ↔ struct 해석, 범위 밖 값 clamp, 잘못된 수신 프레임 거부,
+  바이너리 서브프로토콜 소켓의 송수신
+- 집계기: tick 안에 들어온 샘플은 플레이어별 최신 값으로 room_snapshot 하나, 새 샘플이 없으면 전송 안 함
+- 집계 delta 모드: 바뀐 플레이어만 + seq, N 프레임마다 keyframe
+- 최근 심박수 기록: 플레이어별 고정 크기 링 버퍼, 기간 밖 샘플 제외, 크기 = 기간 × 수신 제한 속도, 퇴장 시 제거
+- 점수: 모드별 목표 구간 체류 시간/연속 유지, 센서 끊김 구간 상한, 점수 순위
+- 데드라인 스케줄러: 취소/다시 등록 후에도 데드라인 순서로 한 번씩, 이전 힙 항목은 버림, touch로 연장
+- 세션 토큰: 공개된 player_id를 주장하거나 위조한 토큰으로는 다른 플레이어의 연결을 이어받을 수 없음,
+  토큰 없는 클라이언트도 첫 heart_rate로 ping 감시
+- 세션 재개: 보관 창 안이면 놓친 제어 이벤트만, 창 밖/번호 불일치면 None (전체 상태),
+  보관하는 방 수 상한, 종료된 방은 유예 시간 뒤 버림
+- 송신 큐: 느린 소켓에는 제어 이벤트 전부 + 플레이어별 최신 심박수만, 계속 밀리면 연결 끊기,
+  send()가 막히지 않아도 클라이언트 ack가 밀리면 전송 대기 (ack 없는 클라이언트는 제한 없음)
+- 게임 시계: ASGI HTTP로 시작한 게임이 제한 시간 뒤 FINISHED + game_over
+- reaper: FINISHED는 종료 시각, WAITING은 마지막 참가/퇴장/ready 시각 기준 보관 시간 + 메모리 상태 정리,
+  샘플은 행 수 제한 트랜잭션으로 먼저 삭제
+- 방 코드: 중복 없이 전부 할당 후 소진, 반납한 코드 재사용, 진행 중인 방 코드 제외, 생성 재시도 시 코드 반납
+- 상태 기록: 동시 ready는 트랜잭션 하나, READY는 대기 중인 플레이어만 (게임 중 ready는 무시)
+- 심박수 샘플 버퍼: 한 번에 flush, 상한 초과 시 오래된 것부터 버림, 삭제된 방의 샘플만 빼고 기록
+- Unix 소켓 채널 레이어: 다른 이벤트 루프의 워커와 send / group_send, 종료된 워커 멤버십 정리, flush
+- 멀티 워커: 그룹 이벤트로 각 워커의 레지스트리 갱신 (끝난 게임 / 유휴 방은 버림), 다른 워커의 점수 샘플은 게임을 시작한 워커로,
+  게임 시작 이벤트로 ping 감시 시작, 프로세스 단위 기능은 설정 검사(rooms.E001)
+- TestCase는 테스트마다 트랜잭션으로 감싸므로 뷰의 transaction.atomic()은 SAVEPOINT/RELEASE 2개로 집계됨
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import asyncio
+import json
+import struct
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from heart_sync_backend.asgi import application
+from .models import Room, Player, HeartRateSample
+from .registry import registry
+from .game_clock import game_clock
+from .protocol import group_event
+from .timers import DeadlineScheduler, ping_supervisor, resume_timers
+from . import checks
+from . import metrics
+from . import protocol
+from . import reaper
+from . import resume
+from . import scoring
+from . import spectators
+from . import views
+from .aggregator import RoomAggregator
+from .history import HistoryStore, history, history_size
+from .outbox import Outbox
+from .layers import UnixSocketChannelLayer
+from .ratelimit import IngressLimiter
+from .samples import SampleBuffer
+from .scoring import RoomScoreboard
+from .codes import RoomCodeAllocator, room_codes
+from .db import StatusWriter
 
-# Create your tests here.
+
+class RoomQueryBudgetTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.room = Room.objects.create(player_count=3)
+        self.host = Player.objects.create(room=self.room, nickname='host', is_host=True, slot=0)
+        self.guests = [
+            Player.objects.create(room=self.room, nickname=f'guest{i}', slot=i)
+            for i in (1, 2)
+        ]
+
+    def tearDown(self):
+        game_clock.cancel(self.room.room_id)
+        registry.clear()
+
+    def make_all_ready(self):
+        self.room.players.update(status=Player.Status.READY)
+        Room.objects.filter(room_id=self.room.room_id).update(ready_count=3)
+
+    def start(self, player_id):
+        return self.client.post(f'/api/rooms/{self.room.room_id}/start/', {
+            'player_id': player_id,
+            'mode': 'steady_beat',
+            'time_limit_seconds': 60,
+            'bpm_min': 80,
+            'bpm_max': 120,
+        }, content_type='application/json')
+
+    def test_start(self):
+        # SELECT 플레이어+방, SAVEPOINT, UPDATE room, UPDATE players, RELEASE
+        self.make_all_ready()
+        with self.assertNumQueries(5):
+            response = self.start(self.host.player_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.room.players.exclude(status=Player.Status.PLAYING).exists())
+        room = Room.objects.get(room_id=self.room.room_id)
+        self.assertEqual(room.status, Room.Status.PLAYING)
+        self.assertEqual(room.ready_count, 0)
+        self.assertEqual(len(registry.get_room(room.room_id).players), 3)
+
+    def test_start_not_ready(self):
+        # SELECT 플레이어+방, SAVEPOINT, UPDATE(0건), 카운터 SELECT, RELEASE
+        with self.assertNumQueries(5):
+            response = self.start(self.host.player_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], '0/3 players ready')
+
+    def test_start_not_host(self):
+        self.make_all_ready()
+        with self.assertNumQueries(1):
+            response = self.start(self.guests[0].player_id)
+        self.assertEqual(response.status_code, 403)
+
+    def test_delete(self):
+        registry.warm(self.room, self.room.players.all())
+        # SELECT 플레이어+방, DELETE samples, DELETE players, DELETE room
+        with self.assertNumQueries(4):
+            response = self.client.delete(
+                f'/api/rooms/{self.room.room_id}/delete/?player_id={self.host.player_id}'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted_players'], 3)
+        self.assertFalse(Room.objects.filter(room_id=self.room.room_id).exists())
+        self.assertIsNone(registry.get_room(self.room.room_id))
+
+    def test_delete_not_host(self):
+        with self.assertNumQueries(1):
+            response = self.client.delete(
+                f'/api/rooms/{self.room.room_id}/delete/?player_id={self.guests[0].player_id}'
+            )
+        self.assertEqual(response.status_code, 403)
+
+    def test_leave(self):
+        # SELECT 플레이어+방, SAVEPOINT, UPDATE room 카운터, DELETE player, RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                f'/api/rooms/{self.room.room_id}/leave/',
+                {'player_id': self.guests[0].player_id},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Room.objects.get(room_id=self.room.room_id).player_count, 2)
+
+    def test_host_leave(self):
+        # SELECT 플레이어+방, DELETE samples, DELETE players, DELETE room
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                f'/api/rooms/{self.room.room_id}/leave/',
+                {'player_id': self.host.player_id},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Room.objects.filter(room_id=self.room.room_id).exists())
+
+    def test_unknown_player(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                f'/api/rooms/{self.room.room_id}/leave/',
+                {'player_id': 'nobody'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 404)
+
+
+class RoomMembershipTests(TestCase):
+    """참가/퇴장/시작의 인원·준비 카운터는 조건부 UPDATE로 (읽은 뒤 바뀐 상태도 반영)"""
+    def setUp(self):
+        registry.clear()
+        self.room = Room.objects.create(player_count=1, max_players=2)
+        self.host = Player.objects.create(room=self.room, nickname='host', is_host=True, slot=0)
+
+    def tearDown(self):
+        registry.clear()
+
+    def join(self, nickname):
+        return self.client.post('/api/rooms/join/', {
+            'room_code': self.room.room_code, 'nickname': nickname,
+        }, content_type='application/json')
+
+    def leave(self, player_id):
+        return self.client.post(
+            f'/api/rooms/{self.room.room_id}/leave/', {'player_id': player_id}, content_type='application/json'
+        )
+
+    def assert_counters(self, player_count, ready_count):
+        room = Room.objects.get(room_id=self.room.room_id)
+        self.assertEqual((room.player_count, room.ready_count), (player_count, ready_count))
+        self.assertEqual(room.players.count(), player_count)
+
+    def test_join_at_capacity(self):
+        self.assertEqual(self.join('guest1').status_code, 200)
+        response = self.join('guest2')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Room is full')
+        self.assert_counters(2, 0)
+
+    def test_join_after_leave_takes_freed_slot(self):
+        """가득 찬 방을 읽은 직후 다른 플레이어가 나가면 참가 성공 (인원은 UPDATE 시점 기준)"""
+        guest = self.join('guest1').json()['player_id']
+        lookup = views.get_object_or_404
+        left = []
+
+        def lookup_then_leave(*args, **kwargs):
+            room = lookup(*args, **kwargs)
+            if not left:  # 퇴장 뷰 안의 조회는 그대로
+                left.append(True)
+                self.assertEqual(self.leave(guest).status_code, 200)
+            return room
+
+        with patch.object(views, 'get_object_or_404', side_effect=lookup_then_leave):
+            response = self.join('guest2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Player.objects.get(player_id=response.json()['player_id']).slot, 1)
+        self.assert_counters(2, 0)
+
+    def test_leave_counts_ready_set_after_lookup(self):
+        """퇴장 요청이 플레이어를 읽은 뒤 ready가 기록돼도 ready_count가 함께 줄어듦"""
+        guest = self.join('guest1').json()['player_id']
+        lookup = views.get_player_with_room
+
+        def lookup_then_ready(room_id, player_id):
+            player = lookup(room_id, player_id)
+            Player.objects.filter(player_id=player_id).update(status=Player.Status.READY)
+            Room.objects.filter(room_id=room_id).update(ready_count=F('ready_count') + 1)
+            return player
+
+        with patch.object(views, 'get_player_with_room', side_effect=lookup_then_ready):
+            self.assertEqual(self.leave(guest).status_code, 200)
+        self.assert_counters(1, 0)
+
+    def test_leave_drops_player_history(self):
+        guest = self.join('guest1').json()['player_id']
+        history.add(self.room.room_id, guest, 1, 80)
+        self.leave(guest)
+        self.assertIsNone(history.message(self.room.room_id))
+
+    def test_start_rejected_until_counts_match(self):
+        guest = self.join('guest1').json()['player_id']
+        Player.objects.filter(player_id=self.host.player_id).update(status=Player.Status.READY)
+        Room.objects.filter(room_id=self.room.room_id).update(ready_count=1)
+
+        body = {'player_id': self.host.player_id, 'mode': 'steady_beat',
+                'time_limit_seconds': 60, 'bpm_min': 80, 'bpm_max': 120}
+        response = self.client.post(f'/api/rooms/{self.room.room_id}/start/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], '1/2 players ready')
+        self.assertEqual(Room.objects.get(room_id=self.room.room_id).status, Room.Status.WAITING)
+
+        # 준비 안 된 플레이어가 나가면 1/1 → 시작
+        self.assertEqual(self.leave(guest).status_code, 200)
+        response = self.client.post(f'/api/rooms/{self.room.room_id}/start/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        game_clock.cancel(self.room.room_id)
+
+
+class RoomDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.room = Room.objects.create(player_count=1)
+        self.host = Player.objects.create(room=self.room, nickname='host', is_host=True, slot=0)
+        self.url = f'/api/rooms/{self.room.room_id}/'
+
+    def test_unchanged_room_is_served_without_queries(self):
+        # 첫 조회: Room SELECT + players prefetch
+        with self.assertNumQueries(2):
+            first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        # 같은 버전: 캐시된 응답
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.json(), first.json())
+
+        # If-None-Match 일치: 304
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_mutation_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/rooms/join/', {
+                'room_code': self.room.room_code,
+                'nickname': 'guest',
+            }, content_type='application/json')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['players']), 2)
+
+
+class SamplesExportTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(status=Room.Status.FINISHED, player_count=2)
+        self.host = Player.objects.create(room=self.room, nickname='host', is_host=True, slot=0)
+        self.guest = Player.objects.create(room=self.room, nickname='guest', slot=1)
+        HeartRateSample.objects.bulk_create([
+            HeartRateSample(room=self.room, slot=slot, recorded_at_ms=t, bpm=bpm)
+            for t, slot, bpm in [(1000, 0, 80), (1200, 1, 90), (1500, 0, 82), (2100, 0, 100)]
+        ])
+        self.url = f'/api/rooms/{self.room.room_id}/samples/'
+
+    def get_lines(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson(self):
+        lines = [json.loads(line) for line in self.get_lines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1], {'t': 1200, 'slot': 1, 'player_id': self.guest.player_id, 'bpm': 90})
+
+    def test_csv_downsampled(self):
+        lines = self.get_lines(fmt='csv', resolution_ms=1000)
+        self.assertEqual(lines, [
+            'recorded_at_ms,slot,player_id,bpm',
+            f'1000,0,{self.host.player_id},81',
+            f'1000,1,{self.guest.player_id},90',
+            f'2000,0,{self.host.player_id},100',
+        ])
+
+    async def test_asgi_request_streams_async(self):
+        response = await self.async_client.get(self.url, {'fmt': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 5)
+
+    def test_rejects_unfinished_game_and_bad_params(self):
+        self.assertEqual(self.client.get(self.url, {'fmt': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'resolution_ms': '0'}).status_code, 400)
+        Room.objects.filter(pk=self.room.pk).update(status=Room.Status.PLAYING)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+
+class MetricsTests(TestCase):
+    def test_metrics_endpoint(self):
+        self.client.get('/api/rooms/unknown/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE heartsync_http_request_seconds histogram', body)
+        self.assertIn('heartsync_http_request_seconds_count{view="room-detail",method="GET",status="404"}', body)
+        self.assertIn('heartsync_ws_connections', body)
+        self.assertIn('# TYPE heartsync_sample_buffer_dropped_total counter', body)
+        self.assertIn('# TYPE heartsync_status_writes_total counter', body)
+
+    def test_connections_are_not_labelled_by_room(self):
+        for room_id in ('r1', 'r1', 'r2'):
+            metrics.connection_opened(room_id)
+        try:
+            body = metrics.render()
+        finally:
+            for room_id in ('r1', 'r1', 'r2'):
+                metrics.connection_closed(room_id)
+        self.assertNotIn('room=', body)
+        self.assertIn('heartsync_ws_connections 3', body)
+        self.assertIn('heartsync_ws_rooms 2', body)
+        self.assertIn('heartsync_ws_room_connections_max 2', body)
+
+    async def test_supervised_connections_exclude_resume_grace(self):
+        """ping 감시 연결 수와 재개 대기 수는 따로 (재개 대기 항목은 연결이 아님)"""
+        async def callback():
+            pass
+
+        ping_supervisor.schedule('channel-1', 60, callback)
+        resume_timers.schedule(resume.grace_key('r1', 'p1'), 60, callback)
+        try:
+            body = metrics.render()
+        finally:
+            ping_supervisor.cancel('channel-1')
+            resume_timers.cancel(resume.grace_key('r1', 'p1'))
+        self.assertIn('heartsync_ping_supervised_connections 1', body)
+        self.assertIn('heartsync_resume_pending 1', body)
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram('test_seconds', "테스트", ('type',))
+        histogram.observe(0.0003, 'ping')
+        histogram.observe(3.0, 'ping')
+        lines = list(histogram.collect())
+        self.assertIn('test_seconds_bucket{type="ping",le="0.0005"} 1', lines)
+        self.assertIn('test_seconds_bucket{type="ping",le="2.5"} 1', lines)
+        self.assertIn('test_seconds_bucket{type="ping",le="+Inf"} 2', lines)
+        self.assertIn('test_seconds_count{type="ping"} 2', lines)
+
+
+class IngressLimiterTests(SimpleTestCase):
+    def test_excess_frames_are_coalesced_to_latest(self):
+        forwarded = []
+
+        async def forward(player_id, bpm):
+            forwarded.append(bpm)
+
+        async def run():
+            limiter = IngressLimiter(rate=50, burst=2, forward=forward)
+            for bpm in range(100, 110):
+                await limiter.submit('p1', bpm)
+            # 버스트 2개는 바로 처리, 나머지는 보관
+            self.assertEqual(forwarded, [100, 101])
+            self.assertEqual(limiter.pending, {'p1': 109})
+            await limiter.task
+            limiter.close()
+
+        asyncio.run(run())
+        # 토큰이 찬 뒤 최신 값만 처리 (102~108은 버림)
+        self.assertEqual(forwarded, [100, 101, 109])
+
+
+class BinaryProtocolTests(SimpleTestCase):
+    """바이너리 프레임 인코딩 ↔ 클라이언트 쪽 해석 (struct 레이아웃 그대로)"""
+    def decode_records(self, data, count):
+        return [struct.unpack_from('!BHH', data, i * 5) for i in range(count)]
+
+    def test_heart_rate_round_trip(self):
+        frame = protocol.encode_heart_rate(3, 72, now_ms=123456)
+        self.assertEqual(struct.unpack_from('!BI', frame), (protocol.FRAME_HEART_RATE, 123456))
+        self.assertEqual(self.decode_records(frame[5:], 1), [(3, 72, 0)])
+
+    def test_snapshot_round_trip_clamps_values(self):
+        frame = protocol.encode_snapshot([(0, 80, 12.7), (1, 70000, -5)], now_ms=1)
+        kind, now_ms, count = struct.unpack_from('!BIB', frame)
+        self.assertEqual((kind, now_ms, count), (protocol.FRAME_ROOM_SNAPSHOT, 1, 2))
+        self.assertEqual(self.decode_records(frame[6:], count), [(0, 80, 12), (1, 0xFFFF, 0)])
+
+    def test_delta_round_trip(self):
+        for keyframe, kind in ((True, protocol.FRAME_ROOM_KEYFRAME), (False, protocol.FRAME_ROOM_DELTA)):
+            frame = protocol.encode_snapshot_delta(7, keyframe, [(2, 95, 40)], now_ms=9)
+            self.assertEqual(struct.unpack_from('!BIIB', frame), (kind, 9, 7, 1))
+            self.assertEqual(self.decode_records(frame[10:], 1), [(2, 95, 40)])
+
+    def test_decode_inbound(self):
+        self.assertEqual(protocol.decode_inbound(struct.pack('!BBH', protocol.FRAME_HEART_RATE, 3, 120)), (3, 120))
+        with self.assertRaises(protocol.FrameError):
+            protocol.decode_inbound(b'\x01\x03')
+        with self.assertRaises(protocol.FrameError):
+            protocol.decode_inbound(struct.pack('!BBH', protocol.FRAME_ROOM_SNAPSHOT, 3, 120))
+
+
+class LobbyPushTests(TransactionTestCase):
+    """로비 상태: 연결 직후 lobby_snapshot, 이후 참가/퇴장은 lobby_update"""
+    def tearDown(self):
+        registry.clear()
+
+    async def test_snapshot_then_join_and_leave_updates(self):
+        created = await sync_to_async(self.client.post)(
+            '/api/rooms/', {'host_nickname': 'host'}, content_type='application/json'
+        )
+        room_id = created.json()['room_id']
+        socket = WebsocketCommunicator(application, f'/ws/game/{room_id}/')
+        await socket.connect()
+
+        snapshot = await socket.receive_json_from()
+        self.assertEqual(snapshot['type'], 'lobby_snapshot')
+        self.assertEqual([p['nickname'] for p in snapshot['players']], ['host'])
+
+        joined = await sync_to_async(self.client.post)('/api/rooms/join/', {
+            'room_code': created.json()['room_code'], 'nickname': 'guest',
+        }, content_type='application/json')
+        guest_id = joined.json()['player_id']
+        update = await socket.receive_json_from()
+        self.assertEqual((update['type'], update['event']), ('lobby_update', 'player_joined'))
+        self.assertEqual((update['player']['player_id'], update['player']['slot']), (guest_id, 1))
+        self.assertGreater(update['version'], snapshot['version'])
+
+        await sync_to_async(self.client.post)(
+            f'/api/rooms/{room_id}/leave/', {'player_id': guest_id}, content_type='application/json'
+        )
+        update = await socket.receive_json_from()
+        self.assertEqual((update['event'], update['player_id']), ('player_left', guest_id))
+        self.assertTrue(await socket.receive_nothing(0.1))
+        await socket.disconnect()
+
+
+class BinarySubprotocolTests(TransactionTestCase):
+    def tearDown(self):
+        registry.clear()
+        resume.active.clear()
+
+    async def test_binary_client_round_trip(self):
+        """바이너리로 보낸 내 slot의 심박수가 바이너리 heart_rate 프레임으로 돌아옴"""
+        created = await sync_to_async(self.client.post)(
+            '/api/rooms/', {'host_nickname': 'host'}, content_type='application/json'
+        )
+        room_id = created.json()['room_id']
+        socket = WebsocketCommunicator(
+            application, f"/ws/game/{room_id}/?token={created.json()['session_token']}",
+            subprotocols=[protocol.SUBPROTOCOL_BINARY],
+        )
+        connected, subprotocol = await socket.connect()
+        self.assertEqual((connected, subprotocol), (True, protocol.SUBPROTOCOL_BINARY))
+        await socket.receive_json_from()  # lobby_snapshot (JSON)
+
+        await socket.send_to(bytes_data=struct.pack('!BBH', protocol.FRAME_HEART_RATE, 0, 88))
+        frame = (await socket.receive_output(1))['bytes']
+        self.assertEqual(frame[0], protocol.FRAME_HEART_RATE)
+        self.assertEqual(struct.unpack_from('!BHH', frame, 5), (0, 88, 0))
+        await socket.disconnect()
+
+
+class AggregatorTickTests(SimpleTestCase):
+    async def test_samples_within_a_tick_coalesce_into_one_snapshot(self):
+        layer = InMemoryChannelLayer()
+        channel = await layer.new_channel()
+        await layer.group_add('game_r1', channel)
+        aggregator = RoomAggregator(layer, 'game_r1', tick_hz=20)
+        try:
+            for bpm in (80, 81, 82):
+                aggregator.update('a', bpm, 0)
+            aggregator.update('b', 90, 1)
+
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual(message['type'], 'send_room_snapshot')
+            self.assertEqual(json.loads(message['text'])['players'], [
+                {'player_id': 'a', 'bpm': 82}, {'player_id': 'b', 'bpm': 90},
+            ])
+
+            # 새 샘플이 없는 tick은 보내지 않음
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(channel), 0.2)
+            aggregator.update('a', 83, 0)
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual(json.loads(message['text'])['players'][0], {'player_id': 'a', 'bpm': 83})
+        finally:
+            aggregator.stop()
+
+
+class DeltaSnapshotTests(SimpleTestCase):
+    def frames(self, keyframe_interval):
+        async def run():
+            aggregator = RoomAggregator(None, 'game_test', tick_hz=10, keyframe_interval=keyframe_interval)
+            aggregator.update('a', 80, 0)
+            aggregator.update('b', 90, 1)
+            frames = [aggregator.next_event()]
+            aggregator.update('a', 81, 0)
+            frames.append(aggregator.next_event())
+            aggregator.forget('b')
+            frames.append(aggregator.next_event())
+            aggregator.update('a', 82, 0)
+            frames.append(aggregator.next_event())
+            aggregator.stop()
+            return [json.loads(frame['text']) for frame in frames]
+        return asyncio.run(run())
+
+    def test_delta_frames_carry_changed_players_and_periodic_keyframes(self):
+        frames = self.frames(keyframe_interval=4)
+        self.assertEqual([f['seq'] for f in frames], [1, 2, 3, 4])
+        self.assertEqual([f['keyframe'] for f in frames], [False, False, False, True])
+        self.assertEqual(frames[0]['players'], [{'player_id': 'a', 'bpm': 80}, {'player_id': 'b', 'bpm': 90}])
+        self.assertEqual(frames[1]['players'], [{'player_id': 'a', 'bpm': 81}])
+        # 퇴장한 플레이어는 bpm 0
+        self.assertEqual(frames[2]['players'], [{'player_id': 'b', 'bpm': 0}])
+        self.assertEqual(frames[3]['players'], [{'player_id': 'a', 'bpm': 82}])
+
+    def test_full_snapshots_when_disabled(self):
+        frames = self.frames(keyframe_interval=0)
+        self.assertNotIn('seq', frames[0])
+        self.assertEqual(frames[1]['players'], [{'player_id': 'a', 'bpm': 81}, {'player_id': 'b', 'bpm': 90}])
+
+
+class SpectatorFeedTests(SimpleTestCase):
+    @override_settings(SPECTATOR_SNAPSHOT_HZ=2, HEART_RATE_TICK_HZ=10, HEART_RATE_KEYFRAME_INTERVAL=5)
+    def test_feed_is_separate_low_rate_full_snapshot(self):
+        feed = spectators.join_feed(None, 'r1')
+        try:
+            self.assertEqual(feed.group_name, 'spectate_r1')
+            self.assertEqual(feed.interval, 0.5)
+            self.assertFalse(feed.delta)
+            self.assertIs(spectators.get_feed('r1'), feed)
+        finally:
+            spectators.leave_feed('r1')
+        self.assertIsNone(spectators.get_feed('r1'))
+
+
+class HistoryTests(SimpleTestCase):
+    def test_ring_buffer_keeps_last_samples_within_window(self):
+        store = HistoryStore(size=3, seconds=10)
+        for i, bpm in enumerate([70, 71, 72, 73, 74]):
+            store.add('r1', 'a', 0, bpm, now_ms=1000 * i)
+        store.add('r1', 'b', 1, 90, now_ms=0)
+
+        message = store.message('r1', now_ms=12000)
+        # a: 크기 3 → 마지막 3개 / b: 10초 이전 샘플이라 제외
+        self.assertEqual(message['players'], [
+            {'player_id': 'a', 'slot': 0, 'age_ms': [10000, 9000, 8000], 'bpm': [72, 73, 74]},
+        ])
+        self.assertEqual(len(store.rooms['r1']['a'].bpm), 3)
+
+        store.drop('r1')
+        self.assertIsNone(store.message('r1'))
+
+    def test_size_covers_window_at_ingress_rate(self):
+        """수신 제한 속도(10Hz)로 60초 동안 보내도 기간 전체가 남음"""
+        store = HistoryStore(size=history_size(60, 10), seconds=60)
+        for i in range(600):
+            store.add('r1', 'a', 0, 80, now_ms=100 * i)
+        message = store.message('r1', now_ms=60000)
+        self.assertEqual(len(message['players'][0]['bpm']), 600)
+        self.assertEqual(history_size(60, 0), 600)  # 수신 제한 없음 → 10Hz로 계산
+        self.assertEqual(history_size(0, 10), 0)
+
+    def test_drop_player_keeps_others(self):
+        store = HistoryStore(size=3, seconds=10)
+        store.add('r1', 'a', 0, 70, now_ms=0)
+        store.add('r1', 'b', 1, 90, now_ms=0)
+        store.drop_player('r1', 'b')
+        self.assertEqual([p['player_id'] for p in store.message('r1', now_ms=0)['players']], ['a'])
+
+
+class ScoringTests(SimpleTestCase):
+    def board(self, mode, bpm_min=80, bpm_max=120):
+        return RoomScoreboard(None, 'game_r1', 'r1', mode, bpm_min, bpm_max, interval=60)
+
+    def feed(self, board, player_id, samples):
+        for now_ms, bpm in samples:
+            board.add(player_id, bpm, now_ms)
+        board.stop()
+        return board.players[player_id]
+
+    async def test_steady_beat_counts_time_inside_range(self):
+        board = self.board(Room.Mode.STEADY_BEAT)
+        # 0~1초 구간 안, 1~2초 밖(130), 2~3초 안
+        score = self.feed(board, 'a', [(0, 100), (1000, 130), (2000, 100), (3000, 100)])
+        self.assertEqual((score.zone_ms, score.best_streak_ms), (2000, 1000))
+        self.assertEqual((score.min_bpm, score.max_bpm, round(score.mean)), (100, 130, 108))
+
+    async def test_pulse_rush_counts_time_at_or_above_max(self):
+        board = self.board(Room.Mode.PULSE_RUSH, bpm_max=140)
+        score = self.feed(board, 'a', [(0, 150), (1000, 140), (2000, 130), (3000, 150)])
+        self.assertEqual((score.zone_ms, score.best_streak_ms, score.streak_ms), (2000, 2000, 0))
+
+    async def test_sensor_gap_is_capped(self):
+        board = self.board(Room.Mode.STEADY_BEAT)
+        score = self.feed(board, 'a', [(0, 100), (60000, 100)])
+        self.assertEqual(score.zone_ms, 5000)  # MAX_SAMPLE_GAP_MS
+
+    async def test_ranking_orders_by_score(self):
+        board = self.board(Room.Mode.STEADY_BEAT)
+        self.feed(board, 'low', [(0, 100), (1000, 100)])
+        self.feed(board, 'high', [(0, 100), (3000, 100)])
+        ranking = board.ranking()
+        self.assertEqual([(r['rank'], r['player_id']) for r in ranking], [(1, 'high'), (2, 'low')])
+        self.assertEqual(ranking[0]['score'], 3000 // 100 + 3000 // 200)
+
+
+class DeadlineSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = DeadlineScheduler(resolution=0.005)
+        self.fired = []
+
+    def callback(self, key):
+        async def fire():
+            self.fired.append(key)
+        return fire
+
+    def schedule(self, key, delay):
+        self.scheduler.schedule(key, delay, self.callback(key))
+
+    async def run_for(self, seconds):
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.scheduler._task.cancel()
+
+    async def test_fires_in_deadline_order_after_cancel_and_reschedule(self):
+        self.schedule('a', 0.08)
+        self.schedule('b', 0.04)
+        self.schedule('c', 0.02)
+        self.scheduler.cancel('c')
+        self.schedule('a', 0.01)  # 더 이르게 다시 등록
+        await self.run_for(0.15)
+        self.assertEqual(self.fired, ['a', 'b'])
+        self.assertEqual(len(self.scheduler), 0)
+
+    async def test_rescheduled_later_keeps_one_heap_entry(self):
+        """더 늦게 다시 등록한 key의 이전 힙 항목은 버려지고 다시 넣지 않음"""
+        self.schedule('a', 0.01)
+        self.schedule('a', 0.06)
+        await asyncio.sleep(0.03)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(len(self.scheduler._heap), 1)
+        await self.run_for(0.07)
+        self.assertEqual(self.fired, ['a'])
+
+    async def test_touch_extends_deadline(self):
+        self.schedule('a', 0.02)
+        self.scheduler.touch('a', 0.06)
+        await asyncio.sleep(0.04)
+        self.assertEqual(self.fired, [])
+        await self.run_for(0.06)
+        self.assertEqual(self.fired, ['a'])
+
+
+class ReplayLogTests(SimpleTestCase):
+    def test_since_returns_missed_events_inside_window(self):
+        log = resume.ReplayLog(size=3)
+        for i in range(5):
+            event = log.event('r1', 'send_lobby_update', {'type': 'lobby_update', 'n': i})
+        self.assertEqual(event['event_seq'], 5)
+        self.assertEqual(json.loads(event['text'])['event_seq'], 5)
+
+        self.assertEqual([json.loads(text)['n'] for text in log.since('r1', 3)], [3, 4])
+        self.assertEqual(log.since('r1', 5), [])
+        self.assertIsNone(log.since('r1', 1))  # 2번이 창 밖으로 밀려남
+        self.assertIsNone(log.since('r1', 9))  # 서버 재시작 등으로 번호가 맞지 않음
+        self.assertEqual(log.since('r2', 0), [])
+
+        log.drop('r1')
+        self.assertEqual(log.current('r1'), 0)
+
+    def test_room_count_is_capped(self):
+        """가장 오래 이벤트가 없던 방부터 버림, 버린 방의 이전 번호로는 재개하지 않음"""
+        log = resume.ReplayLog(size=3, max_rooms=2)
+        for room_id in ('r1', 'r2', 'r1', 'r3'):
+            log.event(room_id, 'send_lobby_update', {'type': 'lobby_update'})
+        self.assertEqual(list(log.rooms), ['r1', 'r3'])
+        self.assertIsNone(log.since('r2', 1))
+
+        event = log.event('r2', 'send_lobby_update', {'type': 'lobby_update'})
+        self.assertEqual(list(log.rooms), ['r3', 'r2'])
+        self.assertEqual(event['event_seq'], 3)  # 버린 r1/r2의 마지막 번호(2) 다음을 비워 둠
+        self.assertIsNone(log.since('r2', 1))
+        self.assertIsNone(log.since('r1', 2))
+
+    async def test_finished_game_events_are_dropped_after_grace(self):
+        log = resume.ReplayLog(size=3)
+        log.event('r1', 'send_lobby_update', {'type': 'lobby_update'})
+        with patch.object(game_clock, '_finish_rooms', return_value=['r1']), \
+                patch('rooms.game_clock.replay', log), override_settings(RESUME_GRACE_SECONDS=0.05):
+            await game_clock.expire(['r1'])
+            self.assertEqual(log.current('r1'), 2)  # game_over까지 보관
+            await asyncio.sleep(1.2)
+        self.assertNotIn('r1', log.rooms)
+
+    def test_zero_window_disables_numbering(self):
+        """멀티 워커용 (RESUME_REPLAY_WINDOW = 0): 번호 없이 전송, 재개 요청은 항상 전체 상태"""
+        log = resume.ReplayLog(size=0)
+        event = log.event('r1', 'send_lobby_update', {'type': 'lobby_update'})
+        self.assertNotIn('event_seq', event)
+        self.assertEqual(log.current('r1'), 0)
+        self.assertIsNone(log.since('r1', 0))
+
+    def test_token_is_bound_to_room(self):
+        token = resume.make_token('r1', 'p1')
+        self.assertEqual(resume.read_token(token, 'r1'), 'p1')
+        self.assertIsNone(resume.read_token(token, 'r2'))
+        self.assertIsNone(resume.read_token(token + 'x', 'r1'))
+
+
+class OutboxTests(SimpleTestCase):
+    def test_slow_socket_gets_control_events_and_latest_heart_rate(self):
+        sent = []
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def send(event):
+                await gate.wait()
+                sent.append(event['text'])
+
+            async def evict():
+                self.fail("evicted")
+
+            outbox = Outbox(send, evict)
+            await outbox.put_latest({'text': 'a-100', 'key': 'a'})
+            await asyncio.sleep(0)  # 첫 전송이 소켓에서 막힘
+            for bpm in range(101, 110):
+                await outbox.put_latest({'text': f'a-{bpm}', 'key': 'a'})
+            await outbox.put_latest({'text': 'b-80', 'key': 'b'})
+            await outbox.put({'text': 'ready'})
+            await outbox.put({'text': 'disconnected'})
+            gate.set()
+            await outbox.task
+
+        asyncio.run(run())
+        self.assertEqual(sent, ['a-100', 'ready', 'disconnected', 'a-109', 'b-80'])
+
+    @override_settings(CONSUMER_SLOW_EVICT_SECONDS=0.01)
+    def test_stalled_socket_is_evicted(self):
+        evicted = []
+
+        async def run():
+            async def send(event):
+                await asyncio.Event().wait()  # 전송이 끝나지 않음
+
+            async def evict():
+                evicted.append(True)
+
+            outbox = Outbox(send, evict)
+            await outbox.put({'text': 'ready'})
+            await asyncio.sleep(0.02)
+            await outbox.put_latest({'text': 'a-100', 'key': 'a'})
+            self.assertTrue(outbox.closed)
+            self.assertFalse(outbox.control or outbox.latest)
+
+        asyncio.run(run())
+        self.assertEqual(evicted, [True])
+
+
+    @override_settings(CONSUMER_ACK_WINDOW=2, CONSUMER_SLOW_EVICT_SECONDS=0.05)
+    def test_ack_window_throttles_socket_whose_send_never_blocks(self):
+        """Daphne처럼 send()가 바로 끝나도 ack가 밀리면 최신 값 교체 후 끊기"""
+        sent = []
+        evicted = []
+
+        async def run():
+            async def send(event):
+                outbox.sent_frame()
+                sent.append(event['text'])
+
+            async def evict():
+                evicted.append(True)
+
+            outbox = Outbox(send, evict)
+            outbox.ack(0)
+            for bpm in range(100, 105):
+                await outbox.put_latest({'text': f'a-{bpm}', 'key': 'a'})
+                await asyncio.sleep(0)
+            await outbox.put({'text': 'ready'})
+            await asyncio.sleep(0.01)
+            self.assertEqual(sent, ['a-100', 'a-101'])  # 창(2)만큼 보내고 대기
+            self.assertEqual(outbox.latest['a']['text'], 'a-104')
+
+            outbox.ack(2)
+            await asyncio.sleep(0.01)
+            self.assertEqual(sent, ['a-100', 'a-101', 'ready', 'a-104'])
+
+            # ack가 더 오지 않으면 밀린 연결로 끊음
+            await outbox.put_latest({'text': 'a-105', 'key': 'a'})
+            await asyncio.sleep(0.06)
+            await outbox.put_latest({'text': 'a-106', 'key': 'a'})
+
+        asyncio.run(run())
+        self.assertEqual(evicted, [True])
+
+    def test_without_acks_send_is_never_throttled(self):
+        sent = []
+
+        async def run():
+            async def send(event):
+                outbox.sent_frame()
+                sent.append(event['text'])
+
+            outbox = Outbox(send, None)
+            for bpm in range(100, 200):
+                await outbox.put_latest({'text': f'a-{bpm}', 'key': 'a'})
+                await asyncio.sleep(0)
+
+        asyncio.run(run())
+        self.assertEqual(len(sent), 100)
+
+
+class ReaperTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def tearDown(self):
+        registry.clear()
+
+    def make_room(self, status, created_minutes_ago, finished_minutes_ago=None, active_minutes_ago=None):
+        room = Room.objects.create(player_count=1, status=status)
+        Player.objects.create(room=room, nickname='host', is_host=True, slot=0)
+        HeartRateSample.objects.create(room=room, slot=0, recorded_at_ms=1, bpm=80)
+        if active_minutes_ago is None:
+            active_minutes_ago = created_minutes_ago
+        Room.objects.filter(room_id=room.room_id).update(
+            created_at=self.now - timedelta(minutes=created_minutes_ago),
+            last_activity_at=self.now - timedelta(minutes=active_minutes_ago),
+            finished_at=(
+                None if finished_minutes_ago is None
+                else self.now - timedelta(minutes=finished_minutes_ago)
+            ),
+        )
+        return room.room_id
+
+    def reap(self):
+        ttls = {Room.Status.FINISHED: 600, Room.Status.WAITING: 3600}
+        return reaper.reap(batch_size=1, ttls=ttls, now=self.now)
+
+    def test_finished_ttl_counts_from_finish(self):
+        # 2시간 전에 만들었지만 방금 끝난 방은 남김 (내보내기 가능)
+        just_finished = self.make_room(Room.Status.FINISHED, 120, finished_minutes_ago=1)
+        expired = self.make_room(Room.Status.FINISHED, 30, finished_minutes_ago=11)
+        playing = self.make_room(Room.Status.PLAYING, 120)
+
+        results = self.reap()
+
+        self.assertEqual([(r.status, r.rooms, r.players, r.samples) for r in results], [
+            (Room.Status.FINISHED, 1, 1, 1),
+        ])
+        self.assertEqual(
+            set(Room.objects.values_list('room_id', flat=True)), {just_finished, playing}
+        )
+        self.assertFalse(HeartRateSample.objects.filter(room_id=expired).exists())
+
+    def test_waiting_ttl_counts_from_last_activity(self):
+        fresh = self.make_room(Room.Status.WAITING, 59)
+        # 오래전에 만들었지만 방금 누가 참가한 로비는 남김
+        active = self.make_room(Room.Status.WAITING, 120, active_minutes_ago=1)
+        for _ in range(2):
+            self.make_room(Room.Status.WAITING, 61)
+
+        results = self.reap()
+
+        # batch_size=1 → 배치 두 번
+        self.assertEqual([r.rooms for r in results], [1, 1])
+        self.assertEqual(set(Room.objects.values_list('room_id', flat=True)), {fresh, active})
+
+    def test_join_refreshes_last_activity(self):
+        room_id = self.make_room(Room.Status.WAITING, 120)
+        room = Room.objects.get(room_id=room_id)
+        response = self.client.post('/api/rooms/join/', {'room_code': room.room_code, 'nickname': 'guest'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.reap(), [])
+
+
+    def test_samples_are_deleted_in_row_limited_transactions(self):
+        """방 하나의 샘플이 많아도 트랜잭션 하나에서 지우는 행 수는 ROOM_REAP_SAMPLE_BATCH_SIZE까지"""
+        room_id = self.make_room(Room.Status.FINISHED, 30, finished_minutes_ago=11)
+        HeartRateSample.objects.bulk_create([
+            HeartRateSample(room_id=room_id, slot=0, recorded_at_ms=t, bpm=80) for t in range(2, 6)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            results = reaper.reap_batch(
+                Room.Status.FINISHED, self.now - timedelta(minutes=10), 10, sample_batch_size=2
+            )
+        sample_deletes = [
+            q['sql'] for q in queries
+            if q['sql'].startswith('DELETE FROM "rooms_heartratesample"') and 'LIMIT 2' in q['sql']
+        ]
+        self.assertEqual(len(sample_deletes), 3)  # 2 + 2 + 1행 (방 삭제 때 CASCADE DELETE는 남은 행 없음)
+        self.assertEqual((results.rooms, results.players, results.samples), (1, 1, 5))
+        self.assertFalse(Room.objects.filter(room_id=room_id).exists())
+
+    def test_cleanup_room_drops_memory_state(self):
+        room = Room.objects.create(player_count=1)
+        host = Player.objects.create(room=room, nickname='host', is_host=True, slot=0)
+        registry.add_player(host, room=room)
+        history.add(room.room_id, host.player_id, 0, 80)
+        resume.replay.event(room.room_id, 'send_lobby_update', {'type': 'lobby_update'})
+        codes = reaper.room_codes
+        codes.allocate()  # pool 생성
+        remaining = len(codes)
+
+        reaper.cleanup_room(room.room_id, room.room_code)
+
+        self.assertIsNone(registry.get_room(room.room_id))
+        self.assertIsNone(history.message(room.room_id))
+        self.assertEqual(resume.replay.current(room.room_id), 0)
+        self.assertEqual(len(codes), remaining + 1)
+
+
+class RoomCodeAllocatorTests(TestCase):
+    def test_allocates_each_code_once_until_exhausted(self):
+        codes = RoomCodeAllocator(space=50)
+        allocated = [codes.allocate() for _ in range(50)]
+        self.assertEqual(sorted(allocated), [f'{code:06d}' for code in range(50)])
+        self.assertEqual(len(codes), 0)
+        with self.assertRaises(RuntimeError):
+            codes.allocate()
+
+    def test_swap_remove_keeps_pool_unique(self):
+        codes = RoomCodeAllocator(space=50)
+        taken = {codes.allocate() for _ in range(20)}
+        self.assertEqual(len(codes), 30)
+        pool = [f'{code:06d}' for code in codes._pool]
+        self.assertEqual(len(set(pool)), 30)
+        self.assertFalse(taken & set(pool))
+
+    def test_released_code_is_reused(self):
+        codes = RoomCodeAllocator(space=2)
+        first = codes.allocate()
+        codes.allocate()  # 두 번째 코드까지 할당해서 pool을 비움
+        codes.release(first)
+        self.assertEqual(codes.allocate(), first)
+        with self.assertRaises(RuntimeError):
+            codes.allocate()
+
+    def test_codes_of_open_rooms_are_skipped_until_released(self):
+        Room.objects.create(room_code='000001')
+        Room.objects.create(room_code='000002', status=Room.Status.FINISHED)
+        codes = RoomCodeAllocator(space=3)
+        self.assertEqual(len(codes), 3)
+        self.assertEqual(sorted([codes.allocate(), codes.allocate()]), ['000000', '000002'])
+        with self.assertRaises(RuntimeError):
+            codes.allocate()
+        codes.release('000001')
+        self.assertEqual(codes.allocate(), '000001')
+
+    def test_create_retry_returns_colliding_code(self):
+        """다른 워커와 겹친 코드도 pool로 돌려놓고 새 코드로 재시도"""
+        taken = Room.objects.create().room_code
+        with patch.object(room_codes, 'allocate', side_effect=[taken, '999998']), \
+                patch.object(room_codes, 'release') as release:
+            response = self.client.post('/api/rooms/', {'host_nickname': 'host'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['room_code'], '999998')
+        release.assert_called_once_with(taken)
+
+
+class StatusWriterTests(TransactionTestCase):
+    async def test_ready_burst_counts_only_waiting_players(self):
+        """동시 ready + 중복 ready + 게임 중 ready → 트랜잭션 하나, 대기 중이던 플레이어만 카운트"""
+        room = await sync_to_async(Room.objects.create)(
+            player_count=4, last_activity_at=timezone.now() - timedelta(hours=1)
+        )
+        players = []
+        for slot, status in enumerate(['waiting', 'waiting', 'waiting', 'playing']):
+            players.append(await sync_to_async(Player.objects.create)(
+                room=room, nickname=f'p{slot}', slot=slot, status=status
+            ))
+        writer = StatusWriter(window=0.01)
+
+        requests = [p.player_id for p in players] + [players[0].player_id]
+        nicknames = await asyncio.gather(*[
+            writer.set_status(room.room_id, player_id, Player.Status.READY) for player_id in requests
+        ])
+
+        self.assertEqual(nicknames, ['p0', 'p1', 'p2', None, 'p0'])
+        self.assertEqual(writer.writes, 1)
+        await sync_to_async(room.refresh_from_db)()
+        self.assertEqual(room.ready_count, 3)
+        self.assertGreater(room.last_activity_at, timezone.now() - timedelta(minutes=1))  # reaper의 WAITING 기준
+        playing = await sync_to_async(Player.objects.get)(player_id=players[3].player_id)
+        self.assertEqual(playing.status, Player.Status.PLAYING)
+
+        # 이미 READY인 플레이어의 ready는 닉네임은 돌려주지만 카운터는 그대로
+        self.assertEqual(await writer.set_status(room.room_id, players[0].player_id, Player.Status.READY), 'p0')
+        await sync_to_async(room.refresh_from_db)()
+        self.assertEqual(room.ready_count, 3)
+
+
+class SampleBufferTests(TransactionTestCase):
+    def make_buffer(self, max_pending=100):
+        return SampleBuffer(flush_size=1000, flush_interval=60, max_pending=max_pending)
+
+    async def test_flush_and_drop_count(self):
+        room = await sync_to_async(Room.objects.create)()
+        buffer = self.make_buffer(max_pending=3)
+        for bpm in range(70, 75):
+            buffer.add(room.room_id, 0, bpm)
+        buffer.task.cancel()
+        self.assertEqual(buffer.dropped, 2)
+
+        await buffer.flush()
+
+        bpms = await sync_to_async(list)(
+            HeartRateSample.objects.filter(room=room).values_list('bpm', flat=True)
+        )
+        self.assertEqual(sorted(bpms), [72, 73, 74])  # 가장 오래된 2개를 버림
+        self.assertEqual(buffer.written, 3)
+        self.assertFalse(buffer.pending)
+
+    async def test_samples_of_deleted_room_are_skipped(self):
+        room = await sync_to_async(Room.objects.create)()
+        buffer = self.make_buffer()
+        buffer.add(room.room_id, 0, 80)
+        buffer.add('deleted', 0, 90)
+        buffer.add(room.room_id, 1, 100)
+        buffer.task.cancel()
+
+        await buffer.flush()
+
+        rows = await sync_to_async(list)(HeartRateSample.objects.values_list('room_id', 'bpm'))
+        self.assertEqual(sorted(rows), [(room.room_id, 80), (room.room_id, 100)])
+        self.assertEqual(buffer.written, 2)
+
+
+class UnixSocketLayerTests(SimpleTestCase):
+    """워커 두 개 = 레이어 인스턴스 두 개 (a는 테스트 루프, b는 별도 스레드의 이벤트 루프)"""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.a = UnixSocketChannelLayer(path=self.tmp.name)
+        self.b = UnixSocketChannelLayer(path=self.tmp.name)
+        self.b_loop = asyncio.new_event_loop()
+        self.b_thread = threading.Thread(target=self.b_loop.run_forever, daemon=True)
+        self.b_thread.start()
+
+    def tearDown(self):
+        self.b_loop.call_soon_threadsafe(self.b_loop.stop)
+        self.b_thread.join(5)
+        self.b_loop.close()
+        self.a._cleanup()
+        self.b._cleanup()
+        self.tmp.cleanup()
+
+    async def on_b(self, coro):
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.b_loop))
+
+    async def close_layers(self):
+        """테스트 루프가 닫히기 전에 양쪽 연결 정리"""
+        await self.on_b(self.b.close())
+        await self.a.close()
+        await asyncio.sleep(0)
+
+    async def test_send_and_group_send_across_workers(self):
+        try:
+            a_channel = await self.a.new_channel()
+            b_channel = await self.on_b(self.b.new_channel())
+
+            await self.a.send(b_channel, {'type': 'hello', 'n': 1})
+            self.assertEqual(await self.on_b(self.b.receive(b_channel)), {'type': 'hello', 'n': 1})
+
+            await self.a.group_add('game_r1', a_channel)
+            await self.on_b(self.b.group_add('game_r1', b_channel))
+            await self.a.group_send('game_r1', {'type': 'tick', 'n': 2})
+            self.assertEqual(await self.a.receive(a_channel), {'type': 'tick', 'n': 2})
+            self.assertEqual(await self.on_b(self.b.receive(b_channel)), {'type': 'tick', 'n': 2})
+
+            # 다른 워커가 나간 뒤에는 캐시된 목록이 아니라 바뀐 목록으로 전송
+            await self.on_b(self.b.group_discard('game_r1', b_channel))
+            await self.a.group_send('game_r1', {'type': 'tick', 'n': 3})
+            self.assertEqual(await self.a.receive(a_channel), {'type': 'tick', 'n': 3})
+            await self.on_b(self.b.group_add('game_r1', b_channel))
+            await self.a.group_send('game_r1', {'type': 'tick', 'n': 4})
+            self.assertEqual(await self.on_b(self.b.receive(b_channel)), {'type': 'tick', 'n': 4})
+        finally:
+            await self.close_layers()
+
+    async def test_dead_worker_membership_is_removed(self):
+        try:
+            a_channel = await self.a.new_channel()
+            await self.a.group_add('game_r1', a_channel)
+            dead = self.a.groups_path / 'game_r1' / 'specific.wdead!abcdef'
+            dead.touch()
+
+            await self.a.group_send('game_r1', {'type': 'tick'})
+
+            self.assertEqual(await self.a.receive(a_channel), {'type': 'tick'})
+            self.assertFalse(dead.exists())
+        finally:
+            await self.close_layers()
+
+    async def test_score_samples_reach_owner_worker(self):
+        """게임을 시작한 워커(a)의 점수판이 다른 워커(b)에서 보낸 샘플을 받음"""
+        room = Room(room_id='r1', status=Room.Status.PLAYING, bpm_min=80, bpm_max=120)
+        registry.warm(room, [])
+        try:
+            inbox = await scoring.open_inbox(self.a)
+            self.assertIsNotNone(inbox)
+            for now_ms in (0, 1000):
+                await self.on_b(self.b.send(inbox, {
+                    'type': 'score.sample', 'room_id': 'r1', 'player_id': 'p1', 'bpm': 100, 'now_ms': now_ms,
+                }))
+            for _ in range(100):
+                scoreboard = scoring.get_scoreboard('r1')
+                if scoreboard is not None and scoreboard.players['p1'].count == 2:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(scoring.finish('r1')[0]['time_in_zone'], 1)
+        finally:
+            scoring._inbox_task.cancel()
+            registry.clear()
+            await self.close_layers()
+
+    async def test_flush_removes_own_memberships(self):
+        try:
+            a_channel = await self.a.new_channel()
+            b_channel = await self.on_b(self.b.new_channel())
+            await self.a.group_add('game_r1', a_channel)
+            await self.on_b(self.b.group_add('game_r1', b_channel))
+
+            await self.a.flush()
+
+            self.assertEqual(await self.a._group_members('game_r1'), [b_channel])
+        finally:
+            await self.close_layers()
+
+
+class GameClockEndToEndTests(TransactionTestCase):
+    """ASGI HTTP로 게임을 시작하면 서버 시계가 제한 시간 뒤 방을 끝내고 game_over 전송"""
+    def tearDown(self):
+        registry.clear()
+
+    async def test_timed_game_finishes(self):
+        room = await sync_to_async(Room.objects.create)(player_count=1, ready_count=1)
+        host = await sync_to_async(Player.objects.create)(
+            room=room, nickname='host', is_host=True, slot=0, status=Player.Status.READY
+        )
+        socket = WebsocketCommunicator(application, f'/ws/game/{room.room_id}/')
+        await socket.connect()
+        await socket.receive_json_from()  # lobby_snapshot
+
+        body = json.dumps({
+            'player_id': host.player_id, 'mode': 'steady_beat',
+            'time_limit_seconds': 1, 'bpm_min': 80, 'bpm_max': 120,
+        }).encode()
+        http = HttpCommunicator(
+            application, 'POST', f'/api/rooms/{room.room_id}/start/', body=body,
+            headers=[
+                (b'host', b'testserver'), (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+        )
+        response = await http.get_response()
+        self.assertEqual(response['status'], 200, response['body'])
+
+        while True:
+            message = await socket.receive_json_from(timeout=3)
+            if message['type'] == 'game_over':
+                break
+        await socket.disconnect()
+        await sync_to_async(room.refresh_from_db)()
+        self.assertEqual(room.status, Room.Status.FINISHED)
+
+
+class SessionTokenTests(TransactionTestCase):
+    """WebSocket 연결의 플레이어 지정은 방 생성/참가 응답의 session_token으로만"""
+    def tearDown(self):
+        registry.clear()
+        resume.active.clear()
+
+    async def test_claimed_player_id_cannot_take_over_session(self):
+        created = await sync_to_async(self.client.post)(
+            '/api/rooms/', {'host_nickname': 'host'}, content_type='application/json'
+        )
+        room_id = created.json()['room_id']
+        host_id = created.json()['players'][0]['player_id']
+        token = created.json()['session_token']
+
+        owner = WebsocketCommunicator(application, f'/ws/game/{room_id}/?token={token}')
+        await owner.connect()
+        await owner.receive_json_from()  # lobby_snapshot
+        self.assertIn((room_id, host_id), resume.active)
+        owner_channel = resume.active[(room_id, host_id)]
+
+        # 공개된 player_id로 heart_rate를 보내도 이 소켓은 그 플레이어가 되지 않음
+        attacker = WebsocketCommunicator(application, f'/ws/game/{room_id}/')
+        await attacker.connect()
+        await attacker.receive_json_from()
+        await attacker.send_json_to({'type': 'heart_rate', 'player_id': host_id, 'bpm': 80})
+        await attacker.receive_json_from()  # 중계된 heart_rate
+        self.assertEqual(resume.active[(room_id, host_id)], owner_channel)
+
+        # 다른 방 토큰 / 변조한 토큰으로는 이어받을 수 없음
+        other = resume.make_token('other-room', host_id)
+        for forged in (other, token[:-1] + ('A' if token[-1] != 'A' else 'B')):
+            intruder = WebsocketCommunicator(application, f'/ws/game/{room_id}/?token={forged}')
+            await intruder.connect()
+            await intruder.receive_json_from()
+            await intruder.disconnect()
+        self.assertEqual(resume.active[(room_id, host_id)], owner_channel)
+        await owner.receive_json_from()  # attacker의 heart_rate
+        self.assertTrue(await owner.receive_nothing(0.2))
+
+        # 진짜 토큰으로 재연결하면 이전 소켓은 4001로 종료
+        again = WebsocketCommunicator(application, f'/ws/game/{room_id}/?token={token}')
+        await again.connect()
+        self.assertEqual((await owner.receive_output(1))['code'], 4001)
+        await again.disconnect()
+        await attacker.disconnect()
+
+
+    @override_settings(PING_TIMEOUT_SECONDS=0.3)
+    async def test_tokenless_client_is_still_supervised(self):
+        """토큰 없이 연결한 기존 클라이언트도 첫 heart_rate로 플레이어 지정 → ping 타임아웃 시 FINISHED"""
+        room = await sync_to_async(Room.objects.create)(status=Room.Status.PLAYING, started_at=timezone.now())
+        player = await sync_to_async(Player.objects.create)(
+            room=room, nickname='p', is_host=True, slot=0, status=Player.Status.PLAYING
+        )
+        observer = WebsocketCommunicator(application, f'/ws/game/{room.room_id}/')
+        await observer.connect()
+        await observer.receive_json_from()  # lobby_snapshot
+        socket = WebsocketCommunicator(application, f'/ws/game/{room.room_id}/')
+        await socket.connect()
+        await socket.receive_json_from()
+        await socket.send_json_to({'type': 'heart_rate', 'player_id': player.player_id, 'bpm': 90})
+        await observer.receive_json_from()  # heart_rate
+        self.assertIsNotNone(history.message(room.room_id))
+        self.assertNotIn((room.room_id, player.player_id), resume.active)
+
+        message = await observer.receive_json_from(timeout=2)
+        self.assertEqual((message['type'], message['player_id']), ('player_disconnected', player.player_id))
+        await sync_to_async(player.refresh_from_db)()
+        self.assertEqual(player.status, Player.Status.FINISHED)
+        history.drop(room.room_id)
+        await socket.disconnect()
+        await observer.disconnect()
+
+
+class MultiWorkerTests(TransactionTestCase):
+    """다른 워커에서 일어난 변경은 그룹 이벤트로 이 워커의 레지스트리에 반영"""
+    def tearDown(self):
+        registry.clear()
+        resume.active.clear()
+
+    def test_group_events_refresh_registry(self):
+        room = Room(room_id='r1', status=Room.Status.WAITING)
+        registry.warm(room, [])
+        player = {'player_id': 'p1', 'nickname': 'a', 'status': 'WAITING', 'is_host': False, 'slot': 1}
+
+        registry.apply_event('r1', {'type': 'lobby_update', 'event': 'player_joined', 'player': player})
+        self.assertEqual(registry.get_room('r1').player_by_slot(1).player_id, 'p1')
+        registry.apply_event('r1', {'type': 'player_ready', 'player_id': 'p1'})
+        self.assertEqual(registry.get_player('r1', 'p1').status, Player.Status.READY)
+
+        registry.apply_event('r1', {
+            'type': 'lobby_update', 'event': 'game_started',
+            'game_settings': {'mode': 'pulse_rush', 'time_limit': 60, 'bpm_min': 90, 'bpm_max': 140},
+            'started_at': '2026-01-01T00:00:00+00:00',
+        })
+        state = registry.get_room('r1')
+        self.assertEqual((state.status, state.mode, state.bpm_max), (Room.Status.PLAYING, 'pulse_rush', 140))
+        self.assertEqual(state.players['p1'].status, Player.Status.PLAYING)
+
+        registry.apply_event('r1', {'type': 'lobby_update', 'event': 'player_left', 'player_id': 'p1'})
+        self.assertIsNone(registry.get_player('r1', 'p1'))
+
+        # 끝난 게임은 버림 (필요하면 Consumer가 DB에서 다시 채움)
+        registry.apply_event('r1', {'type': 'game_over', 'room_id': 'r1', 'ranking': []})
+        self.assertIsNone(registry.get_room('r1'))
+        registry.warm(room, [])
+        registry.apply_event('r1', {'type': 'lobby_update', 'event': 'room_deleted'})
+        self.assertIsNone(registry.get_room('r1'))
+
+    def test_idle_rooms_are_evicted_when_new_rooms_arrive(self):
+        """게임 중이 아닌 방은 변경 없이 idle_seconds가 지나면 새 방 등록 때 정리"""
+        store = type(registry)(idle_seconds=60)
+        for room_id, status in (('idle', Room.Status.WAITING), ('playing', Room.Status.PLAYING),
+                                ('busy', Room.Status.WAITING)):
+            store.warm(Room(room_id=room_id, status=status), [])
+        with patch('rooms.registry.time.monotonic', return_value=time.monotonic() + 61):
+            store.set_player_status('busy', 'p1', Player.Status.READY)  # 없는 플레이어 → 변경 아님
+            store.add_player(Player(player_id='p1', room_id='busy', nickname='a', slot=0))
+            store.warm(Room(room_id='new', status=Room.Status.WAITING), [])
+        self.assertEqual(sorted(store._rooms), ['busy', 'new', 'playing'])
+
+    async def test_game_started_event_starts_ping_supervision(self):
+        created = await sync_to_async(self.client.post)(
+            '/api/rooms/', {'host_nickname': 'host'}, content_type='application/json'
+        )
+        room_id = created.json()['room_id']
+        token = created.json()['session_token']
+        socket = WebsocketCommunicator(application, f'/ws/game/{room_id}/?token={token}')
+        await socket.connect()
+        await socket.receive_json_from()  # lobby_snapshot
+        channel_name = next(iter(resume.active.values()))
+        self.assertNotIn(channel_name, ping_supervisor)
+
+        # 다른 워커의 GameStartView가 보낸 game_started (이 워커의 레지스트리는 아직 WAITING)
+        await get_channel_layer().group_send(f'game_{room_id}', group_event('send_lobby_update', {
+            'type': 'lobby_update', 'event': 'game_started', 'room_id': room_id,
+            'game_settings': {'mode': 'steady_beat', 'time_limit': 60, 'bpm_min': 80, 'bpm_max': 120},
+            'started_at': '2026-01-01T00:00:00+00:00',
+        }))
+        self.assertEqual((await socket.receive_json_from())['event'], 'game_started')
+        self.assertIn(channel_name, ping_supervisor)
+        await socket.disconnect()
+        self.assertNotIn(channel_name, ping_supervisor)
+
+    async def test_expire_sends_game_over_once(self):
+        """재시작 후 여러 워커가 같은 방을 복원해도 FINISHED로 바꾼 워커만 game_over"""
+        room = await sync_to_async(Room.objects.create)(
+            status=Room.Status.PLAYING, started_at=timezone.now()
+        )
+        self.assertEqual(await game_clock._finish_rooms([room.room_id]), [room.room_id])
+        self.assertEqual(await game_clock._finish_rooms([room.room_id]), [])
+
+    def test_single_worker_settings_rejected_with_unix_layer(self):
+        layers = {'default': {'BACKEND': 'rooms.layers.UnixSocketChannelLayer'}}
+        with override_settings(CHANNEL_LAYERS=layers):
+            self.assertEqual(len(checks.check_single_worker_settings(None)), 3)  # TICK_HZ 기본값 0
+        with override_settings(
+            CHANNEL_LAYERS=layers, SPECTATOR_SNAPSHOT_HZ=0, RESUME_REPLAY_WINDOW=0, RESUME_GRACE_SECONDS=0,
+        ):
+            self.assertEqual(checks.check_single_worker_settings(None), [])
+        self.assertEqual(checks.check_single_worker_settings(None), [])
@@ -0,0 +1,128 @@
+"""
+프로세스 전역 데드라인 스케줄러
+- 연결/방마다 asyncio 태스크를 두지 않고, 하나의 태스크가 데드라인 힙을 관리
+- 가장 이른 데드라인까지만 잠들고, 실제로 만료된 항목의 콜백만 실행
+- 시간은 monotonic 기준 (시스템 시계 변경에 영향 없음)
+
+데드라인 연장(touch)은 dict 값만 바꾸고 힙은 건드리지 않음 (ping마다 O(1))
+→ 힙에서 꺼낸 항목의 데드라인이 연장되어 있으면 그때 다시 넣음
+key마다 살아 있는 힙 항목은 하나 (항목에 힙 seq를 세대 번호로 저장)
+→ 다시 등록(schedule)하거나 취소한 key의 이전 힙 항목은 꺼낼 때 버림 (중복 실행/중복 재삽입 없음)
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    key -> (deadline, callback)
+    - callback은 인자 없는 코루틴 함수, 만료 시 별도 태스크로 실행
+    - 같은 시점(resolution 이내)에 만료된 항목은 한 번에 처리
+    - batch_callback을 주면 항목별 callback 대신 만료된 key 목록으로 한 번만 호출
+    """
+    def __init__(self, resolution=0.05, batch_callback=None):
+        self.resolution = resolution
+        self.batch_callback = batch_callback
+        self._entries = {}  # key -> [deadline, callback, 살아 있는 힙 항목의 seq]
+        self._heap = []  # (힙에 넣을 때의 deadline, seq, key)
+        self._seq = itertools.count()
+        self._task = None
+        self._wakeup = None
+
+    def __len__(self):
+        """현재 추적 중인 항목 수"""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, delay, callback=None):
+        """delay초 뒤 만료되는 항목 등록 (이미 있으면 교체)"""
+        deadline = time.monotonic() + delay
+        self._entries[key] = [deadline, callback, self._push(deadline, key)]
+
+    def touch(self, key, delay):
+        """데드라인 연장 (등록되지 않은 key면 무시)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[0] = time.monotonic() + delay
+
+    def cancel(self, key):
+        """항목 제거 (힙에 남은 항목은 꺼낼 때 무시됨)"""
+        self._entries.pop(key, None)
+
+    def _push(self, deadline, key):
+        """힙에 넣고 그 항목의 seq 반환"""
+        earliest = self._heap[0][0] if self._heap else None
+        seq = next(self._seq)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        self._ensure_running()
+        # 더 이른 데드라인이 들어오면 잠든 태스크를 깨움
+        if earliest is None or deadline < earliest:
+            self._wakeup.set()
+        return seq
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _pop_expired(self, now):
+        """만료된 (key, callback) 목록 (연장된 항목은 새 데드라인으로 다시 넣음)"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != seq:
+                continue  # 취소됐거나 다시 등록된 key의 이전 항목
+            deadline, callback, _ = entry
+            if deadline > now:
+                entry[2] = next(self._seq)
+                heapq.heappush(self._heap, (deadline, entry[2], key))
+                continue  # 연장됨
+            del self._entries[key]
+            expired.append((key, callback))
+        return expired
+
+    async def _run(self):
+        try:
+            while True:
+                self._wakeup.clear()
+                if self._heap:
+                    timeout = max(self._heap[0][0] - time.monotonic(), 0) + self.resolution
+                else:
+                    timeout = None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                expired = self._pop_expired(time.monotonic())
+                if not expired:
+                    continue
+                if self.batch_callback is not None:
+                    keys = [key for key, _ in expired]
+                    asyncio.create_task(self._fire(self.batch_callback, keys))
+                else:
+                    for _, callback in expired:
+                        asyncio.create_task(self._fire(callback))
+        except asyncio.CancelledError:
+            pass
+
+    async def _fire(self, callback, *args):
+        try:
+            await callback(*args)
+        except Exception:
+            logger.exception("Deadline callback failed")
+
+
+# ping 타임아웃 감시용 (key: Consumer channel_name) → 항목 수 = 감시 중인 연결 수
+ping_supervisor = DeadlineScheduler()
+
+# ping 타임아웃 후 세션 재개 대기용 (key: resume.grace_key) - 연결 수에 섞이지 않도록 따로
+resume_timers = DeadlineScheduler()
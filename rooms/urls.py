@@ -9,7 +9,8 @@ from .views import (
     JoinRoomView,
     LeaveRoomView,
     GameStartView,
-    RoomDeleteView
+    RoomDeleteView,
+    RoomSamplesExportView
 )
 
 urlpatterns = [
@@ -30,4 +31,7 @@ urlpatterns = [
 
     # DELETE /api/rooms/{room_id}/delete/?player_id={player_id} - 방 삭제
     path('<str:room_id>/delete/', RoomDeleteView.as_view(), name='room-delete'),
+
+    # GET /api/rooms/{room_id}/samples/?fmt=ndjson|csv&resolution_ms=1000 - 심박수 타임라인 내보내기
+    path('<str:room_id>/samples/', RoomSamplesExportView.as_view(), name='room-samples'),
 ]
\ No newline at end of file
@@ -2,8 +2,20 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound
 from rest_framework import status
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, F, When
 from .models import Room, Player
+from .registry import registry
+from .codes import room_codes
+from .history import history
+from . import room_cache
+from . import lobby
+from . import export
+from . import resume
+from .game_clock import game_clock
+from .reaper import cleanup_room
 from .serializers import (
     RoomDetailSerializer,
     LeaveRoomSerializer,
@@ -11,22 +23,57 @@ from .serializers import (
     GameStartSerializer
 )
 from django.utils import timezone
+from django.utils.http import parse_etags
+
+
+def get_player_with_room(room_id, player_id):
+    """요청한 플레이어와 방을 쿼리 한 번으로 조회 (select_related, 없으면 404)"""
+    return get_object_or_404(
+        Player.objects.select_related('room'), player_id=player_id, room_id=room_id
+    )
+
+
+def delete_room(room):
+    """
+    방 삭제 + 메모리 상태 정리
+    - CASCADE 대상(Player, HeartRateSample)은 시그널이 없으므로 모델별 DELETE 한 번씩
+    반환: 삭제된 플레이어 수
+    """
+    room_id = room.room_id  # delete() 후에는 pk가 None이 됨
+    _, deleted = room.delete()
+    # 종료된 방의 코드는 이미 반납됨
+    cleanup_room(room_id, None if room.status == Room.Status.FINISHED else room.room_code)
+    return deleted.get(Player._meta.label, 0)
 
 
 class RoomDetailView(APIView):
     """
     방 상세 정보 조회 API
     GET /api/rooms/{room_id}/
+
+    로비 폴링용 캐시
+    - ETag는 방 버전 번호 (Room/Player가 바뀔 때마다 증가)
+    - If-None-Match가 현재 ETag와 같으면 DB/Serializer 없이 304
+    - 직렬화 결과는 버전별로 캐시 → 바뀌지 않은 방은 DB 조회 없이 응답
     """
     def get(self, request, room_id):
-        # 방 조회 (없으면 자동 404)
-        room = get_object_or_404(Room, room_id=room_id)
+        # 1. 현재 버전과 ETag
+        version = room_cache.get_version(room_id)
+        etag = room_cache.etag(room_id, version)
+        headers = {'ETag': etag}
 
-        # Serializer로 변환
-        serializer = RoomDetailSerializer(room)
+        # 2. 클라이언트가 최신 상태를 갖고 있으면 304
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag in parse_etags(if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        # 3. 캐시에 없으면 방 조회 후 Serializer로 변환 (없으면 404)
+        data = room_cache.load_detail(room_id, version)
+        if data is None:
+            raise NotFound("Room not found")
 
         # 응답 반환 (200은 기본값이라 생략)
-        return Response(serializer.data)
+        return Response(data, headers=headers)
 
 
 class LeaveRoomView(APIView):
@@ -41,22 +88,37 @@ class LeaveRoomView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # 2. Room과 Player 조회
+        # 2. Room과 Player 조회 (쿼리 한 번)
         player_id = serializer.validated_data['player_id']
-        room = get_object_or_404(Room, room_id=room_id)
-        player = get_object_or_404(Player, player_id=player_id, room=room)
+        player = get_player_with_room(room_id, player_id)
+        room = player.room
 
         # 3. 호스트 퇴장 시 방 삭제
         if player.is_host:
-            room_code = room.room_code  # 삭제 전 저장
-            room.delete()  # CASCADE로 모든 플레이어도 자동 삭제됨
+            delete_room(room)  # CASCADE로 모든 플레이어도 자동 삭제됨
             return Response({
                 "message": "Room deleted (host left)",
-                "room_code": room_code
+                "room_code": room.room_code
             }, status=status.HTTP_200_OK)
 
-        # 4. 일반 플레이어 삭제
-        player.delete()
+        # 4. 방 인원 카운터 감소 + 일반 플레이어 삭제
+        # READY 여부는 2에서 읽은 값이 아니라 UPDATE 시점의 행으로 판단 (그 사이 ready 해도 카운터가 맞도록)
+        player_row = Player.objects.filter(room_id=room_id, player_id=player_id)
+        with transaction.atomic():
+            left = Room.objects.filter(Exists(player_row), room_id=room_id).update(
+                last_activity_at=timezone.now(),
+                player_count=F('player_count') - 1,
+                ready_count=F('ready_count') - Case(
+                    When(Exists(player_row.filter(status=Player.Status.READY)), then=1),
+                    default=0,
+                ),
+            )
+            if left:
+                player_row.delete()
+        registry.remove_player(room_id, player_id)
+        history.drop_player(room_id, player_id)
+        room_cache.bump_on_commit(room_id)
+        lobby.player_left(room_id, player_id)
 
         # 5. 성공 응답
         return Response({"message": "Successfully left the room"})
@@ -70,6 +132,7 @@ class JoinRoomView(APIView):
     제약사항:
     - 게임이 시작되지 않은 방(WAITING 상태)만 참가 가능
     - 방 인원이 max_players 미만이어야 함
+    → 두 조건을 player_count 조건부 UPDATE 한 번으로 확인 (동시 참가로 인원 초과 불가)
     """
     def post(self, request):
         # 1. room_code와 nickname 검증
@@ -82,8 +145,10 @@ class JoinRoomView(APIView):
         room_code = serializer.validated_data["room_code"]
         nickname = serializer.validated_data["nickname"]
 
-        # 2. Room 찾기 (room_code로 찾기)
-        room = get_object_or_404(Room, room_code=room_code)
+        # 2. Room 찾기 (room_code로 찾기, 종료된 방의 코드는 재사용되므로 제외)
+        room = get_object_or_404(
+            Room.objects.exclude(status=Room.Status.FINISHED), room_code=room_code
+        )
 
         # 3. 게임 시작 여부 확인
         if room.status != Room.Status.WAITING:
@@ -92,27 +157,41 @@ class JoinRoomView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 4. 방인원 확인
-        current_players = room.players.count()
-        if current_players >= room.max_players:
-            return Response(
-                {"error": "Room is full"},
-                status=status.HTTP_400_BAD_REQUEST
+        with transaction.atomic():
+            # 4. 자리 확보 (WAITING이고 max_players 미만일 때만 player_count 증가)
+            claimed = Room.objects.filter(
+                room_id=room.room_id,
+                status=Room.Status.WAITING,
+                player_count__lt=F('max_players'),
+            ).update(player_count=F('player_count') + 1, last_activity_at=timezone.now())
+            if not claimed:
+                room.refresh_from_db(fields=['status'])
+                error = "Room is full" if room.status == Room.Status.WAITING else "Game already started"
+                return Response(
+                    {"error": error},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 5. Player 생성
+            player = Player.objects.create(
+                room=room,
+                nickname=nickname,
+                status=Player.Status.WAITING,  # TextChoices 사용
+                is_host=False,
+                slot=room.next_free_slot()  # 바이너리 프레임용 자리 번호
             )
-
-
-        # 5. Player 생성
-        player = Player.objects.create(
-            room=room,
-            nickname=nickname,
-            status=Player.Status.WAITING,  # TextChoices 사용
-            is_host=False
-        )
+        registry.add_player(player)
+        room_cache.bump_on_commit(room.room_id)
+        lobby.player_joined(player)
 
         # 6. 방 전체 정보 응답 (모든 플레이어 포함)
         room_serializer = RoomDetailSerializer(room)
 
-        return Response({"player_id": player.player_id, **room_serializer.data}, status=status.HTTP_200_OK)
+        return Response({
+            "player_id": player.player_id,
+            "session_token": resume.make_token(room.room_id, player.player_id),  # WebSocket 연결용
+            **room_serializer.data
+        }, status=status.HTTP_200_OK)
 
 
 
@@ -133,9 +212,9 @@ class RoomDeleteView(APIView):
                 "detail": "Add ?player_id=YOUR_ID to the request URL"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 2. Room과 Player 검증
-        room = get_object_or_404(Room, room_id=room_id)
-        player = get_object_or_404(Player, player_id=player_id, room=room)
+        # 2. Room과 Player 검증 (쿼리 한 번)
+        player = get_player_with_room(room_id, player_id)
+        room = player.room
         
         # 3. 방장 권한 검증
         if not player.is_host:
@@ -144,17 +223,13 @@ class RoomDeleteView(APIView):
                 "detail": "Only the host can delete the room"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # 4. 삭제 전 정보 저장 (응답용)
-        room_code = room.room_code
-        player_count = room.players.count()  # CASCADE 전에 카운트
-        
-        # 5. Room 삭제
-        room.delete()
+        # 4. Room 삭제 (삭제된 플레이어 수는 DELETE 결과에서)
+        player_count = delete_room(room)
         
-        # 6. 성공 응답
+        # 5. 성공 응답
         return Response({
             "message": "Room deleted successfully",
-            "room_code": room_code,
+            "room_code": room.room_code,
             "deleted_players": player_count
         }, status=status.HTTP_200_OK)
         
@@ -173,8 +248,11 @@ class GameStartView(APIView):
 
     요구사항:
     - 방장만 게임 시작 가능
-    - 모든 플레이어가 READY 상태여야 함
+    - 모든 플레이어가 READY 상태여야 함 (ready_count == player_count 조건부 UPDATE로 확인)
     - 게임 시작 시 Room과 모든 Player 상태가 PLAYING으로 변경됨
+    - time_limit_seconds가 지나면 서버가 Room과 Player를 FINISHED로 변경하고 game_over 전송
+
+    쿼리: 플레이어+방 SELECT 1번, 트랜잭션 안에서 Room UPDATE 1번 + Player UPDATE 1번
     """
     def post(self, request, room_id):
         # 1. 게임 설정 데이터 검증
@@ -195,9 +273,12 @@ class GameStartView(APIView):
         )   
 
 
-        # 3. Room, Player 찾기
-        room = get_object_or_404(Room, room_id=room_id)
-        player = get_object_or_404(Player, player_id=player_id, room=room)
+        # 3. 방의 모든 플레이어를 Room과 함께 쿼리 한 번으로 조회 (레지스트리 채우기에도 재사용)
+        players = list(Player.objects.select_related('room').filter(room_id=room_id))
+        player = next((p for p in players if p.player_id == player_id), None)
+        if player is None:
+            raise NotFound("Player not found in this room")
+        room = player.room
 
         # 4. 방장 권한 검증
         if not player.is_host:
@@ -206,33 +287,52 @@ class GameStartView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # 5. 모든 플레이어 준비 확인
+        # 5~6. 모든 플레이어 준비 확인 + Room에 게임 설정 저장 (조건부 UPDATE 한 번)
         # 방장 포함 모든 플레이어가 READY 상태여야 게임 시작 가능
-        total_players = room.players.count()
-        ready_players = room.players.filter(status=Player.Status.READY).count()
-
-        if ready_players != total_players:
-            return Response(
-                {
-                    "error": "Not all players are ready",
-                    "detail": f"{ready_players}/{total_players} players ready"
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # 6. Room에 게임 설정 저장
-        room.mode = mode
-        room.time_limit_seconds = time_limit
-        room.bpm_min = bpm_min
-        room.bpm_max = bpm_max
-        room.status = Room.Status.PLAYING  # TextChoices 사용
-        room.started_at = timezone.now()
-        room.save()
-
-        # 7. 모든 플레이어 상태를 PLAYING으로 변경
-        room.players.update(status=Player.Status.PLAYING)
-
-        # 8. 게임 시작 정보 응답
+        game_settings = {
+            'mode': mode,
+            'time_limit_seconds': time_limit,
+            'bpm_min': bpm_min,
+            'bpm_max': bpm_max,
+            'status': Room.Status.PLAYING,  # TextChoices 사용
+            'started_at': timezone.now(),
+        }
+        with transaction.atomic():
+            started = Room.objects.filter(
+                room_id=room_id,
+                player_count__gt=0,
+                ready_count=F('player_count'),
+            ).update(ready_count=0, **game_settings)
+
+            if not started:
+                room.refresh_from_db(fields=['player_count', 'ready_count'])
+                return Response(
+                    {
+                        "error": "Not all players are ready",
+                        "detail": f"{room.ready_count}/{room.player_count} players ready"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 7. 모든 플레이어 상태를 PLAYING으로 변경
+            Player.objects.filter(room_id=room_id).update(status=Player.Status.PLAYING)
+
+        for field, value in game_settings.items():
+            setattr(room, field, value)
+        room.ready_count = 0
+        for p in players:
+            p.status = Player.Status.PLAYING
+
+        # 8. 게임 중 WebSocket이 DB를 조회하지 않도록 레지스트리 채우기 (3에서 읽은 플레이어 재사용)
+        registry.warm(room, players)
+        room_cache.bump_on_commit(room_id)
+
+        # 9. 서버 게임 시계에 종료 시각 등록 (time_limit_seconds 후 game_over)
+        # 멀티 워커면 이 워커가 점수판을 맡고, 다른 워커는 game_started로 받은 채널로 샘플 전달
+        score_channel = game_clock.start_sync(room.room_id, room.time_limit_seconds)
+        lobby.game_started(room, score_channel)
+
+        # 10. 게임 시작 정보 응답
         return Response({
             "message": "Game started",
             "room_id": room.room_id,
@@ -252,7 +352,12 @@ class RoomCreateView(APIView):
     방 생성 API
     POST /api/rooms/
     Body: {"host_nickname": "바다"}
+
+    room_code는 프로세스별 코드 pool에서 할당 (중복 확인용 DB 조회 없음)
+    - 다른 워커와 같은 코드를 고른 드문 경우 IntegrityError → 코드를 반납하고 새 코드로 재시도
     """
+    MAX_ATTEMPTS = 3
+
     def post(self, request):
         # 1. host_nickname 검증
         host_nickname = request.data.get('host_nickname')
@@ -270,23 +375,95 @@ class RoomCreateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 2. Room 생성 (room_id와 room_code는 모델의 save()에서 자동 생성)
+        # 2. Room + 방장(Host) Player 생성 (room_id는 모델의 save()에서 자동 생성)
+        for attempt in range(self.MAX_ATTEMPTS):
+            room_code = room_codes.allocate()
+            try:
+                with transaction.atomic():
+                    room, host = self.create_room(host_nickname, room_code)
+                break
+            except IntegrityError:
+                # 다시 pool에 넣음 (room_id 충돌이면 쓰지 않은 코드, 다른 워커와 겹친 코드면
+                # 버릴 경우 그 워커가 방 종료 때 자기 pool에 반납하므로 이 워커에서는 영영 사라짐)
+                room_codes.release(room_code)
+                if attempt == self.MAX_ATTEMPTS - 1:
+                    raise
+        registry.add_player(host, room=room)
+
+        # 3. 응답 (RoomDetailSerializer 사용)
+        serializer = RoomDetailSerializer(room)
+        return Response({
+            "session_token": resume.make_token(room.room_id, host.player_id),  # WebSocket 연결용
+            **serializer.data
+        }, status=status.HTTP_201_CREATED)
+
+    def create_room(self, host_nickname, room_code):
         room = Room.objects.create(
+            room_code=room_code,
             status=Room.Status.WAITING,  # TextChoices 사용
-            mode=Room.Mode.STEADY_BEAT  # 기본 모드 설정 (안전장치)
+            mode=Room.Mode.STEADY_BEAT,  # 기본 모드 설정 (안전장치)
+            player_count=1  # 방장
         )
-
-        # 3. 방장(Host) Player 생성
-        Player.objects.create(
+        host = Player.objects.create(
             room=room,
             nickname=host_nickname,
             status=Player.Status.WAITING,  # TextChoices 사용 (입장 직후)
-            is_host=True
+            is_host=True,
+            slot=0  # 방장은 항상 0번 자리
         )
-
-        # 4. 응답 (RoomDetailSerializer 사용)
-        serializer = RoomDetailSerializer(room)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return room, host
 
 
         
+
+
+class RoomSamplesExportView(APIView):
+    """
+    GET /api/rooms/{room_id}/samples/?fmt=ndjson|csv&resolution_ms=1000
+
+    종료된 게임의 심박수 타임라인 스트리밍 (rooms/export.py)
+    - fmt: ndjson (기본) 또는 csv (DRF가 format 파라미터를 쓰므로 fmt)
+    - resolution_ms: 주면 slot별 해당 구간 평균 BPM으로 다운샘플
+    """
+    FORMATS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    def get(self, request, room_id):
+        room = get_object_or_404(Room, room_id=room_id)
+        if room.status != Room.Status.FINISHED:
+            return Response({
+                "error": "Game is not finished",
+                "detail": f"Room status is {room.status}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.query_params.get('fmt', 'ndjson')
+        if fmt not in self.FORMATS:
+            return Response({
+                "error": "Invalid fmt",
+                "detail": "Use ndjson or csv"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        resolution_ms = request.query_params.get('resolution_ms')
+        if resolution_ms is not None:
+            try:
+                resolution_ms = int(resolution_ms)
+            except ValueError:
+                resolution_ms = 0
+            if resolution_ms <= 0:
+                return Response({
+                    "error": "Invalid resolution_ms",
+                    "detail": "resolution_ms must be a positive integer"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        players = dict(Player.objects.filter(room=room).values_list('slot', 'player_id'))
+        response = StreamingHttpResponse(
+            export.stream(
+                room_id, players, fmt, resolution_ms,
+                asynchronous=hasattr(request, 'scope'),  # ASGI 요청에만 scope가 있음
+            ),
+            content_type=self.FORMATS[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{room_id}-samples.{fmt}"'
+        return response